@@ -0,0 +1,111 @@
+"""
+Request micro-batching for the RAG system
+Concurrent searches are gathered over a short window and answered with one batched SimpleRAG.search_batch call
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class SearchBatcher:
+    """Background scheduler that micro-batches concurrent search requests"""
+
+    def __init__(self, rag_instance, max_batch_size=16, max_wait_ms=5, max_queue_size=256):
+        self.rag_instance = rag_instance
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        # Bounded so callers block (backpressure) instead of queueing unbounded work
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._stopped = threading.Event()
+        # Serializes start and stop, so concurrent first requests start a single scheduler thread
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the scheduler thread if it is not running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name="search-batcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the scheduler thread after the requests already queued are answered"""
+        with self._lock:
+            self._stopped.set()
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+
+    def submit(self, query, n_results=5, timeout=None):
+        """
+        Queue a search request
+
+        Args:
+            query (str): Search query
+            n_results (int): Number of results to return
+            timeout (float): Seconds to wait for room in a full queue, None waits forever
+
+        Returns:
+            concurrent.futures.Future: Resolves to the search results
+
+        Raises:
+            queue.Full: If the queue stays full for timeout seconds
+        """
+        self.start()
+        future = Future()
+        self._queue.put((query, n_results, future), timeout=timeout)
+        return future
+
+    def search(self, query, n_results=5, timeout=None):
+        """Search through the batcher and wait for the results"""
+        return self.submit(query, n_results, timeout).result()
+
+    async def asearch(self, query, n_results=5, timeout=None):
+        """Search through the batcher without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        # Waiting for room in a full queue happens off the event loop
+        try:
+            future = self.submit(query, n_results, timeout=0)
+        except queue.Full:
+            future = await loop.run_in_executor(None, self.submit, query, n_results, timeout)
+        return await asyncio.wrap_future(future)
+
+    def _next_batch(self):
+        """Wait for a request, then gather more until the batch is full or max_wait_ms has passed"""
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Scheduler loop: answer each gathered batch with one search_batch call per n_results value"""
+        while not (self._stopped.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            groups = {}
+            for query, n_results, future in batch:
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault(n_results, []).append((query, future))
+            for n_results, requests in groups.items():
+                try:
+                    results = self.rag_instance.search_batch([query for query, _ in requests], n_results)
+                except Exception as e:
+                    for _, future in requests:
+                        future.set_exception(e)
+                    continue
+                for (_, future), result in zip(requests, results):
+                    future.set_result(result)
@@ -0,0 +1,253 @@
+"""
+BM25 lexical index for the RAG system
+An inverted index over chunk texts kept next to the vectors, so exact terms and section numbers are found even when
+embedding search misses them, plus reciprocal rank fusion of lexical and vector rankings
+"""
+
+import math
+import os
+import re
+import threading
+from array import array
+
+import numpy as np
+
+# Section numbers like "4.2" and "1.1.3" are kept as single tokens, everything else is split into words
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)+|\w+")
+
+
+def tokenize(text):
+    """Lowercase text and split it into word and section-number tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse several rankings of ids with reciprocal rank fusion
+
+    Args:
+        rankings (list): Lists of ids, each ordered best first
+        k (int): Rank offset that damps the influence of the top ranks
+
+    Returns:
+        list: (id, fused score) pairs ordered best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+class BM25Index:
+    """Incrementally updated BM25 index with array-backed postings, persisted to a single .npz file"""
+
+    def __init__(self, path=None, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        # File stamp of the last load or save, and whether this process has changes that are not saved yet
+        self._stamp = None
+        self._dirty = False
+        self._reset()
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def _reset(self):
+        # Documents live in slots; a deleted document leaves a dead slot until the postings are compacted
+        self._ids = []
+        self._slot_of = {}
+        self._lengths = array("I")
+        self._live = array("b")
+        self._total_length = 0
+        # term -> (slots array, term frequencies array)
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def upsert(self, ids, texts):
+        """
+        Index chunk texts, replacing any chunks already indexed under the same ids
+
+        Args:
+            ids (list): Chunk ids
+            texts (list): Chunk texts
+        """
+        with self._lock:
+            self._dirty = True
+            self._delete([chunk_id for chunk_id in ids if chunk_id in self._slot_of])
+            for chunk_id, text in zip(ids, texts):
+                slot = len(self._ids)
+                tokens = tokenize(text or "")
+                self._ids.append(chunk_id)
+                self._slot_of[chunk_id] = slot
+                self._lengths.append(len(tokens))
+                self._live.append(1)
+                self._total_length += len(tokens)
+                frequencies = {}
+                for token in tokens:
+                    frequencies[token] = frequencies.get(token, 0) + 1
+                for token, frequency in frequencies.items():
+                    postings = self._postings.get(token)
+                    if postings is None:
+                        postings = self._postings[token] = (array("I"), array("I"))
+                    postings[0].append(slot)
+                    postings[1].append(frequency)
+
+    def delete(self, ids):
+        """Remove chunks from the index"""
+        with self._lock:
+            self._dirty = True
+            self._delete(ids)
+            # Rebuild the postings once dead slots make up a quarter of the index
+            if len(self._ids) > 1000 and len(self._slot_of) < len(self._ids) * 0.75:
+                self._compact()
+
+    def _delete(self, ids):
+        for chunk_id in ids:
+            slot = self._slot_of.pop(chunk_id, None)
+            if slot is not None:
+                self._live[slot] = 0
+                self._total_length -= self._lengths[slot]
+
+    def _compact(self):
+        """Renumber live slots and drop postings of deleted documents"""
+        if len(self._slot_of) == len(self._ids):
+            return
+        live = np.frombuffer(self._live, dtype=np.int8).astype(bool)
+        new_slot = np.cumsum(live) - 1
+        postings = {}
+        for token, (slots, frequencies) in self._postings.items():
+            slots = np.frombuffer(slots, dtype=np.uint32)
+            keep = live[slots]
+            if keep.any():
+                postings[token] = (array("I", new_slot[slots[keep]].astype(np.uint32).tobytes()),
+                                   array("I", np.frombuffer(frequencies, dtype=np.uint32)[keep].tobytes()))
+        self._ids = [chunk_id for chunk_id, alive in zip(self._ids, live) if alive]
+        self._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(self._ids)}
+        self._lengths = array("I", np.frombuffer(self._lengths, dtype=np.uint32)[live].tobytes())
+        self._live = array("b", [1] * len(self._ids))
+        self._postings = postings
+
+    def clear(self):
+        """Remove every chunk from the index"""
+        with self._lock:
+            self._dirty = True
+            self._reset()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def reload_if_changed(self):
+        """
+        Reload the index if another process saved it since this one last loaded or saved it
+
+        Local changes that are not saved yet are kept rather than overwritten.
+
+        Returns:
+            bool: True if the index was reloaded
+        """
+        if self.path is None:
+            return False
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._stamp or self._dirty:
+                return False
+            self._load()
+            return True
+
+    def search(self, query, n_results=10):
+        """
+        Rank indexed chunks against a query with BM25
+
+        Args:
+            query (str): Search query
+            n_results (int): Number of chunks to return
+
+        Returns:
+            list: (chunk id, BM25 score) pairs ordered best first, only chunks sharing a term with the query
+        """
+        with self._lock:
+            documents = len(self._slot_of)
+            if not documents or n_results <= 0:
+                return []
+            live = np.frombuffer(self._live, dtype=np.int8).astype(bool)
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.float32)
+            average_length = self._total_length / documents or 1.0
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for token in set(tokenize(query)):
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                all_slots = np.frombuffer(postings[0], dtype=np.uint32)
+                mask = live[all_slots]
+                slots = all_slots[mask]
+                if not len(slots):
+                    continue
+                frequencies = np.frombuffer(postings[1], dtype=np.uint32)[mask].astype(np.float32)
+                idf = math.log(1 + (documents - len(slots) + 0.5) / (len(slots) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[slots] / average_length)
+                # Each slot appears once per term, so plain fancy-index addition is safe
+                scores[slots] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+            matched = np.flatnonzero(scores > 0)
+            if not len(matched):
+                return []
+            k = min(n_results, len(matched))
+            top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[slot], float(scores[slot])) for slot in top]
+
+    def save(self):
+        """Write the index to its path atomically, in compressed sparse row form"""
+        if self.path is None:
+            return
+        with self._lock:
+            self._compact()
+            terms = sorted(self._postings)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(self._postings[term][0]) for term in terms])
+            slots = np.concatenate([np.frombuffer(self._postings[term][0], dtype=np.uint32) for term in terms]) if terms else np.zeros(0, dtype=np.uint32)
+            frequencies = np.concatenate([np.frombuffer(self._postings[term][1], dtype=np.uint32) for term in terms]) if terms else np.zeros(0, dtype=np.uint32)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as file:
+                np.savez(
+                    file,
+                    ids=np.array(self._ids, dtype=str),
+                    lengths=np.frombuffer(self._lengths, dtype=np.uint32),
+                    terms=np.array(terms, dtype=str),
+                    offsets=offsets,
+                    slots=slots,
+                    frequencies=frequencies
+                )
+            os.replace(tmp_path, self.path)
+            self._stamp = self._file_stamp()
+            self._dirty = False
+
+    def _load(self):
+        stamp = self._file_stamp()
+        with np.load(self.path) as data:
+            ids = data["ids"].tolist()
+            lengths = data["lengths"]
+            terms = data["terms"].tolist()
+            offsets = data["offsets"]
+            slots = data["slots"]
+            frequencies = data["frequencies"]
+        self._ids = ids
+        self._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(ids)}
+        self._lengths = array("I", lengths.astype(np.uint32).tobytes())
+        self._live = array("b", [1] * len(ids))
+        self._total_length = int(lengths.sum())
+        self._postings = {
+            term: (array("I", slots[offsets[i]:offsets[i + 1]].tobytes()),
+                   array("I", frequencies[offsets[i]:offsets[i + 1]].tobytes()))
+            for i, term in enumerate(terms)
+        }
+        self._stamp = stamp
+        self._dirty = False
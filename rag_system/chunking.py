@@ -0,0 +1,229 @@
+"""
+Sentence chunking for the RAG system
+Chunks are cut from the original text in a single pass and carry their character offsets
+"""
+
+import re
+import time
+from bisect import bisect_left, bisect_right
+from .metrics import metrics
+from .models import get_tokenizer
+
+# Sentence endings (., !, ?) followed by whitespace
+SENTENCE_END = re.compile(r'[.!?]+(?=\s|$)')
+# A "sentence" that is only a section number like "1." or "4.2." belongs to the sentence after it
+SECTION_NUMBER = re.compile(r'\s*(?:\d+\.)*\d+')
+
+
+def sentence_spans(text, continued=False):
+    """
+    Find sentence spans in text
+
+    Args:
+        text (str): Text to split
+        continued (bool): The text starts mid-sentence, so a leading number ends that sentence rather than being a
+            section number
+
+    Returns:
+        list: (start, end) character offsets of each sentence with surrounding whitespace trimmed,
+        the last span has no sentence ending if the text stops mid-sentence
+    """
+    spans = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        if not (continued and start == 0) and SECTION_NUMBER.fullmatch(text, start, match.start()):
+            continue
+        spans.append((start, match.end()))
+        start = match.end()
+    spans.append((start, len(text)))
+    trimmed = []
+    for start, end in spans:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            trimmed.append((start, end))
+    return trimmed
+
+
+class SentenceChunker:
+    """Linear-time sentence chunker with configurable size, overlap and an optional token budget"""
+
+    def __init__(self, max_chunk_size=200, overlap=0, min_chunk_size=50, token_budget=None, tokenizer_name=None):
+        if token_budget is not None and tokenizer_name is None:
+            raise ValueError("token_budget requires tokenizer_name")
+        self.max_chunk_size = max_chunk_size
+        self.overlap = overlap
+        self.min_chunk_size = min_chunk_size
+        self.token_budget = token_budget
+        self.tokenizer_name = tokenizer_name
+
+    def _size_function(self, text):
+        """Return size(start, end) measuring a span in characters, or in tokens when a token budget is set"""
+        if self.token_budget is None:
+            return lambda start, end: end - start
+        # Only the fast tokenizer's offset mapping is used, the text itself is never rewritten
+        encoding = get_tokenizer(self.tokenizer_name)(text, add_special_tokens=False, return_offsets_mapping=True)
+        token_starts = [start for start, _ in encoding["offset_mapping"]]
+        return lambda start, end: bisect_left(token_starts, end) - bisect_left(token_starts, start)
+
+    @staticmethod
+    def _bounded_spans(text, spans, size, limit):
+        """
+        Split spans larger than the limit at whitespace, so text without sentence endings still yields bounded chunks
+
+        Yields:
+            tuple: (start, end) spans no larger than the limit, unless a single word is
+        """
+        for start, end in spans:
+            while size(start, end) > limit:
+                # Largest cut that fits, then back off to the whitespace before it
+                low, high = start + 1, end
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    if size(start, middle) <= limit:
+                        low = middle
+                    else:
+                        high = middle - 1
+                cut = low
+                while cut > start and not text[cut].isspace():
+                    cut -= 1
+                if cut == start:
+                    cut = low
+                piece_end = cut
+                while piece_end > start and text[piece_end - 1].isspace():
+                    piece_end -= 1
+                yield start, piece_end
+                start = cut
+                while start < end and text[start].isspace():
+                    start += 1
+            if start < end:
+                yield start, end
+
+    def _pack(self, text, spans, final, emitted_end=0):
+        """
+        Group sentence spans into chunks
+
+        Spans ending by emitted_end are overlap carried over from a chunk that was already emitted: they are kept only
+        as overlap of the next chunk, exactly as if that chunk had just been emitted, and never form a chunk alone.
+
+        Returns:
+            tuple: (list of (start, end) chunks, offset where unfinished text begins or None when final)
+        """
+        limit = self.max_chunk_size if self.token_budget is None else self.token_budget
+        size = self._size_function(text)
+        chunks = []
+        current = []
+        overlap_only = False
+        for span in self._bounded_spans(text, spans, size, limit):
+            if span[1] <= emitted_end:
+                current.append(span)
+                overlap_only = True
+                continue
+            if overlap_only:
+                while current and size(current[0][0], span[1]) > limit:
+                    current.pop(0)
+                overlap_only = False
+            elif current and size(current[0][0], span[1]) > limit:
+                chunks.append((current[0][0], current[-1][1]))
+                # Carry trailing sentences into the next chunk as overlap while the new sentence still fits
+                kept = []
+                for previous in reversed(current[1:]):
+                    if current[-1][1] - previous[0] > self.overlap:
+                        break
+                    kept.insert(0, previous)
+                while kept and size(kept[0][0], span[1]) > limit:
+                    kept.pop(0)
+                current = kept
+            current.append(span)
+        if final:
+            if current and not overlap_only:
+                chunks.append((current[0][0], current[-1][1]))
+            return chunks, None
+        # The open chunk (and any overlap it would carry) is re-chunked together with the next page
+        return chunks, current[0][0] if current else len(text)
+
+    def chunk(self, text):
+        """
+        Split text into chunks
+
+        Args:
+            text (str): Text to split
+
+        Returns:
+            list: Chunk dicts with "text", "start" and "end" character offsets
+        """
+        return [
+            {"text": chunk["text"], "start": chunk["start"], "end": chunk["end"]}
+            for chunk in self.chunk_pages([(1, text)])
+        ]
+
+    def chunk_pages(self, pages, stats=None):
+        """
+        Split a stream of pages into chunks incrementally
+
+        Offsets are into the document text as read_pdf returns it, i.e. pages joined with a single space.
+
+        Args:
+            pages (iterable): (page_number, text) tuples, e.g. from iter_pdf_pages
+            stats (dict): Optional dict that receives "pages" and "chunk_seconds" (time spent chunking)
+
+        Yields:
+            dict: Chunk with "text", "start", "end" and "page" (the page the chunk starts on)
+        """
+        carry = ""
+        carry_offset = 0
+        # Whether the carry starts inside a sentence that was split because it was too long
+        carry_continued = False
+        # Document offset where the last emitted chunk ends, text before it in the carry is only overlap
+        emitted_end = 0
+        # Document offset where each page starts, and its page number
+        page_starts = []
+        page_numbers = []
+        document_length = 0
+        seconds = 0.0
+        page_count = 0
+        for page_number, page_text in pages:
+            started = time.perf_counter()
+            page_count += 1
+            page_start = document_length + (1 if page_starts else 0)
+            page_starts.append(page_start)
+            page_numbers.append(page_number)
+            document_length = page_start + len(page_text)
+            # Only the unfinished tail of the previous page is rescanned, so total work stays linear
+            buffer = carry + " " * (page_start - carry_offset - len(carry)) + page_text
+            spans = sentence_spans(buffer, carry_continued)
+            chunks, rest = self._pack(buffer, spans, final=False, emitted_end=emitted_end - carry_offset)
+            carry_continued = rest < len(buffer) and rest not in {start for start, _ in spans}
+            emitted = [self._make_chunk(buffer, carry_offset, span, page_starts, page_numbers) for span in chunks]
+            if chunks:
+                emitted_end = carry_offset + chunks[-1][1]
+            carry_offset, carry = carry_offset + rest, buffer[rest:]
+            seconds += time.perf_counter() - started
+            for chunk in emitted:
+                if chunk is not None:
+                    yield chunk
+        started = time.perf_counter()
+        spans = sentence_spans(carry, carry_continued)
+        chunks, _ = self._pack(carry, spans, final=True, emitted_end=emitted_end - carry_offset)
+        emitted = [self._make_chunk(carry, carry_offset, span, page_starts, page_numbers) for span in chunks]
+        seconds += time.perf_counter() - started
+        metrics.observe("chunking", seconds)
+        if stats is not None:
+            stats["pages"] = stats.get("pages", 0) + page_count
+            stats["chunk_seconds"] = stats.get("chunk_seconds", 0.0) + seconds
+        for chunk in emitted:
+            if chunk is not None:
+                yield chunk
+
+    def _make_chunk(self, buffer, buffer_offset, span, page_starts, page_numbers):
+        """Build a chunk dict in document coordinates, or None if it is not longer than min_chunk_size"""
+        start, end = span
+        text = buffer[start:end]
+        if len(text) <= self.min_chunk_size:
+            return None
+        document_start = buffer_offset + start
+        page_index = max(bisect_right(page_starts, document_start) - 1, 0)
+        page = page_numbers[page_index] if page_numbers else 1
+        return {"text": text, "start": document_start, "end": buffer_offset + end, "page": page}
@@ -3,112 +3,430 @@ Simple RAG MVP
 A basic RAG system using ChromaDB and sentence transformers
 """
 
-import chromadb
-from transformers import pipeline,AutoTokenizer
+import copy
+import os
 import re
-from .utils import read_pdf, reset_database, add_pdf
+import numpy as np
+from .batching import SearchBatcher
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .chunking import SentenceChunker
+from .embeddings import SentenceTransformerEmbedder
+from .maintenance import MaintenanceScheduler, StorageSummary
+from .manifest import IngestManifest
+from .metrics import metrics, enable_metrics
+from .models import check_inference_backend, get_tokenizer, get_qa_pipeline
+from .query_cache import QueryCache
+from .rerank import create_reranker
+from .utils import read_pdf, iter_pdf_pages, reset_database, add_pdf, remove_pdf
+from .vector_index import NumpyVectorStore
+
+# Similarity is reported as 1 - distance, so the collection must use cosine distance rather than Chroma's default l2
+COLLECTION_METADATA = {"hnsw:space": "cosine"}
 
 class SimpleRAG:
     
-    def __init__(self, embedding_model='sentence-transformers/paraphrase-multilingual-mpnet-base-v2',pipeline_model='deepset/roberta-base-squad2',device=-1):
+    def __init__(self, embedding_model='sentence-transformers/paraphrase-multilingual-mpnet-base-v2',pipeline_model='deepset/roberta-base-squad2',device=-1,
+                 embedding_batch_size=32, normalize_embeddings=True, embedding_storage_dtype="float32",
+                 embedding_cache_dir="./data/embedding_cache", embedding_cache_size=50000, persist_directory="./data/vector_db",
+                 chunk_size=200, chunk_overlap=0, chunk_token_budget=None,
+                 query_cache_size=256, query_cache_ttl=600, semantic_cache_threshold=0.95,
+                 search_batch_size=16, search_batch_wait_ms=5, collect_metrics=False, vector_store="chroma",
+                 hybrid_search=True, reranker=None, reranker_model=None, rerank_candidates=30, rerank_budget_ms=None,
+                 inference_backend="torch", model_cache_dir="./data/model_cache", collection_name="documents", embedder=None,
+                 maintenance_interval=None):
         try: 
             self.embedding_model = embedding_model
             self.pipeline_model = pipeline_model
-            # ChromaDB 0.3.29 uses different API to current version but this config is compatabile with deployed Streamlit
-            self.client = chromadb.Client(chromadb.config.Settings(
-                chroma_db_impl="duckdb+parquet",
-                persist_directory="./data/vector_db"
-            ))
-            self.collection = self.client.get_or_create_collection("documents")
-            
-            try:
-                self.qa_pipeline = pipeline(
-                    "question-answering",
-                    model=pipeline_model,
-                    tokenizer=pipeline_model,
-                    device=-1
-                )
-                print(f"✅ QA pipeline loaded: {pipeline_model}")
-            except Exception as e:
-                print(f"❌ Failed to load QA pipeline '{pipeline_model}': {e}")
-                print("💡 Try using a valid model like 'deepset/roberta-base-squad2'")
-                raise
-                
+            check_inference_backend(inference_backend, device)
+            # One embedder shared by ingestion and search so documents and queries live in the same vector space,
+            # pass embedder to share it (and its on-disk cache) between several SimpleRAG instances.
+            # embedding_storage_dtype only applies to the embedding cache, the vector store always keeps float32
+            self.embedder = embedder or SentenceTransformerEmbedder(
+                embedding_model,
+                device=device,
+                batch_size=embedding_batch_size,
+                normalize=normalize_embeddings,
+                storage_dtype=embedding_storage_dtype,
+                cache_dir=embedding_cache_dir,
+                cache_size=embedding_cache_size,
+                backend=inference_backend,
+                model_cache_dir=model_cache_dir
+            )
+            # Chunks are cut from the original text, the embedding model's tokenizer is only used for a token budget
+            self.chunker = SentenceChunker(
+                max_chunk_size=chunk_size,
+                overlap=chunk_overlap,
+                token_budget=chunk_token_budget,
+                tokenizer_name=embedding_model if chunk_token_budget is not None else None
+            )
+            self.vector_store = vector_store
+            self.collection_name = collection_name
+            self.client = self._create_client(vector_store, persist_directory)
+            self.collection = self.open_collection()
+            # Records which documents are indexed so re-ingestion only touches what changed
+            self.persist_directory = persist_directory
+            self.manifest = IngestManifest(self._collection_file("manifest.json"))
+            # Storage size and vector count, refreshed when the index is written so reads never walk the directory
+            self.storage = StorageSummary(persist_directory, self._collection_file("storage.json"))
+            # BM25 index over the same chunks, fused with vector results so exact terms and section numbers are found
+            self.hybrid_search = hybrid_search
+            self.lexical_index = BM25Index(self._collection_file("bm25.npz"))
+            self._sync_lexical_index()
+            if not os.path.exists(self.storage.path):
+                self.storage.refresh(self.collection.count())
+            # Optional rerank stage: over-fetch rerank_candidates chunks and send only the best n_results to QA
+            self.reranker = create_reranker(reranker, reranker_model, device)
+            self.rerank_candidates = rerank_candidates
+            self.rerank_budget_ms = rerank_budget_ms
+            self.device = device
+            # "torch", "torch-int8", "onnx" or "onnx-int8" for the QA and embedding models, converted models are cached on disk
+            self.inference_backend = inference_backend
+            self.model_cache_dir = model_cache_dir
+            # Repeated and near-duplicate queries are answered from cache until the collection changes
+            self.query_cache = QueryCache(query_cache_size, query_cache_ttl, semantic_cache_threshold) if query_cache_size else None
+            # Concurrent asearch calls are micro-batched by a scheduler started on first use
+            self.batcher = SearchBatcher(self, max_batch_size=search_batch_size, max_wait_ms=search_batch_wait_ms)
+            # Per-stage timings and counters, shared process-wide and free when disabled
+            self.metrics = enable_metrics() if collect_metrics else metrics
+            # Optional background orphan cleanup and compaction every maintenance_interval seconds
+            self.maintenance = MaintenanceScheduler(self, maintenance_interval) if maintenance_interval else None
+            if self.maintenance is not None:
+                self.maintenance.start()
+            # Models are loaded lazily from the process-wide registry, call warmup() to load them up front
             print(f"✅ RAG system ready.")
         except Exception as e:
             print(f"❌ Error initializing RAG system: {e}")
             raise
     
-    def chunk_text(self, text, max_chunk_size=200):
-        """Split text into sentence chunks. Currently a custom utility, could be replaced with another library that handles sentence splitting."""
-        
-        # Use the same embedding model as the document embedding
-        tokenizer = AutoTokenizer.from_pretrained(self.embedding_model)
-        
-        # Split text into sentences using tokenizer
-        # The tokenizer can help identify sentence boundaries more accurately
-        tokens = tokenizer.tokenize(text)
+    @staticmethod
+    def _create_client(vector_store, persist_directory):
+        """Create the vector store client, "chroma" for ChromaDB or "numpy" for the in-process memory-mapped index"""
+        if vector_store == "numpy":
+            return NumpyVectorStore(persist_directory)
+        if vector_store != "chroma":
+            raise ValueError(f"Unknown vector store '{vector_store}', expected 'chroma' or 'numpy'")
+        import chromadb
+        # ChromaDB 0.3.29 uses different API to current version but this config is compatabile with deployed Streamlit
+        return chromadb.Client(chromadb.config.Settings(
+            chroma_db_impl="duckdb+parquet",
+            persist_directory=persist_directory
+        ))
+    
+    def _collection_file(self, filename):
+        """Path of a file kept next to the collection, prefixed with the collection name unless it is the default"""
+        if self.collection_name != "documents":
+            filename = f"{self.collection_name}.{filename}"
+        return os.path.join(self.persist_directory, filename)
+    
+    def open_collection(self, create=False):
+        """Get (or create with create=True) the collection configured with the shared embedder"""
+        if create:
+            return self.client.create_collection(self.collection_name, metadata=COLLECTION_METADATA, embedding_function=self.embedder)
+        return self.client.get_or_create_collection(self.collection_name, metadata=COLLECTION_METADATA, embedding_function=self.embedder)
+    
+    def _sync_lexical_index(self):
+        """Rebuild the BM25 index from the collection if it is missing or out of step, e.g. for an index built before it existed"""
+        if len(self.lexical_index) == self.collection.count():
+            return
+        stored = self.collection.get(include=["documents"])
+        self.lexical_index.clear()
+        self.lexical_index.upsert(stored["ids"], stored["documents"])
+        self.save_indexes()
+        print(f"🔤 Rebuilt lexical index for {len(self.lexical_index)} chunks")
+    
+    def save_indexes(self):
+        """Save the lexical index and refresh the storage summary, called once a write is complete"""
+        self.lexical_index.save()
+        self.storage.refresh(self.collection.count())
+    
+    def collection_changed(self):
+        """Invalidate everything derived from the collection contents, called after every write"""
+        if self.query_cache is not None:
+            self.query_cache.clear()
+    
+    def _sync_external_writes(self):
+        """Pick up writes saved by another process: reload the lexical index and drop cached results when it changed"""
+        if self.lexical_index.reload_if_changed():
+            self.collection_changed()
+    
+    @property
+    def qa_pipeline(self):
+        """Shared QA pipeline, loaded on first use"""
+        try:
+            return get_qa_pipeline(self.pipeline_model, self.device, self.inference_backend, self.model_cache_dir)
+        except Exception as e:
+            print(f"❌ Failed to load QA pipeline '{self.pipeline_model}': {e}")
+            print("💡 Try using a valid model like 'deepset/roberta-base-squad2'")
+            raise
+    
+    def warmup(self):
+        """Load all models and run a dummy query so the first real request runs at steady-state latency"""
+        if self.chunker.token_budget is not None:
+            get_tokenizer(self.embedding_model).tokenize("Warm up the tokenizer.")
+        self.embedder.encode(["Warm up the embedding model."])
+        if self.reranker is not None:
+            self.reranker.warmup()
+        query = "How many levels is Company data classified?"
+        if self.collection.count() > 0:
+            # Run the full query path so the vector index is loaded as well
+            self.search(query, n_results=1)
+        else:
+            self._extract_answer_with_transformers(query, "1.1 Company data is classified into three levels: Public, Internal, and Confidential.")
+        print(f"🔥 RAG system warmed up.")
+    
+    def chunk_text(self, text, max_chunk_size=None):
+        """Split text into sentence chunks, returning the chunk texts"""
+        chunker = self.chunker
+        if max_chunk_size is not None and max_chunk_size != chunker.max_chunk_size:
+            chunker = SentenceChunker(max_chunk_size, chunker.overlap, chunker.min_chunk_size, chunker.token_budget, chunker.tokenizer_name)
+        return [chunk["text"] for chunk in chunker.chunk(text)]
+    
+    def chunk_pages(self, pages, stats=None):
+        """Split a stream of (page_number, text) pages into chunk dicts with text, character offsets and page"""
+        return self.chunker.chunk_pages(pages, stats)
+    
+    def search(self, query, n_results=5, qa_batch_size=8, min_similarity=None, early_stop_margin=None, use_cache=True):
+        """Search for relevant documents and extract answers with citations
+
+        Answers are extracted in batched QA passes over all retrieved chunks instead of one forward pass per chunk.
+        Chunks below min_similarity are not sent to the QA model, and once the best answer score leads the runner-up
+        by early_stop_margin the remaining batches are skipped. Skipped chunks are still returned with an empty answer.
+        Results are served from the query cache for repeated or near-duplicate queries unless use_cache is False.
+        """
+        return self.search_batch([query], n_results, qa_batch_size, min_similarity, early_stop_margin, use_cache)[0]
+    
+    async def asearch(self, query, n_results=5):
+        """Search from asyncio code, concurrent calls are micro-batched into one search_batch call"""
+        return await self.batcher.asearch(query, n_results)
+    
+    def search_batch(self, queries, n_results=5, qa_batch_size=8, min_similarity=None, early_stop_margin=None, use_cache=True):
+        """Search for several queries at once, returning one list of search results per query
+
+        Queries missing from the cache are embedded in one call, retrieved with one multi-query collection lookup,
+        optionally reranked down to n_results, and answered in one batched QA pass over every (query, chunk) pair. With early_stop_margin QA runs query by query,
+        because early stopping depends on each query's own answer scores.
+        """
+        self._sync_external_writes()
+        cache = self.query_cache if use_cache else None
+        cache_params = (n_results, min_similarity, early_stop_margin)
+        search_results = [None] * len(queries)
+        if cache is not None:
+            for i, query in enumerate(queries):
+                search_results[i] = cache.get(query, cache_params)
         
-        # Reconstruct text from tokens to get proper sentence boundaries
-        reconstructed_text = tokenizer.convert_tokens_to_string(tokens)
+        pending = [i for i in range(len(queries)) if search_results[i] is None]
+        self.metrics.increment("query_cache_exact_hits", len(queries) - len(pending))
+        if not pending:
+            return search_results
+        with self.metrics.timer("query_embedding"):
+            query_embeddings = self.embedder.encode([queries[i] for i in pending])
+        if cache is not None:
+            for row, i in enumerate(pending):
+                search_results[i] = cache.get_similar(query_embeddings[row], cache_params)
+            rows = [row for row, i in enumerate(pending) if search_results[i] is None]
+            self.metrics.increment("query_cache_semantic_hits", len(pending) - len(rows))
+            pending, query_embeddings = [pending[row] for row in rows], query_embeddings[rows]
+        if not pending:
+            return search_results
+        self.metrics.increment("query_cache_misses", len(pending))
         
-        # Split by sentence endings (., !, ?) but preserve section numbers
-        sentences = re.split(r'([.!?]+)', reconstructed_text)
+        pending_queries = [queries[i] for i in pending]
+        retrieved = self._retrieve_candidates(pending_queries, query_embeddings, n_results)
+        if early_stop_margin is None:
+            answers = self._extract_answers_for_queries(pending_queries, retrieved, qa_batch_size, min_similarity)
+        else:
+            answers = [
+                self._extract_answers_in_batches(query, documents, similarities, qa_batch_size, min_similarity, early_stop_margin)
+                for query, (documents, similarities, _) in zip(pending_queries, retrieved)
+            ]
         
-        chunks = []
-        current_chunk = ""
+        for row, i in enumerate(pending):
+            documents, similarities, metadatas = retrieved[row]
+            with self.metrics.timer("citation_parsing"):
+                search_results[i] = self._build_results(documents, similarities, metadatas, answers[row])
+            if cache is not None:
+                cache.put(queries[i], cache_params, query_embeddings[row], search_results[i])
+        return search_results
+    
+    def search_stream(self, query, n_results=5, min_similarity=None, use_cache=True, stream_batch_size=1):
+        """Search for one query, yielding events as results become available instead of waiting for every answer
+
+        Yields {"event": "hits", "results": [...]} as soon as retrieval is done (answers still empty), then
+        {"event": "answer", "index": i, "answer": ..., "score": ...} for each chunk in rank order as its QA pass completes,
+        and finally {"event": "done", "results": [...]} with the same results search() returns.
+        """
+        self._sync_external_writes()
+        cache = self.query_cache if use_cache else None
+        cache_params = (n_results, min_similarity, None)
+        cached = cache.get(query, cache_params) if cache is not None else None
+        query_embeddings = None
+        if cached is None:
+            with self.metrics.timer("query_embedding"):
+                query_embeddings = self.embedder.encode([query])
+            if cache is not None:
+                cached = cache.get_similar(query_embeddings[0], cache_params)
+        if cached is not None:
+            self.metrics.increment("query_cache_exact_hits" if query_embeddings is None else "query_cache_semantic_hits")
+            yield {"event": "hits", "results": cached}
+            yield {"event": "done", "results": cached}
+            return
+        self.metrics.increment("query_cache_misses")
         
-        chunk = ""
-        for i in range(0, len(sentences), 2):
-            sentence = sentences[i]
-            punctuation = sentences[i + 1] if i + 1 < len(sentences) else ""
-            full_sentence = sentence + punctuation
-            if len(chunk + full_sentence) <= max_chunk_size:
-                chunk += full_sentence + " "
-            else:
-                if chunk.strip():
-                    chunks.append(chunk.strip())
-                chunk = full_sentence + " "
-        if chunk.strip():
-            chunks.append(chunk.strip())
-        chunks = [c for c in chunks if len(c.strip()) > 50]
-        return chunks
-    
-    def search(self, query, n_results=5):
-        """Search for relevant documents and extract answers with citations"""
-        # Query the ChromaDB collection for the 5 most relevant document chunks to the input query withdistances (similarity scores), and metadata.
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results,
-            include=["documents", "distances", "metadatas"]
-        )
+        documents, similarities, metadatas = self._retrieve_candidates([query], query_embeddings, n_results)[0]
+        with self.metrics.timer("citation_parsing"):
+            results = self._build_results(documents, similarities, metadatas, [""] * len(documents))
+        yield {"event": "hits", "results": copy.deepcopy(results)}
         
-        documents = results["documents"][0]
-        distances = results["distances"][0]
-        # Get the metadata for each document result; if not present, assign a default section label
-        metadatas = results["metadatas"][0] if results["metadatas"] else [{"section": ""} for _ in documents]
+        # Small QA batches in rank order, so the most promising answer arrives first
+        candidates = [i for i in range(len(documents)) if min_similarity is None or similarities[i] >= min_similarity]
+        for start in range(0, len(candidates), stream_batch_size):
+            batch = candidates[start:start + stream_batch_size]
+            extracted = self._extract_answers_with_transformers([query] * len(batch), [documents[i] for i in batch], stream_batch_size)
+            for i, result in zip(batch, extracted):
+                results[i]["answer"] = result["answer"]
+                yield {"event": "answer", "index": i, "answer": result["answer"], "score": float(result["score"])}
+        if cache is not None:
+            cache.put(query, cache_params, query_embeddings[0], results)
+        yield {"event": "done", "results": results}
+    
+    def retrieve(self, query, n_results=5, query_embedding=None):
+        """Retrieve one query's candidate chunks best first, without QA
+
+        With a reranker, rerank_candidates chunks are returned for rerank() to cut down to n_results. Pass
+        query_embedding to reuse one embedding across several instances sharing the embedder.
+
+        Returns:
+            tuple: (documents, similarities, metadatas) in hybrid rank order
+        """
+        self._sync_external_writes()
+        if query_embedding is None:
+            with self.metrics.timer("query_embedding"):
+                query_embedding = self.embedder.encode([query])
+        query_embeddings = np.atleast_2d(query_embedding)
+        return self._retrieve(query_embeddings, self._candidate_count(n_results), [query] if self.hybrid_search else None)[0]
+    
+    def rerank(self, query, candidates, n_results=5):
+        """Rerank one query's candidate chunks down to n_results, or return them unchanged without a reranker
+
+        Returns:
+            tuple: (documents, similarities, metadatas) best first
+        """
+        return self._rerank([query], [candidates], n_results)[0]
+    
+    def answer(self, query, candidates, n_results=5, qa_batch_size=8, min_similarity=None):
+        """Extract answers with citations for the top n_results candidate chunks, the last step of search()
+
+        Args:
+            query (str): Search query
+            candidates (tuple): (documents, similarities, metadatas) best first, e.g. from retrieve() and rerank()
+            n_results (int): Number of results
+            qa_batch_size (int): QA pipeline batch size
+            min_similarity (float): Skip QA for chunks below this similarity
+
+        Returns:
+            list: Search result dicts like search(), in candidate order
+        """
+        documents, similarities, metadatas = (list(values)[:n_results] for values in candidates)
+        answers = self._extract_answers_for_queries([query], [(documents, similarities, metadatas)], qa_batch_size, min_similarity)[0]
+        with self.metrics.timer("citation_parsing"):
+            return self._build_results(documents, similarities, metadatas, answers)
+    
+    def close(self):
+        """Persist the index (where the store needs it) and stop the background threads"""
+        persist = getattr(self.client, "persist", None)
+        if persist is not None:
+            persist()
+        self.save_indexes()
+        self.batcher.stop()
+        if self.maintenance is not None:
+            self.maintenance.stop()
+    
+    def _retrieve_candidates(self, queries, query_embeddings, n_results):
+        """Retrieve the chunks to answer from for each query: hybrid retrieval, then optional reranking down to n_results"""
+        retrieved = self._retrieve(query_embeddings, self._candidate_count(n_results), queries if self.hybrid_search else None)
+        return self._rerank(queries, retrieved, n_results)
+    
+    def _candidate_count(self, n_results):
+        """Number of chunks to retrieve per query, over-fetched when a reranker picks the best n_results"""
+        return max(n_results, self.rerank_candidates) if self.reranker is not None else n_results
+    
+    def _rerank(self, queries, retrieved, n_results):
+        """Rerank retrieved (documents, similarities, metadatas) per query down to n_results, if a reranker is set"""
+        if self.reranker is None:
+            return retrieved
+        with self.metrics.timer("rerank"):
+            return self.reranker.rerank(queries, retrieved, n_results, self.rerank_budget_ms)
+    
+    def _retrieve(self, query_embeddings, n_results, queries=None):
+        """Query the collection for several embedded queries, returning (documents, similarities, metadatas) per query
+
+        When the query texts are given, vector and BM25 candidates are fused with reciprocal rank fusion.
+        """
+        # Over-fetch vector candidates for fusion so chunks ranked well by both retrievers can rise to the top
+        n_candidates = n_results * 2 if queries is not None else n_results
+        # Query the ChromaDB collection for the n_results most relevant document chunks to each query with distances (similarity scores), and metadata.
+        with self.metrics.timer("vector_lookup"):
+            results = self.collection.query(
+                query_embeddings=query_embeddings.tolist(),
+                n_results=n_candidates,
+                include=["documents", "distances", "metadatas"]
+            )
         
-        # For each retrieved document, extract a specific answer and citation
+        retrieved = []
+        for row, documents in enumerate(results["documents"]):
+            distances = results["distances"][row]
+            similarities = [1 - distance if distance is not None else 0 for distance in distances]
+            # Get the metadata for each document result; if not present, assign a default section label
+            metadatas = results["metadatas"][row] if results["metadatas"] else [{"section": ""} for _ in documents]
+            if queries is not None:
+                candidates = dict(zip(results["ids"][row], zip(documents, similarities, metadatas)))
+                documents, similarities, metadatas = self._fuse_lexical(
+                    queries[row], query_embeddings[row], results["ids"][row], candidates, n_results, n_candidates
+                )
+            retrieved.append((documents, similarities, metadatas))
+        return retrieved
+    
+    def _fuse_lexical(self, query, query_embedding, vector_ids, candidates, n_results, n_candidates):
+        """Fuse vector-ranked chunk ids with BM25 results, returning the top n_results as (documents, similarities, metadatas)"""
+        with self.metrics.timer("lexical_lookup"):
+            lexical_ids = [chunk_id for chunk_id, _ in self.lexical_index.search(query, n_candidates)]
+            fused = [chunk_id for chunk_id, _ in reciprocal_rank_fusion([vector_ids, lexical_ids])[:n_results]]
+            missing = [chunk_id for chunk_id in fused if chunk_id not in candidates]
+            if missing:
+                # Chunks found only by BM25 get their cosine similarity from the stored embeddings
+                stored = self.collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+                for chunk_id, document, metadata, embedding in zip(stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]):
+                    embedding = np.asarray(embedding, dtype=np.float32)
+                    norms = float(np.linalg.norm(embedding) * np.linalg.norm(query_embedding)) or 1.0
+                    candidates[chunk_id] = (document, float(np.dot(embedding, query_embedding)) / norms, metadata)
+        fused = [candidates[chunk_id] for chunk_id in fused if chunk_id in candidates]
+        return [item[0] for item in fused], [item[1] for item in fused], [item[2] for item in fused]
+    
+    def _build_results(self, documents, similarities, metadatas, answers):
+        """Assemble the search result dicts with answers and citations"""
+        # For each retrieved document, assemble the answer and citation
         search_results = []
         for i, doc in enumerate(documents):
-            # Extract potential answer from document using transformers
-            answer = self._extract_answer_with_transformers(query, doc)
+            answer = answers[i]
+            metadata = metadatas[i] if i < len(metadatas) and isinstance(metadatas[i], dict) else {}
+            doc_title = metadata.get("document_title", "")
             
-            # Custom extraction section number and title from the document. This could be replaced with a more robust solution
-            # Look for pattern like "1." or "1.1"
-            section_match = re.search(r"\b((?:\d+\.)+\d*)\s*(.+)", doc)
+            # Chunks ingested with section metadata cite it directly, even when they start mid-section
+            if metadata.get("section_number"):
+                section_num, section_title = metadata["section_number"], metadata.get("section_title", "")
+                section_match = True
+            else:
+                # Legacy chunks: extract the section number and title from the document. Look for pattern like "1." or "1.1"
+                section_match = re.search(r"\b((?:\d+\.)+\d*)\s*(.+)", doc)
+                if section_match:
+                    section_num = section_match.group(1).rstrip('.')
+                    section_title = section_match.group(2).split('.')[0].strip()  # Take first sentence as title
             if section_match:
-                section_num = section_match.group(1).rstrip('.')
-                section_title = section_match.group(2).split('.')[0].strip()  # Take first sentence as title
-                # Try to get document title from metadata if available
-                doc_title = metadatas[i].get("document_title", "") if i < len(metadatas) and isinstance(metadatas[i], dict) else ""
                 if doc_title:
                     citation = f"{doc_title}.pdf - Section {section_num}. {section_title}"
                 else:
                     citation = f"Section {section_num}. {section_title}"
             else:
-                # Try to get document title from metadata if available
-                doc_title = metadatas[i].get("document_title", "") if i < len(metadatas) and isinstance(metadatas[i], dict) else ""
                 if doc_title:
                     citation = f"{doc_title} - Section not found"
                 else:
@@ -116,27 +434,78 @@ class SimpleRAG:
             # Assemble the search results
             search_results.append({
                 "text": doc,
-                "similarity": 1 - distances[i] if distances[i] is not None else 0,
+                "similarity": similarities[i],
                 "answer": answer,
                 "citation": citation
             })
         
         return search_results
     
-    def _extract_answer_with_transformers(self, query, document):
-        """Extract answer using transformers QA pipeline"""
+    def _extract_answers_for_queries(self, queries, retrieved, batch_size=8, min_similarity=None):
+        """Run one batched QA pass over the (query, document) pairs of several queries ("" for skipped documents)"""
+        answers = [[""] * len(documents) for documents, _, _ in retrieved]
+        pairs = [
+            (row, i)
+            for row, (documents, similarities, _) in enumerate(retrieved)
+            for i in range(len(documents))
+            if min_similarity is None or similarities[i] >= min_similarity
+        ]
+        extracted = self._extract_answers_with_transformers(
+            [queries[row] for row, _ in pairs],
+            [retrieved[row][0][i] for row, i in pairs],
+            batch_size
+        )
+        for (row, i), result in zip(pairs, extracted):
+            answers[row][i] = result["answer"]
+        return answers
+    
+    def _extract_answers_in_batches(self, query, documents, similarities, batch_size=8, min_similarity=None, early_stop_margin=None):
+        """Run batched QA over the retrieved documents, returning one answer per document ("" when skipped)"""
+        answers = [""] * len(documents)
+        # Documents arrive in retrieval rank order, so the most promising chunks are extracted first
+        candidates = [i for i in range(len(documents)) if min_similarity is None or similarities[i] >= min_similarity]
+        scores = []
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            extracted = self._extract_answers_with_transformers([query] * len(batch), [documents[i] for i in batch], batch_size)
+            for i, result in zip(batch, extracted):
+                answers[i] = result["answer"]
+                scores.append(result["score"])
+            # Stop once the best answer is clearly ahead of every other answer extracted so far
+            if early_stop_margin is not None and start + batch_size < len(candidates):
+                ranked = sorted(scores, reverse=True)
+                runner_up = ranked[1] if len(ranked) > 1 else 0
+                if ranked[0] - runner_up >= early_stop_margin:
+                    break
+        return answers
+    
+    def _extract_answers_with_transformers(self, queries, documents, batch_size=8):
+        """Extract answers for (query, document) pairs in a single batched transformers QA pipeline call"""
         if self.qa_pipeline is None:
             raise Exception("QA pipeline is not available")
+        if not documents:
+            return []
         
-        # Use transformers QA pipeline
-        result = self.qa_pipeline(
-            question=query,
-            context=document,
-            max_answer_len=50,
-            handle_impossible_answer=True
-        )
+        # Use transformers QA pipeline over all pairs at once
+        qa_pipeline = self.qa_pipeline
+        with self.metrics.timer("qa_extraction"):
+            results = qa_pipeline(
+                question=list(queries),
+                context=list(documents),
+                batch_size=batch_size,
+                max_answer_len=50,
+                handle_impossible_answer=True
+            )
+        self.metrics.increment("qa_extractions", len(documents))
         
+        # The pipeline returns a single dict rather than a list when given one pair
+        if isinstance(results, dict):
+            results = [results]
+        return results
+    
+    def _extract_answer_with_transformers(self, query, document):
+        """Extract answer using transformers QA pipeline"""
         # Return the extracted answer
-        return result['answer']
+        return self._extract_answers_with_transformers([query], [document])[0]['answer']
          
     
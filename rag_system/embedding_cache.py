@@ -0,0 +1,239 @@
+"""
+Persistent content-addressed embedding cache
+Chunk embeddings are stored in a memory-mapped array file with a small JSON index and evicted least recently used first
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from .embeddings import quantize_vectors, dequantize_vectors
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking on Windows, the per-slot key check still rejects overwritten slots
+    fcntl = None
+
+KEY_BYTES = 20
+
+
+def embedding_cache_key(text, model_name, normalize, backend="torch"):
+    """
+    Hash a chunk together with the settings that determine its embedding
+
+    Args:
+        text (str): Chunk text
+        model_name (str): Embedding model name
+        normalize (bool): Whether embeddings are normalized
+        backend (str): Inference backend, quantized backends produce slightly different embeddings
+
+    Returns:
+        str: Hex digest used as cache key
+    """
+    digest = hashlib.sha1()
+    # fp32 torch keys are unchanged so existing caches stay valid
+    settings = f"{model_name}\0{int(bool(normalize))}\0" + (f"{backend}\0" if backend != "torch" else "")
+    digest.update(settings.encode("utf-8"))
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Size-bounded on-disk LRU cache of embeddings, backed by memory-mapped vectors.npy and scales.npy files
+
+    Several processes may share a cache directory: writes take a file lock and start from the index on disk, and
+    every slot stores the key it holds in keys.npy, so a slot overwritten by another process or left half-written by
+    a crash reads as a miss instead of returning the wrong embedding.
+    """
+
+    def __init__(self, cache_dir, dimension, max_entries=50000, storage_dtype="float32"):
+        self.cache_dir = cache_dir
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.storage_dtype = storage_dtype
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._lock_path = os.path.join(cache_dir, "lock")
+        self._open()
+
+    def _open(self):
+        """Open the cache files, discarding them if they were written with different settings"""
+        self._settings = {"dimension": self.dimension, "max_entries": self.max_entries, "storage_dtype": self.storage_dtype, "keyed": True}
+        with self._file_lock():
+            index = self._read_index()
+            if index is not None and index.get("settings") != self._settings:
+                print("⚠️ Embedding cache settings changed, starting a new cache")
+                index = None
+
+            mode = "r+" if index is not None else "w+"
+            vectors_path = os.path.join(self.cache_dir, "vectors.npy")
+            scales_path = os.path.join(self.cache_dir, "scales.npy")
+            keys_path = os.path.join(self.cache_dir, "keys.npy")
+            self._vectors = np.lib.format.open_memmap(vectors_path, mode=mode, dtype=self.storage_dtype, shape=(self.max_entries, self.dimension))
+            self._scales = np.lib.format.open_memmap(scales_path, mode=mode, dtype=np.float32, shape=(self.max_entries,))
+            self._keys = np.lib.format.open_memmap(keys_path, mode=mode, dtype=np.uint8, shape=(self.max_entries, KEY_BYTES))
+            self._use_index(index or {})
+            if index is None:
+                self._write_index()
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock on the cache directory across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def _index_stamp(self):
+        try:
+            stat = os.stat(self._index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _read_index(self):
+        """Read index.json, returning None if it is missing or unreadable"""
+        self._stamp = self._index_stamp()
+        try:
+            with open(self._index_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _use_index(self, index):
+        # Entries are kept in least to most recently used order
+        self._entries = OrderedDict((key, slot) for key, slot in index.get("entries", []))
+        used = set(self._entries.values())
+        self._free = [slot for slot in range(self.max_entries - 1, -1, -1) if slot not in used]
+
+    def _reload_if_changed(self):
+        """Pick up entries written by another process since this one last read or wrote the index"""
+        if self._index_stamp() != self._stamp:
+            index = self._read_index()
+            if index is not None and index.get("settings") == self._settings:
+                self._use_index(index)
+
+    def _write_index(self):
+        index = {"settings": self._settings, "entries": list(self._entries.items())}
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(index, file)
+        os.replace(tmp_path, self._index_path)
+        self._stamp = self._index_stamp()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, keys):
+        """
+        Look up embeddings for keys
+
+        Args:
+            keys (list): Cache keys from embedding_cache_key
+
+        Returns:
+            dict: Position in keys -> float32 embedding, for the keys that were cached
+        """
+        found = {}
+        with self._lock:
+            self._reload_if_changed()
+            slots = []
+            for position, key in enumerate(keys):
+                slot = self._entries.get(key)
+                if slot is None:
+                    continue
+                slots.append((position, key, slot))
+            if slots:
+                rows = np.array([slot for _, _, slot in slots])
+                vectors = dequantize_vectors(self._vectors[rows], self._scales[rows])
+                # Read after the vectors, a slot rewritten meanwhile no longer carries the key
+                stored_keys = np.array(self._keys[rows])
+                for (position, key, _), vector, stored_key in zip(slots, vectors, stored_keys):
+                    if stored_key.tobytes() != bytes.fromhex(key):
+                        del self._entries[key]
+                        continue
+                    self._entries.move_to_end(key)
+                    found[position] = vector
+                self._dirty = True
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, keys, vectors):
+        """
+        Store embeddings, evicting the least recently used entries when the cache is full
+
+        Args:
+            keys (list): Cache keys from embedding_cache_key
+            vectors (np.ndarray): float32 array of shape (len(keys), dimension)
+        """
+        if not len(keys):
+            return
+        stored, scales = quantize_vectors(vectors, self.storage_dtype)
+        # A key repeated in one call is stored once
+        items = dict(zip(keys, zip(stored, scales)))
+        if len(items) > self.max_entries:
+            # Only the last max_entries of a batch larger than the cache would survive eviction anyway
+            items = dict(list(items.items())[-self.max_entries:])
+        with self._lock, self._file_lock():
+            # Start from the index on disk so slots handed out by another process are not reused
+            self._reload_if_changed()
+            slots = []
+            evicted = False
+            for key in items:
+                slot = self._entries.pop(key, None)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        _, slot = self._entries.popitem(last=False)
+                        evicted = True
+                slots.append(slot)
+            if evicted:
+                # Unreference the evicted slots on disk before they are overwritten
+                self._write_index()
+            for (key, (vector, scale)), slot in zip(items.items(), slots):
+                self._keys[slot] = 0
+                self._vectors[slot] = vector
+                self._scales[slot] = scale
+                self._keys[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                self._entries[key] = slot
+            self._vectors.flush()
+            self._scales.flush()
+            self._keys.flush()
+            self._write_index()
+
+    def flush(self):
+        """Write the recency order of the entries to disk, entries themselves are written by put_many"""
+        with self._lock, self._file_lock():
+            if not self._dirty:
+                return
+            if self._index_stamp() != self._stamp:
+                # Another process wrote meanwhile, its index wins over this process's recency updates
+                self._reload_if_changed()
+                self._dirty = False
+                return
+            self._write_index()
+
+    def clear(self):
+        """Remove all entries from the cache"""
+        with self._lock, self._file_lock():
+            self._entries.clear()
+            self._free = list(range(self.max_entries - 1, -1, -1))
+            self._write_index()
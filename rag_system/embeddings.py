@@ -0,0 +1,174 @@
+"""
+Embedding backends for the RAG system
+The same embedder is used for documents at ingest time and for queries at search time
+"""
+
+import hashlib
+import re
+
+import numpy as np
+from .metrics import metrics
+from .models import DEFAULT_MODEL_CACHE_DIR, get_embedding_model
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+def quantize_vectors(vectors, storage_dtype="float32"):
+    """
+    Convert float32 vectors to a compact storage dtype
+
+    Args:
+        vectors (np.ndarray): float32 array of shape (n, dim)
+        storage_dtype (str): One of "float32", "float16" or "int8"
+
+    Returns:
+        tuple: (stored array, float32 per-row scales), scales are 1.0 unless storage_dtype is "int8"
+
+    Raises:
+        ValueError: If storage_dtype is not supported
+    """
+    if storage_dtype not in STORAGE_DTYPES:
+        raise ValueError(f"Unsupported storage dtype '{storage_dtype}', expected one of {STORAGE_DTYPES}")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.ones(len(vectors), dtype=np.float32)
+    if storage_dtype == "int8":
+        # Symmetric per-row scaling so the largest component maps to +/-127
+        max_abs = np.abs(vectors).max(axis=1) if vectors.size else scales
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+        stored = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return stored, scales
+    return vectors.astype(storage_dtype), scales
+
+
+def dequantize_vectors(stored, scales=None):
+    """
+    Convert stored vectors back to float32
+
+    Args:
+        stored (np.ndarray): Array produced by quantize_vectors
+        scales (np.ndarray): Per-row scales produced by quantize_vectors
+
+    Returns:
+        np.ndarray: float32 array of shape (n, dim)
+    """
+    vectors = np.asarray(stored).astype(np.float32)
+    if scales is not None and stored.dtype == np.int8:
+        vectors *= np.asarray(scales, dtype=np.float32)[:, None]
+    return vectors
+
+
+class SentenceTransformerEmbedder:
+    """Batched sentence-transformers embedder returning normalized float32 NumPy arrays"""
+
+    def __init__(self, model_name, device=-1, batch_size=32, normalize=True, storage_dtype="float32", cache_dir=None, cache_size=50000,
+                 backend="torch", model_cache_dir=DEFAULT_MODEL_CACHE_DIR):
+        if storage_dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage dtype '{storage_dtype}', expected one of {STORAGE_DTYPES}")
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.storage_dtype = storage_dtype
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.backend = backend
+        self.model_cache_dir = model_cache_dir
+        self._cache = None
+
+    @property
+    def model(self):
+        """Shared sentence-transformers model, loaded on first use"""
+        return get_embedding_model(self.model_name, self.device, self.backend, self.model_cache_dir)
+
+    @property
+    def dimension(self):
+        """Embedding dimension of the model"""
+        return self.model.get_sentence_embedding_dimension()
+
+    @property
+    def cache(self):
+        """On-disk embedding cache, opened on first use, or None when no cache_dir is configured"""
+        if self._cache is None and self.cache_dir:
+            from .embedding_cache import EmbeddingCache
+            self._cache = EmbeddingCache(self.cache_dir, self.dimension, max_entries=self.cache_size, storage_dtype=self.storage_dtype)
+        return self._cache
+
+    def encode(self, texts, use_cache=False):
+        """
+        Embed texts in batches
+
+        Args:
+            texts (list): Texts to embed
+            use_cache (bool): Look up and store embeddings in the on-disk cache, only the misses are embedded
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dimension)
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        if use_cache and self.cache is not None:
+            return self._encode_with_cache(texts)
+        return self._encode_batches(texts)
+
+    def _encode_with_cache(self, texts):
+        """Embed only the texts missing from the on-disk cache and fill in the rest from it"""
+        from .embedding_cache import embedding_cache_key
+        keys = [embedding_cache_key(text, self.model_name, self.normalize, self.backend) for text in texts]
+        cached = self.cache.get_many(keys)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i, vector in cached.items():
+            vectors[i] = vector
+        if missing:
+            embedded = self._encode_batches([texts[i] for i in missing])
+            vectors[missing] = embedded
+            self.cache.put_many([keys[i] for i in missing], embedded)
+        self.cache.flush()
+        metrics.increment("embedding_cache_hits", len(cached))
+        metrics.increment("embedding_cache_misses", len(missing))
+        print(f"📦 Embedding cache: {len(cached)} hits, {len(missing)} embedded")
+        return vectors
+
+    def _encode_batches(self, texts):
+        """Embed texts with the sentence-transformers model"""
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def __call__(self, texts):
+        """ChromaDB embedding function interface, returns a list of embeddings as lists of floats"""
+        return self.encode(texts).tolist()
+
+
+class HashingEmbedder:
+    """Offline stand-in embedder hashing word unigrams into a fixed-size vector, for benchmarks and tests without model downloads"""
+
+    def __init__(self, dimension=384, normalize=True):
+        self.model_name = f"hashing-{dimension}"
+        self.dimension = dimension
+        self.normalize = normalize
+        self.batch_size = None
+        self.cache = None
+
+    def encode(self, texts, use_cache=False):
+        """Embed texts by hashing their lowercase words into dimension buckets"""
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                bucket = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest(), "little")
+                vectors[row, bucket % self.dimension] += 1.0
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms > 0, norms, 1.0)
+        return vectors
+
+    def __call__(self, texts):
+        """ChromaDB embedding function interface, returns a list of embeddings as lists of floats"""
+        return self.encode(texts).tolist()
@@ -0,0 +1,265 @@
+"""
+Parallel bulk ingestion for the RAG system
+PDFs are parsed and chunked in a process pool, embedded in batches on a single worker and written to the
+collection by a writer thread fed through a bounded queue, so memory stays flat however large the corpus is
+"""
+
+import glob
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .metrics import metrics
+from .utils import (
+    file_hash, chunk_pdf, chunk_ids_for, chunk_metadata_for, plan_document_update,
+    upsert_chunks, refresh_chunk_metadata, delete_chunks
+)
+
+
+def find_pdfs(path_or_glob):
+    """
+    Resolve a directory, glob pattern or single file to a sorted list of PDF paths
+
+    Args:
+        path_or_glob (str): Directory (searched recursively), glob pattern or PDF path
+
+    Returns:
+        list: PDF paths
+    """
+    if os.path.isdir(path_or_glob):
+        pattern = os.path.join(path_or_glob, "**", "*.pdf")
+    else:
+        pattern = path_or_glob
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+
+def ingest_root(path_or_glob):
+    """Directory that document ids are relative to: the directory itself, or the part of a glob or file path before any wildcard"""
+    if os.path.isdir(path_or_glob):
+        return path_or_glob
+    parts = []
+    for part in os.path.normpath(path_or_glob).split(os.sep):
+        if glob.has_magic(part):
+            return os.sep.join(parts) or "."
+        parts.append(part)
+    return os.path.dirname(path_or_glob) or "."
+
+
+def document_id_for(pdf_path, root):
+    """
+    Identify a document by its path relative to the ingest root without the extension
+
+    PDFs directly in the root keep the file-name id add_pdf uses, while same-named PDFs in different
+    subdirectories get distinct ids like "finance/policy" and "it/policy".
+    """
+    relative_path = os.path.splitext(os.path.relpath(pdf_path, root))[0]
+    return relative_path.replace(os.sep, "/")
+
+
+def _parse_and_chunk(pdf_path, chunker):
+    """Process pool worker: read a PDF and split it into chunks"""
+    start = time.perf_counter()
+    chunk_stats = {}
+    chunks = chunk_pdf(chunker, pdf_path, chunk_stats)
+    return chunk_stats.get("pages", 0), chunks, time.perf_counter() - start
+
+
+def _throughput(count, seconds):
+    return round(count / seconds, 1) if seconds > 0 else 0.0
+
+
+def bulk_ingest(rag_instance, path_or_glob, workers=None, batch_size=256, queue_size=4, checkpoint_documents=20):
+    """
+    Ingest a directory or glob of PDFs as a staged pipeline
+
+    Documents already in the manifest with the same content hash are skipped. Finished documents are recorded in
+    the manifest in checkpoints, each only after the collection is persisted and the lexical index saved, so an
+    interrupted run resumes after the last checkpoint without skipping documents the store never saved.
+
+    Args:
+        rag_instance: SimpleRAG instance
+        path_or_glob (str): Directory (searched recursively), glob pattern or PDF path
+        workers (int): Parsing processes, defaults to the CPU count
+        batch_size (int): Chunks per embedding batch and per collection write
+        queue_size (int): Maximum number of embedded batches waiting to be written
+        checkpoint_documents (int): Finished documents per persist and manifest checkpoint
+
+    Returns:
+        dict: Counts and per-stage throughput (pages/s, chunks/s, vectors/s)
+    """
+    pdf_paths = find_pdfs(path_or_glob)
+    root = ingest_root(path_or_glob)
+    workers = workers or os.cpu_count() or 1
+    stats = {"documents": 0, "skipped": 0, "failed": [], "pages": 0, "chunks": 0, "vectors": 0, "deleted": 0,
+             "parse_seconds": 0.0, "embed_seconds": 0.0, "write_seconds": 0.0}
+    write_queue = queue.Queue(maxsize=queue_size)
+    writer_errors = []
+    # Documents fully written to the collection but not yet persisted and recorded in the manifest
+    uncommitted = []
+
+    def checkpoint():
+        """Persist the collection and lexical index, then record the documents they now hold in the manifest"""
+        if not uncommitted:
+            return
+        rag_instance.client.persist()
+        rag_instance.lexical_index.save()
+        rag_instance.manifest.set_many(
+            (document["document_id"], document["path"], document["content_hash"], document["ids"]) for document in uncommitted
+        )
+        uncommitted.clear()
+
+    def write_batches():
+        """Writer thread: apply chunk batches and finished documents in the order they were queued"""
+        while True:
+            item = write_queue.get()
+            if item is None:
+                if not writer_errors:
+                    try:
+                        checkpoint()
+                    except Exception as e:
+                        writer_errors.append(e)
+                return
+            if writer_errors:
+                continue
+            try:
+                start = time.perf_counter()
+                if item[0] == "chunks":
+                    _, ids, documents, embeddings, metadatas = item
+                    upsert_chunks(rag_instance, ids, documents, embeddings, metadatas)
+                    stats["vectors"] += len(ids)
+                else:
+                    _, document = item
+                    refresh_chunk_metadata(rag_instance, document["kept_ids"], document["kept_metadatas"])
+                    delete_chunks(rag_instance, document["deleted"])
+                    stats["deleted"] += len(document["deleted"])
+                    uncommitted.append(document)
+                    if len(uncommitted) >= checkpoint_documents:
+                        checkpoint()
+                stats["write_seconds"] += time.perf_counter() - start
+            except Exception as e:
+                writer_errors.append(e)
+
+    # Chunks waiting to be embedded, and documents waiting for their last chunk to be written
+    pending_chunks = []
+    pending_documents = deque()
+    queued_chunks = 0
+
+    def flush(force=False):
+        """Embed and queue full batches (or everything when force is set), then queue finished documents"""
+        nonlocal pending_chunks, queued_chunks
+        while pending_chunks and (force or len(pending_chunks) >= batch_size):
+            batch, pending_chunks = pending_chunks[:batch_size], pending_chunks[batch_size:]
+            start = time.perf_counter()
+            embeddings = rag_instance.embedder.encode([chunk for _, chunk, _ in batch], use_cache=True)
+            stats["embed_seconds"] += time.perf_counter() - start
+            metrics.observe("document_embedding", time.perf_counter() - start)
+            # Blocks when the writer falls behind, which bounds memory
+            write_queue.put(("chunks", [chunk_id for chunk_id, _, _ in batch], [chunk for _, chunk, _ in batch],
+                             embeddings, [metadata for _, _, metadata in batch]))
+            queued_chunks += len(batch)
+        while pending_documents and pending_documents[0][0] <= queued_chunks:
+            write_queue.put(("document", pending_documents.popleft()[1]))
+
+    def plan(pdf_path, document_id, content_hash, chunk_records):
+        """Queue a parsed document's new chunks for embedding and record what to do once they are written"""
+        nonlocal pending_chunks
+        document_title = os.path.splitext(os.path.basename(pdf_path))[0]
+        chunks = [chunk["text"] for chunk in chunk_records]
+        ids = chunk_ids_for(document_id, chunks)
+        metadatas = chunk_metadata_for(document_id, document_title, chunk_records)
+        entry = rag_instance.manifest.get(document_id)
+        added, kept, deleted = plan_document_update(entry["chunk_ids"] if entry is not None else [], ids)
+        pending_chunks.extend((ids[i], chunks[i], metadatas[i]) for i in added)
+        pending_documents.append((queued_chunks + len(pending_chunks), {
+            "document_id": document_id,
+            "path": pdf_path,
+            "content_hash": content_hash,
+            "ids": ids,
+            "kept_ids": [ids[i] for i in kept],
+            "kept_metadatas": [metadatas[i] for i in kept],
+            "deleted": deleted
+        }))
+
+    writer = threading.Thread(target=write_batches, name="bulk-ingest-writer", daemon=True)
+    writer.start()
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Keep a bounded window of documents in flight so parsed text does not pile up in memory
+            in_flight = deque()
+            paths = iter(pdf_paths)
+            while True:
+                while len(in_flight) < workers * 2:
+                    pdf_path = next(paths, None)
+                    if pdf_path is None:
+                        break
+                    document_id = document_id_for(pdf_path, root)
+                    try:
+                        content_hash = file_hash(pdf_path)
+                    except OSError as e:
+                        print(f"⚠️ Skipping unreadable PDF {pdf_path}: {e}")
+                        stats["failed"].append(pdf_path)
+                        continue
+                    entry = rag_instance.manifest.get(document_id)
+                    if entry is not None and entry["content_hash"] == content_hash:
+                        stats["skipped"] += 1
+                        continue
+                    future = executor.submit(_parse_and_chunk, pdf_path, rag_instance.chunker)
+                    in_flight.append((pdf_path, document_id, content_hash, future))
+                if not in_flight:
+                    break
+                pdf_path, document_id, content_hash, future = in_flight.popleft()
+                try:
+                    pages, chunk_records, parse_seconds = future.result()
+                except Exception as e:
+                    # One broken PDF is reported rather than aborting the whole run
+                    print(f"⚠️ Failed to parse {pdf_path}: {e}")
+                    stats["failed"].append(pdf_path)
+                    continue
+                stats["documents"] += 1
+                stats["pages"] += pages
+                stats["chunks"] += len(chunk_records)
+                stats["parse_seconds"] += parse_seconds
+                plan(pdf_path, document_id, content_hash, chunk_records)
+                flush()
+                if writer_errors:
+                    break
+        flush(force=True)
+    finally:
+        write_queue.put(None)
+        writer.join()
+    rag_instance.save_indexes()
+    if writer_errors:
+        raise Exception(f"Error writing chunks during bulk ingestion: {writer_errors[0]}")
+
+    elapsed = time.perf_counter() - start
+    # Parse time is summed over workers, so divide by the pool size to get the stage's wall-clock time
+    parse_wall_seconds = stats["parse_seconds"] / workers
+    stats.update({
+        "elapsed_seconds": round(elapsed, 3),
+        "pages_per_second": _throughput(stats["pages"], parse_wall_seconds),
+        "chunks_per_second": _throughput(stats["chunks"], parse_wall_seconds),
+        "embedded_vectors_per_second": _throughput(stats["vectors"], stats["embed_seconds"]),
+        "written_vectors_per_second": _throughput(stats["vectors"], stats["write_seconds"])
+    })
+    print(f"✅ Ingested {stats['documents']} PDFs ({stats['skipped']} unchanged, {len(stats['failed'])} failed) in {elapsed:.1f}s: "
+          f"{stats['pages_per_second']} pages/s, {stats['chunks_per_second']} chunks/s, "
+          f"{stats['embedded_vectors_per_second']} vectors/s embedded, {stats['written_vectors_per_second']} vectors/s written")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    from .core import SimpleRAG
+
+    parser = argparse.ArgumentParser(description="Bulk ingest a directory or glob of PDFs")
+    parser.add_argument("path", help="Directory, glob pattern or PDF path")
+    parser.add_argument("--workers", type=int, default=None, help="Parsing processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding batch and collection write")
+    parser.add_argument("--checkpoint-documents", type=int, default=20, help="Documents per persist and manifest checkpoint")
+    args = parser.parse_args()
+
+    bulk_ingest(SimpleRAG(), args.path, workers=args.workers, batch_size=args.batch_size, checkpoint_documents=args.checkpoint_documents)
@@ -0,0 +1,308 @@
+"""
+Vector store maintenance for the RAG system
+Finds and removes index segments no collection references, compacts the index after deletes and keeps a cached
+storage summary that is refreshed when the index is written rather than recomputed on every read
+
+Run with: python -m rag_system.maintenance report|cleanup|compact|schedule --persist-directory ./data/vector_db
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+SQLITE_FILE = "chroma.sqlite3"
+# Orphans younger than this are left alone, a concurrent writer may not have registered them yet
+MIN_ORPHAN_AGE_SECONDS = 3600
+
+
+def directory_size(path):
+    """Total size in bytes of the files under a directory"""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                # Removed while walking
+                pass
+    return total
+
+
+def _referenced_segments(persist_directory):
+    """Segment ids referenced by the chroma.sqlite3 catalogue (Chroma 0.4+ layout), or None without one"""
+    path = os.path.join(persist_directory, SQLITE_FILE)
+    if not os.path.exists(path):
+        return None
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return {row[0] for row in connection.execute("SELECT id FROM segments")}
+    finally:
+        connection.close()
+
+
+def _referenced_collections(persist_directory):
+    """Collection uuids listed in chroma-collections.parquet (Chroma 0.3 duckdb+parquet layout), or None without one"""
+    path = os.path.join(persist_directory, "chroma-collections.parquet")
+    if not os.path.exists(path):
+        return None
+    import pandas
+    return {str(uuid) for uuid in pandas.read_parquet(path, columns=["uuid"])["uuid"]}
+
+
+def find_orphans(persist_directory, min_age_seconds=MIN_ORPHAN_AGE_SECONDS):
+    """
+    Find index segments that no collection references
+
+    Handles both Chroma layouts: UUID segment directories next to chroma.sqlite3, and index/*_<uuid>.bin|.pkl files
+    next to the duckdb+parquet files.
+
+    Args:
+        persist_directory (str): Vector database directory
+        min_age_seconds (int): Skip segments modified more recently than this
+
+    Returns:
+        list: Paths of orphaned segment directories and files
+    """
+    now = time.time()
+    orphans = []
+    segments = _referenced_segments(persist_directory)
+    if segments is not None:
+        for entry in sorted(os.listdir(persist_directory)):
+            path = os.path.join(persist_directory, entry)
+            if os.path.isdir(path) and UUID_PATTERN.fullmatch(entry) and entry not in segments:
+                orphans.append(path)
+    collections = _referenced_collections(persist_directory)
+    if collections is not None:
+        for path in sorted(glob.glob(os.path.join(persist_directory, "index", "*"))):
+            match = UUID_PATTERN.search(os.path.basename(path))
+            if match and match.group(0) not in collections:
+                orphans.append(path)
+    return [path for path in orphans if now - os.path.getmtime(path) >= min_age_seconds]
+
+
+def find_nested_stores(persist_directory):
+    """Find other Chroma stores nested inside the persist directory, reported but never removed automatically"""
+    return sorted(
+        os.path.dirname(path)
+        for path in glob.glob(os.path.join(persist_directory, "**", SQLITE_FILE), recursive=True)
+        if os.path.dirname(path) != os.path.normpath(persist_directory)
+    )
+
+
+def cleanup_orphans(persist_directory, dry_run=False, min_age_seconds=MIN_ORPHAN_AGE_SECONDS):
+    """
+    Remove orphaned index segments
+
+    Args:
+        persist_directory (str): Vector database directory
+        dry_run (bool): Only report what would be removed
+        min_age_seconds (int): Skip segments modified more recently than this
+
+    Returns:
+        dict: {"removed": [paths], "bytes": bytes freed (or that would be freed)}
+    """
+    orphans = find_orphans(persist_directory, min_age_seconds)
+    freed = 0
+    for path in orphans:
+        size = directory_size(path) if os.path.isdir(path) else os.path.getsize(path)
+        freed += size
+        if dry_run:
+            print(f"🔎 Would remove orphan {path} ({size / 1024 / 1024:.1f} MB)")
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        print(f"🗑️  Removed orphan {path} ({size / 1024 / 1024:.1f} MB)")
+    return {"removed": orphans, "bytes": freed}
+
+
+def compact(rag_instance):
+    """
+    Compact the index of a RAG system after deletes
+
+    The NumPy store rewrites its files without deleted rows, Chroma 0.3 rebuilds its HNSW index and a chroma.sqlite3
+    catalogue is vacuumed. The lexical index drops deleted postings when it is saved.
+
+    Args:
+        rag_instance: SimpleRAG instance
+
+    Returns:
+        dict: Storage bytes before and after
+    """
+    before = directory_size(rag_instance.persist_directory)
+    collection = rag_instance.collection
+    if hasattr(collection, "compact"):
+        reclaimed = collection.compact()
+        print(f"🧹 Reclaimed {reclaimed} deleted vectors")
+    elif hasattr(collection, "create_index"):
+        collection.create_index()
+        print("🧹 Rebuilt the HNSW index")
+    rag_instance.client.persist()
+    sqlite_path = os.path.join(rag_instance.persist_directory, SQLITE_FILE)
+    if os.path.exists(sqlite_path):
+        connection = sqlite3.connect(sqlite_path)
+        try:
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+    rag_instance.save_indexes()
+    after = rag_instance.storage.summary()["bytes"]
+    print(f"✅ Compacted {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB")
+    return {"bytes_before": before, "bytes_after": after}
+
+
+class StorageSummary:
+    """Storage size and vector count of a persist directory, cached in memory and in storage.json"""
+
+    def __init__(self, persist_directory, path=None):
+        self.persist_directory = persist_directory
+        self.path = path or os.path.join(persist_directory, "storage.json")
+        self._lock = threading.Lock()
+        self._summary = None
+        self._mtime = None
+
+    def _reload_if_changed(self):
+        """Re-read storage.json when another process rewrote it since it was last read"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as file:
+                self._summary = json.load(file)
+            self._mtime = mtime
+        except (OSError, ValueError):
+            pass
+
+    def summary(self):
+        """Return the cached summary, {"bytes", "vectors", "updated"}, re-read when another process refreshed it"""
+        with self._lock:
+            self._reload_if_changed()
+            if self._summary is None:
+                self._summary = self._compute(None)
+            return dict(self._summary)
+
+    def refresh(self, vectors=None):
+        """Recompute the summary after a write and save it so other processes read it without walking the tree"""
+        with self._lock:
+            # Without a new vector count the last saved one is kept
+            self._reload_if_changed()
+        summary = self._compute(vectors)
+        with self._lock:
+            self._summary = summary
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(summary, file)
+        os.replace(tmp_path, self.path)
+        return dict(summary)
+
+    def _compute(self, vectors):
+        if vectors is None and self._summary is not None:
+            vectors = self._summary.get("vectors")
+        return {"bytes": directory_size(self.persist_directory), "vectors": vectors, "updated": time.time()}
+
+
+class MaintenanceScheduler:
+    """Background thread removing orphaned segments and compacting the index on an interval"""
+
+    def __init__(self, rag_instance, interval=3600, compact_threshold=0.2):
+        """
+        Args:
+            rag_instance: SimpleRAG instance
+            interval (float): Seconds between maintenance runs
+            compact_threshold (float): Compact the NumPy store once this share of its rows are deleted
+        """
+        self.rag = rag_instance
+        self.interval = interval
+        self.compact_threshold = compact_threshold
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the maintenance thread if it is not running"""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="rag-maintenance", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the maintenance thread"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_once(self):
+        """Run one maintenance pass"""
+        # Persist first so segments written since the last persist are registered before the orphan scan
+        self.rag.client.persist()
+        cleanup_orphans(self.rag.persist_directory)
+        collection = self.rag.collection
+        # Only the NumPy store reports its dead rows; Chroma is compacted on demand with the CLI
+        rows = collection.row_count() if hasattr(collection, "row_count") else 0
+        if rows and 1 - collection.count() / rows >= self.compact_threshold:
+            compact(self.rag)
+        else:
+            self.rag.save_indexes()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Maintenance run failed: {e}")
+
+
+def report(persist_directory):
+    """Print the storage footprint, orphaned segments and nested stores of a persist directory"""
+    orphans = find_orphans(persist_directory, min_age_seconds=0)
+    summary = StorageSummary(persist_directory).refresh()
+    print(f"📦 {persist_directory}: {summary['bytes'] / 1024 / 1024:.1f} MB")
+    for path in orphans:
+        size = directory_size(path) if os.path.isdir(path) else os.path.getsize(path)
+        print(f"   orphan segment {path} ({size / 1024 / 1024:.1f} MB)")
+    for path in find_nested_stores(persist_directory):
+        print(f"   nested store {path} ({directory_size(path) / 1024 / 1024:.1f} MB), remove it manually if unused")
+    return {"summary": summary, "orphans": orphans}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector store maintenance")
+    parser.add_argument("command", choices=["report", "cleanup", "compact", "schedule"], help="Maintenance task, schedule runs cleanup and compaction on an interval")
+    parser.add_argument("--persist-directory", default="./data/vector_db", help="Vector database directory")
+    parser.add_argument("--vector-store", choices=["chroma", "numpy"], default="chroma", help="Vector index backend")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what cleanup would remove")
+    parser.add_argument("--interval", type=float, default=3600, help="Seconds between scheduled maintenance runs")
+    parser.add_argument("--min-age", type=int, default=MIN_ORPHAN_AGE_SECONDS, help="Skip orphans younger than this many seconds")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        report(args.persist_directory)
+    elif args.command == "cleanup":
+        result = cleanup_orphans(args.persist_directory, args.dry_run, args.min_age)
+        print(f"✅ {'Would free' if args.dry_run else 'Freed'} {result['bytes'] / 1024 / 1024:.1f} MB in {len(result['removed'])} orphans")
+    else:
+        from .core import SimpleRAG
+        rag = SimpleRAG(persist_directory=args.persist_directory, vector_store=args.vector_store)
+        if args.command == "compact":
+            compact(rag)
+        else:
+            scheduler = MaintenanceScheduler(rag, args.interval)
+            print(f"🕒 Running maintenance every {args.interval:.0f}s, press Ctrl+C to stop")
+            try:
+                while True:
+                    scheduler.run_once()
+                    time.sleep(args.interval)
+            except KeyboardInterrupt:
+                pass
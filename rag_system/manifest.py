@@ -0,0 +1,75 @@
+"""
+Ingestion manifest for the RAG system
+Records which documents are indexed, the content hash they were indexed from and the ids of their chunks
+"""
+
+import json
+import os
+import threading
+
+
+class IngestManifest:
+    """JSON manifest of indexed documents, keyed by document id"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._documents = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as file:
+                    self._documents = json.load(file).get("documents", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read manifest {path}, starting empty: {e}")
+
+    def __contains__(self, document_id):
+        return document_id in self._documents
+
+    def get(self, document_id):
+        """Return the manifest entry for a document, or None if it is not indexed"""
+        return self._documents.get(document_id)
+
+    def documents(self):
+        """Return a copy of all manifest entries keyed by document id"""
+        return dict(self._documents)
+
+    def set(self, document_id, path, content_hash, chunk_ids):
+        """Record a document as indexed and save the manifest"""
+        with self._lock:
+            self._documents[document_id] = {
+                "path": path,
+                "content_hash": content_hash,
+                "chunk_ids": list(chunk_ids)
+            }
+            self._save()
+
+    def set_many(self, entries):
+        """Record several (document_id, path, content_hash, chunk_ids) entries as indexed and save the manifest once"""
+        with self._lock:
+            for document_id, path, content_hash, chunk_ids in entries:
+                self._documents[document_id] = {
+                    "path": path,
+                    "content_hash": content_hash,
+                    "chunk_ids": list(chunk_ids)
+                }
+            self._save()
+
+    def remove(self, document_id):
+        """Remove a document from the manifest and save it"""
+        with self._lock:
+            if self._documents.pop(document_id, None) is not None:
+                self._save()
+
+    def clear(self):
+        """Remove all documents from the manifest and save it"""
+        with self._lock:
+            self._documents = {}
+            self._save()
+
+    def _save(self):
+        """Write the manifest atomically so a crash never leaves a partial file"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"documents": self._documents}, file, indent=2)
+        os.replace(tmp_path, self.path)
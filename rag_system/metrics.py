@@ -0,0 +1,159 @@
+"""
+Hot-path instrumentation for the RAG system
+Per-stage latency histograms and counters, exported in-process and as Prometheus text, with optional trace spans
+
+Metrics are off by default; enable them with enable_metrics() or the RAG_METRICS=1 environment variable.
+While disabled, timers and counters return immediately.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, fraction):
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return BUCKETS[-1]
+
+
+class Metrics:
+    """Registry of stage histograms and counters"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._tracer = None
+
+    def enable(self, tracing=False):
+        """Start recording, optionally also emitting OpenTelemetry trace spans if opentelemetry is installed"""
+        self.enabled = True
+        if tracing:
+            try:
+                from opentelemetry import trace
+                self._tracer = trace.get_tracer("rag_system")
+            except ImportError:
+                print("⚠️ opentelemetry is not installed, trace spans are disabled")
+
+    def disable(self):
+        """Stop recording, existing values are kept"""
+        self.enabled = False
+        self._tracer = None
+
+    @contextmanager
+    def timer(self, stage):
+        """Time a block of code into the stage's histogram"""
+        if not self.enabled:
+            yield
+            return
+        span = self._tracer.start_as_current_span(stage) if self._tracer is not None else None
+        if span is not None:
+            span.__enter__()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+            if span is not None:
+                span.__exit__(None, None, None)
+
+    def observe(self, stage, seconds):
+        """Record a duration for a stage"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1):
+        """Increase a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self):
+        """
+        Return the current metrics
+
+        Returns:
+            dict: {"stages": {stage: {count, total_ms, mean_ms, p50_ms, p95_ms}}, "counters": {name: value}}
+        """
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": histogram.count,
+                    "total_ms": round(histogram.total * 1000, 3),
+                    "mean_ms": round(histogram.total / histogram.count * 1000, 3) if histogram.count else 0.0,
+                    "p50_ms": histogram.quantile(0.5) * 1000,
+                    "p95_ms": histogram.quantile(0.95) * 1000
+                }
+                for stage, histogram in self._histograms.items()
+            }
+            return {"stages": stages, "counters": dict(self._counters)}
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP rag_stage_seconds Time spent in each RAG pipeline stage",
+            "# TYPE rag_stage_seconds histogram"
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    label = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'rag_stage_seconds_bucket{{stage="{stage}",le="{label}"}} {cumulative}')
+                lines.append(f'rag_stage_seconds_sum{{stage="{stage}"}} {histogram.total}')
+                lines.append(f'rag_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            lines.append("# HELP rag_events_total RAG system event counters")
+            lines.append("# TYPE rag_events_total counter")
+            for name, value in sorted(self._counters.items()):
+                lines.append(f'rag_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Drop all recorded values"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# Process-wide metrics shared by every SimpleRAG instance and the model registry
+metrics = Metrics(enabled=os.environ.get("RAG_METRICS", "") == "1")
+
+
+def enable_metrics(tracing=False):
+    """Enable the process-wide metrics"""
+    metrics.enable(tracing)
+    return metrics
@@ -0,0 +1,254 @@
+"""
+Process-wide model registry for the RAG system
+Tokenizers, embedding models, cross-encoders and QA pipelines are loaded lazily on first use and shared by every SimpleRAG instance
+"""
+
+import os
+import shutil
+import threading
+import time
+from .metrics import metrics
+
+# Inference backends for the embedding and QA models: PyTorch fp32, PyTorch with dynamic int8 quantization of the
+# linear layers, and ONNX Runtime exports (fp32 or dynamically quantized int8). Non-torch backends run on CPU only.
+INFERENCE_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_MODEL_CACHE_DIR = "./data/model_cache"
+
+_models = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_load(key, loader):
+    """
+    Return the cached model for key, loading it with loader on first use
+
+    Args:
+        key (tuple): Registry key, (kind, model name, device[, inference backend])
+        loader (callable): Zero-argument function that loads the model
+
+    Returns:
+        The loaded model
+    """
+    # Fast path without locking once the model is loaded
+    if key in _models:
+        return _models[key]
+
+    # One lock per key so different models can load concurrently but the same model loads once
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        if key not in _models:
+            start = time.perf_counter()
+            _models[key] = loader()
+            metrics.observe("model_load", time.perf_counter() - start)
+            metrics.increment("model_loads")
+            backend = f" ({key[3]})" if len(key) > 3 and key[3] != "torch" else ""
+            print(f"✅ Loaded {key[0]}: {key[1]}{backend}")
+        return _models[key]
+
+
+def _torch_device(device):
+    """Convert a transformers pipeline device index (-1 for CPU) to a torch device string"""
+    if isinstance(device, str):
+        return device
+    return "cpu" if device is None or device < 0 else f"cuda:{device}"
+
+
+def check_inference_backend(backend, device):
+    """Validate an inference backend for a device"""
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {', '.join(INFERENCE_BACKENDS)}")
+    if backend != "torch" and _torch_device(device) != "cpu":
+        raise ValueError(f"The {backend} inference backend runs on CPU only, use device=-1")
+
+
+def _convert_once(cache_dir, model_name, backend, marker, convert):
+    """
+    Return the on-disk directory of a converted model, converting it on first use
+
+    Conversion writes to a temporary directory that is renamed into place, so concurrent worker processes never load
+    a half-written model.
+
+    Args:
+        cache_dir (str): Directory holding converted models
+        model_name (str): HuggingFace model name
+        backend (str): Inference backend
+        marker (str): File inside the directory that exists once conversion is complete
+        convert (callable): Function writing the converted model to the directory it is given
+
+    Returns:
+        str: Directory of the converted model
+    """
+    directory = os.path.join(cache_dir, f"{model_name.replace('/', '--')}-{backend}")
+    if os.path.exists(os.path.join(directory, marker)):
+        return directory
+    tmp_directory = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    start = time.perf_counter()
+    convert(tmp_directory)
+    if os.path.exists(os.path.join(directory, marker)):
+        # Another process finished the same conversion first
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+    else:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(tmp_directory, directory)
+        print(f"💾 Converted {model_name} for {backend} in {time.perf_counter() - start:.1f}s, cached in {directory}")
+    return directory
+
+
+def _quantize_dynamic(model):
+    """Quantize a torch model's linear layers to int8 weights with dynamically quantized activations"""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_quantized_torch(cache_dir, model_name, load_fp32):
+    """Load a dynamically quantized torch model, pickled on first use so later loads skip the fp32 weights"""
+    import torch
+
+    def convert(directory):
+        os.makedirs(directory)
+        torch.save(_quantize_dynamic(load_fp32()), os.path.join(directory, "model.pt"))
+
+    directory = _convert_once(cache_dir, model_name, "torch-int8", "model.pt", convert)
+    return torch.load(os.path.join(directory, "model.pt"), weights_only=False)
+
+
+def get_tokenizer(model_name):
+    """
+    Get the shared tokenizer for a model
+
+    Args:
+        model_name (str): HuggingFace model name
+
+    Returns:
+        transformers tokenizer
+    """
+    def load():
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+
+    return _get_or_load(("tokenizer", model_name, None), load)
+
+
+def get_embedding_model(model_name, device=-1, backend="torch", cache_dir=DEFAULT_MODEL_CACHE_DIR):
+    """
+    Get the shared sentence-transformers embedding model
+
+    Args:
+        model_name (str): sentence-transformers model name
+        device (int or str): Device index (-1 for CPU) or torch device string
+        backend (str): Inference backend, one of INFERENCE_BACKENDS
+        cache_dir (str): Directory for converted models
+
+    Returns:
+        SentenceTransformer model
+
+    Raises:
+        ValueError: If the backend is unknown or not supported on the device
+    """
+    check_inference_backend(backend, device)
+
+    def load():
+        from sentence_transformers import SentenceTransformer
+        if backend == "torch":
+            return SentenceTransformer(model_name, device=_torch_device(device))
+        if backend == "torch-int8":
+            return _load_quantized_torch(cache_dir, model_name, lambda: SentenceTransformer(model_name, device="cpu"))
+        # ONNX backends need sentence-transformers>=3.2 with its onnx extra
+        file_name = "onnx/model_qint8_avx2.onnx" if backend == "onnx-int8" else "onnx/model.onnx"
+
+        def convert(directory):
+            model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+            model.save(directory)
+            if backend == "onnx-int8":
+                from sentence_transformers import export_dynamic_quantized_onnx_model
+                export_dynamic_quantized_onnx_model(model, "avx2", directory)
+
+        directory = _convert_once(cache_dir, model_name, backend, file_name, convert)
+        return SentenceTransformer(directory, device="cpu", backend="onnx", model_kwargs={"file_name": file_name})
+
+    return _get_or_load(("embedding model", model_name, device, backend), load)
+
+
+def get_qa_pipeline(model_name, device=-1, backend="torch", cache_dir=DEFAULT_MODEL_CACHE_DIR):
+    """
+    Get the shared question-answering pipeline
+
+    Args:
+        model_name (str): HuggingFace QA model name
+        device (int): Device index, -1 for CPU
+        backend (str): Inference backend, one of INFERENCE_BACKENDS
+        cache_dir (str): Directory for converted models
+
+    Returns:
+        transformers QuestionAnsweringPipeline
+
+    Raises:
+        ValueError: If the backend is unknown or not supported on the device
+    """
+    check_inference_backend(backend, device)
+
+    def load():
+        from transformers import AutoTokenizer, pipeline
+        if backend == "torch":
+            return pipeline(
+                "question-answering",
+                model=model_name,
+                tokenizer=model_name,
+                device=device
+            )
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if backend == "torch-int8":
+            from transformers import AutoModelForQuestionAnswering
+            model = _load_quantized_torch(cache_dir, model_name, lambda: AutoModelForQuestionAnswering.from_pretrained(model_name))
+            return pipeline("question-answering", model=model, tokenizer=tokenizer)
+        # ONNX backends are exported and optionally quantized with optimum's ONNX Runtime integration
+        from optimum.onnxruntime import ORTModelForQuestionAnswering
+        file_name = "model_quantized.onnx" if backend == "onnx-int8" else "model.onnx"
+
+        def convert(directory):
+            model = ORTModelForQuestionAnswering.from_pretrained(model_name, export=True)
+            model.save_pretrained(directory)
+            if backend == "onnx-int8":
+                from optimum.onnxruntime import ORTQuantizer
+                from optimum.onnxruntime.configuration import AutoQuantizationConfig
+                quantizer = ORTQuantizer.from_pretrained(model)
+                quantizer.quantize(save_dir=directory, quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False))
+
+        directory = _convert_once(cache_dir, model_name, backend, file_name, convert)
+        model = ORTModelForQuestionAnswering.from_pretrained(directory, file_name=file_name)
+        return pipeline("question-answering", model=model, tokenizer=tokenizer)
+
+    return _get_or_load(("QA pipeline", model_name, device, backend), load)
+
+
+def get_cross_encoder(model_name, device=-1):
+    """
+    Get the shared sentence-transformers cross-encoder used for reranking
+
+    Args:
+        model_name (str): Cross-encoder model name
+        device (int or str): Device index (-1 for CPU) or torch device string
+
+    Returns:
+        CrossEncoder model
+    """
+    def load():
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_name, device=_torch_device(device))
+
+    return _get_or_load(("cross-encoder", model_name, device), load)
+
+
+def loaded_models():
+    """Return the registry keys of all models loaded in this process"""
+    return list(_models)
+
+
+def clear_models():
+    """Drop all loaded models so they are reloaded on next use"""
+    with _registry_lock:
+        _models.clear()
+        _locks.clear()
@@ -0,0 +1,116 @@
+"""
+Query result cache for the RAG system
+An exact-match LRU on the normalized query in front of a semantic tier that reuses results of near-duplicate queries
+"""
+
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(query):
+    """Lowercase a query, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?.! ")
+
+
+class QueryCache:
+    """Two-tier search result cache with TTL expiry, cleared whenever the collection changes"""
+
+    def __init__(self, max_entries=256, ttl=600, semantic_threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (normalized query, params) -> (expiry time, unit query embedding or None, results)
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, query, params):
+        """
+        Look up results for an exact (normalized) query match
+
+        Args:
+            query (str): Search query
+            params (tuple): Search parameters that affect the results
+
+        Returns:
+            list: Copy of the cached results, or None on a miss
+        """
+        key = (normalize_query(query), params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return copy.deepcopy(entry[2])
+
+    def get_similar(self, embedding, params):
+        """
+        Look up results of a cached query whose embedding is within the cosine similarity threshold
+
+        Args:
+            embedding (np.ndarray): Query embedding
+            params (tuple): Search parameters that affect the results
+
+        Returns:
+            list: Copy of the cached results, or None on a miss
+        """
+        if self.semantic_threshold is None:
+            self.misses += 1
+            return None
+        query_vector = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_similarity = None, self.semantic_threshold
+            keys = [key for key, entry in self._entries.items() if key[1] == params and entry[1] is not None and entry[0] >= now]
+            if keys:
+                similarities = np.stack([self._entries[key][1] for key in keys]) @ query_vector
+                index = int(np.argmax(similarities))
+                if similarities[index] >= best_similarity:
+                    best_key = keys[index]
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            return copy.deepcopy(self._entries[best_key][2])
+
+    def put(self, query, params, embedding, results):
+        """
+        Cache search results
+
+        Args:
+            query (str): Search query
+            params (tuple): Search parameters that affect the results
+            embedding (np.ndarray): Query embedding, or None to only cache the exact query
+            results (list): Search results
+        """
+        key = (normalize_query(query), params)
+        vector = _unit(embedding) if embedding is not None else None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, vector, copy.deepcopy(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+
+
+def _unit(embedding):
+    """Return the embedding as a unit-length float32 vector"""
+    vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
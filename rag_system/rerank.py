@@ -0,0 +1,136 @@
+"""
+Reranking stage for the RAG system
+Reorders over-fetched retrieval candidates so only the best few are sent to the expensive QA model
+"""
+
+import time
+from abc import ABC, abstractmethod
+
+from .bm25 import tokenize
+from .models import get_cross_encoder
+
+# Common question words that say nothing about which chunk answers the question
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it of on or that the this to was what when where which "
+    "who why will with must should".split()
+)
+
+
+class Reranker(ABC):
+    """Base reranker: scores (query, chunk) pairs and keeps each query's top_k chunks"""
+
+    batch_size = 32
+
+    def warmup(self):
+        """Load any models so the first query does not pay for it"""
+
+    @abstractmethod
+    def score_pairs(self, pairs):
+        """
+        Score (query, document, similarity) triples, higher is more relevant
+
+        Args:
+            pairs (list): (query, document, retrieval similarity) triples
+
+        Returns:
+            list: One score per pair
+        """
+
+    def rerank(self, queries, retrieved, top_k, budget_ms=None):
+        """
+        Rerank retrieved candidates and keep the top_k per query
+
+        Candidates are scored best-retrieval-rank first across all queries. Once the latency budget is spent the
+        remaining candidates are not scored and rank below the scored ones in their retrieval order.
+
+        Args:
+            queries (list): Query texts
+            retrieved (list): (documents, similarities, metadatas) per query, in retrieval order
+            top_k (int): Number of candidates to keep per query
+            budget_ms (float): Optional time budget for scoring
+
+        Returns:
+            list: (documents, similarities, metadatas) per query, reranked and truncated to top_k
+        """
+        deadline = time.perf_counter() + budget_ms / 1000 if budget_ms is not None else None
+        longest = max((len(documents) for documents, _, _ in retrieved), default=0)
+        pairs = [(row, i) for i in range(longest) for row in range(len(retrieved)) if i < len(retrieved[row][0])]
+        scores = {}
+        for start in range(0, len(pairs), self.batch_size):
+            if deadline is not None and start and time.perf_counter() > deadline:
+                break
+            batch = pairs[start:start + self.batch_size]
+            batch_scores = self.score_pairs([(queries[row], retrieved[row][0][i], retrieved[row][1][i]) for row, i in batch])
+            scores.update(zip(batch, batch_scores))
+
+        reranked = []
+        for row, (documents, similarities, metadatas) in enumerate(retrieved):
+            scored = sorted((i for i in range(len(documents)) if (row, i) in scores), key=lambda i: scores[(row, i)], reverse=True)
+            unscored = [i for i in range(len(documents)) if (row, i) not in scores]
+            order = (scored + unscored)[:top_k]
+            reranked.append(([documents[i] for i in order], [similarities[i] for i in order], [metadatas[i] for i in order]))
+        return reranked
+
+
+class OverlapReranker(Reranker):
+    """Model-free reranker: retrieval similarity plus the share of query terms (and section numbers) found in the chunk"""
+
+    batch_size = 256
+
+    def __init__(self, overlap_weight=0.5):
+        self.overlap_weight = overlap_weight
+
+    def score_pairs(self, pairs):
+        scores = []
+        for query, document, similarity in pairs:
+            terms = set(tokenize(query)) - STOPWORDS
+            overlap = len(terms & set(tokenize(document))) / len(terms) if terms else 0.0
+            scores.append(similarity + self.overlap_weight * overlap)
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """Reranker scoring each (query, chunk) pair jointly with a small cross-encoder"""
+
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", device=-1, batch_size=32):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+
+    @property
+    def model(self):
+        return get_cross_encoder(self.model_name, self.device)
+
+    def warmup(self):
+        self.model.predict([("Warm up the reranker.", "Warm up the reranker.")], show_progress_bar=False)
+
+    def score_pairs(self, pairs):
+        return self.model.predict(
+            [(query, document) for query, document, _ in pairs],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        ).tolist()
+
+
+def create_reranker(kind, model_name=None, device=-1):
+    """
+    Create a reranker by name
+
+    Args:
+        kind (str): "cross-encoder", "overlap" or None for no reranking
+        model_name (str): Cross-encoder model name, defaults to a MiniLM MS MARCO model
+        device (int or str): Device for the cross-encoder
+
+    Returns:
+        Reranker or None
+
+    Raises:
+        ValueError: If kind is not a known reranker
+    """
+    if kind is None:
+        return None
+    if kind == "overlap":
+        return OverlapReranker()
+    if kind == "cross-encoder":
+        return CrossEncoderReranker(model_name or "cross-encoder/ms-marco-MiniLM-L-6-v2", device)
+    raise ValueError(f"Unknown reranker '{kind}', expected 'cross-encoder', 'overlap' or None")
@@ -0,0 +1,152 @@
+"""
+Section structure for the RAG system
+Numbered sections are found once at ingest time, from the PDF outline when it has one and from numbered headings
+otherwise, so every chunk can carry the section it belongs to and citations become a metadata lookup
+"""
+
+import re
+from bisect import bisect_right
+
+import PyPDF2
+
+from .chunking import SENTENCE_END
+
+# A numbered heading or clause at the start of a line, like "1. Data Classification Policy" or "4.2 Access reviews"
+HEADING_PATTERN = re.compile(r"^[ \t]*((?:\d+\.)+\d*)[ \t]+(\S.*)$", re.MULTILINE)
+# Section number at the start of an outline title
+NUMBER_PREFIX = re.compile(r"^\s*((?:\d+\.)*\d+)\.?\s+(.+)$")
+MAX_TITLE_LENGTH = 200
+
+
+def section_title(text):
+    """Shorten the text after a section number to a title: its first sentence with whitespace collapsed"""
+    text = " ".join(text.split())
+    end = SENTENCE_END.search(text)
+    return (text[:end.start()] if end else text)[:MAX_TITLE_LENGTH].strip()
+
+
+def read_outline(pdf_path):
+    """
+    Read the PDF outline (bookmarks) as a flat list of sections
+
+    Outline entries without a section number in their title are numbered by their position in the outline.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+
+    Returns:
+        list: (section number, title, 1-based page number) tuples in outline order, empty without an outline
+    """
+    try:
+        reader = PyPDF2.PdfReader(pdf_path)
+        outline = reader.outline
+    except Exception as e:
+        print(f"⚠️ Could not read the outline of {pdf_path}: {e}")
+        return []
+
+    sections = []
+
+    def walk(items, prefix):
+        position = 0
+        number = prefix
+        for item in items:
+            # A nested list holds the children of the entry before it
+            if isinstance(item, list):
+                walk(item, f"{number}.")
+                continue
+            position += 1
+            match = NUMBER_PREFIX.match(item.title)
+            number, title = (match.group(1), match.group(2)) if match else (f"{prefix}{position}", item.title)
+            try:
+                page = reader.get_destination_page_number(item) + 1
+            except Exception as e:
+                # Broken or external destinations are common in real PDFs, skip the entry rather than the outline
+                print(f"⚠️ Skipping outline entry {item.title!r} of {pdf_path}: {e}")
+                continue
+            sections.append((number, section_title(title), page))
+
+    walk(outline, "")
+    return sections
+
+
+class SectionIndex:
+    """Section start offsets of one document, collected while its pages stream past the chunker"""
+
+    def __init__(self, outline=None):
+        self.outline = outline or []
+        self._starts = []
+        self._sections = []
+        self._length = 0
+        self._pages = 0
+
+    def observe(self, pages):
+        """
+        Pass (page_number, text) pages through unchanged while recording where sections start
+
+        Offsets use the same document coordinates as SentenceChunker.chunk_pages: pages joined with a single space.
+
+        Args:
+            pages (iterable): (page_number, text) tuples, e.g. from iter_pdf_pages
+
+        Yields:
+            tuple: The same (page_number, text) tuples
+        """
+        for page_number, text in pages:
+            page_start = self._length + (1 if self._pages else 0)
+            self._pages += 1
+            self._length = page_start + len(text)
+            if self.outline:
+                self._add_outline_sections(page_number, text, page_start)
+            else:
+                self._add_heading_sections(page_number, text, page_start)
+            yield page_number, text
+
+    def _add_outline_sections(self, page_number, text, page_start):
+        """Locate the outline entries pointing at this page in its text, falling back to the page start"""
+        flat_text = text.lower()
+        for number, title, page in self.outline:
+            if page != page_number:
+                continue
+            offset = flat_text.find(title.lower()[:40])
+            self._add(page_start + max(offset, 0), number, title, page_number)
+
+    def _add_heading_sections(self, page_number, text, page_start):
+        """Find numbered headings and clauses in the page text"""
+        matches = list(HEADING_PATTERN.finditer(text))
+        for i, match in enumerate(matches):
+            # The title may wrap onto following lines, so it runs up to the next heading
+            title_end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            title = section_title(match.group(2) + text[match.end():title_end])
+            self._add(page_start + match.start(1), match.group(1).rstrip("."), title, page_number)
+
+    def _add(self, start, number, title, page):
+        # Keep starts sorted even if outline entries are listed out of page order
+        position = bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._sections.insert(position, {"number": number, "title": title, "page": page, "start": start})
+
+    def section_at(self, offset):
+        """
+        Find the section containing a document offset
+
+        Args:
+            offset (int): Character offset in document coordinates
+
+        Returns:
+            dict: Section with number, title, page, start and end, or None before the first section
+        """
+        position = bisect_right(self._starts, offset) - 1
+        if position < 0:
+            return None
+        end = self._starts[position + 1] if position + 1 < len(self._starts) else self._length
+        return dict(self._sections[position], end=end)
+
+    def annotate(self, chunks):
+        """Attach the section each chunk starts in to the chunk dicts as "section", returning the chunks"""
+        for chunk in chunks:
+            section = self.section_at(chunk["start"])
+            # A chunk starting in front matter is cited by the first section it contains
+            if section is None and self._starts and self._starts[0] < chunk["end"]:
+                section = self.section_at(self._starts[0])
+            chunk["section"] = section
+        return chunks
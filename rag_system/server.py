@@ -0,0 +1,261 @@
+"""
+Headless JSON HTTP service for the RAG system
+Serves /search, /search/stream, /ingest, /health, /ready and /metrics with models loaded once per worker process
+
+Run with: python -m rag_system.server --port 8000 --workers 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .core import SimpleRAG
+from .metrics import enable_metrics
+from .models import INFERENCE_BACKENDS
+from .utils import add_pdf
+
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    """Routes JSON requests to the worker's SimpleRAG instance"""
+
+    def do_GET(self):
+        if self.path == "/health":
+            # Liveness: the process is up and serving, models may still be loading
+            self._send_json(200, {"status": "ok", "pid": os.getpid()})
+        elif self.path == "/ready":
+            # Readiness: only route traffic here once warm-up has finished
+            if self.server.ready.is_set():
+                self._send_json(200, {"status": "ready"})
+            elif self.server.startup_error is not None:
+                self._send_json(503, {"status": "failed", "error": str(self.server.startup_error)})
+            else:
+                self._send_json(503, {"status": "warming up"})
+        elif self.path == "/metrics":
+            # Prometheus text exposition of per-stage timings and counters
+            body = self.server.rag_metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/metrics.json":
+            self._send_json(200, self.server.rag_metrics.snapshot())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        routes = {"/search": self._search, "/search/stream": self._search_stream, "/ingest": self._ingest}
+        route = routes.get(self.path)
+        if route is None:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        if not self.server.ready.is_set():
+            self._send_json(503, {"error": "RAG system is not ready"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+            return
+        try:
+            route(body)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def _search(self, body):
+        query = body.get("query")
+        if not query:
+            self._send_json(400, {"error": "'query' is required"})
+            return
+        n_results = self._n_results(body)
+        if n_results is None:
+            return
+        start = time.perf_counter()
+        # Concurrent requests on this worker are micro-batched by the RAG system's batcher
+        results = self.server.rag.batcher.search(query, n_results)
+        self._send_json(200, {"results": results, "took_ms": round((time.perf_counter() - start) * 1000, 1)})
+
+    def _search_stream(self, body):
+        query = body.get("query")
+        if not query:
+            self._send_json(400, {"error": "'query' is required"})
+            return
+        n_results = self._n_results(body)
+        if n_results is None:
+            return
+        # Newline-delimited JSON events, written as they are produced and ended by closing the connection
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        start = time.perf_counter()
+        try:
+            for event in self.server.rag.search_stream(query, n_results):
+                event["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away, stop extracting answers nobody will read
+            return
+        except Exception as e:
+            # The status line is already sent, so errors are reported in the stream
+            self.wfile.write(json.dumps({"event": "error", "error": str(e)}).encode("utf-8") + b"\n")
+
+    def _n_results(self, body):
+        """Read n_results from the body, answering 400 and returning None if it is not a positive integer"""
+        try:
+            n_results = int(body.get("n_results", 5))
+        except (TypeError, ValueError):
+            n_results = 0
+        if n_results < 1:
+            self._send_json(400, {"error": "'n_results' must be a positive integer"})
+            return None
+        return n_results
+
+    def _ingest(self, body):
+        if not self.server.allow_ingest:
+            # Each worker holds its own manifest, lexical index and caches, so only a single process may write
+            self._send_json(409, {"error": "Ingestion is disabled with several workers, use a single-worker server or python -m rag_system.ingest"})
+            return
+        path = body.get("path")
+        if not path or not path.lower().endswith(".pdf") or not os.path.isfile(path):
+            self._send_json(400, {"error": "'path' must be an existing PDF file"})
+            return
+        documents_directory = os.path.realpath(self.server.documents_directory)
+        if os.path.commonpath([os.path.realpath(path), documents_directory]) != documents_directory:
+            self._send_json(403, {"error": f"'path' must be inside {self.server.documents_directory}"})
+            return
+        # Writes are serialized within the worker
+        with self.server.ingest_lock:
+            summary = add_pdf(self.server.rag, path, body.get("document_id"))
+        self._send_json(200, summary)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"🌐 [{os.getpid()}] {self.address_string()} {format % args}")
+
+
+class RAGHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding one SimpleRAG instance, optionally sharing its port with sibling workers"""
+
+    daemon_threads = True
+
+    def __init__(self, address, reuse_port=False, allow_ingest=True, documents_directory="./data/documents", **rag_kwargs):
+        self.reuse_port = reuse_port
+        self.allow_ingest = allow_ingest
+        self.documents_directory = documents_directory
+        self.rag_kwargs = rag_kwargs
+        self.rag = None
+        self.ready = threading.Event()
+        self.startup_error = None
+        self.ingest_lock = threading.Lock()
+        # Metrics are always collected by the service so /metrics can be scraped
+        self.rag_metrics = enable_metrics()
+        super().__init__(address, RAGRequestHandler)
+
+    def server_bind(self):
+        # SO_REUSEPORT lets several worker processes accept on the same port, the kernel balances between them
+        if self.reuse_port:
+            if not hasattr(socket, "SO_REUSEPORT"):
+                raise RuntimeError("Several workers need SO_REUSEPORT, which this platform lacks; run with --workers 1")
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def load(self):
+        """Create and warm up the RAG system, /health answers while this runs and /ready flips when it is done"""
+        try:
+            self.rag = SimpleRAG(**self.rag_kwargs)
+            self.rag.warmup()
+            self.ready.set()
+        except Exception as e:
+            self.startup_error = e
+            print(f"❌ Worker {os.getpid()} failed to start: {e}")
+
+
+def run_worker(host, port, reuse_port=False, allow_ingest=True, documents_directory="./data/documents", **rag_kwargs):
+    """
+    Run one server worker until interrupted
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind
+        reuse_port (bool): Share the port with other worker processes
+        allow_ingest (bool): Serve /ingest, only safe when this is the only process writing the index
+        documents_directory (str): Directory /ingest may read PDFs from
+        **rag_kwargs: Arguments passed to SimpleRAG
+    """
+    server = RAGHTTPServer((host, port), reuse_port=reuse_port, allow_ingest=allow_ingest,
+                           documents_directory=documents_directory, **rag_kwargs)
+    threading.Thread(target=server.load, name="rag-warmup", daemon=True).start()
+    print(f"🚀 Worker {os.getpid()} listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def serve(host="127.0.0.1", port=8000, workers=1, documents_directory="./data/documents", **rag_kwargs):
+    """
+    Serve the RAG system with one or more worker processes sharing the on-disk index
+
+    Each worker loads the index and models once. Only a single-worker server accepts /ingest: workers keep their own
+    manifest, lexical index and caches in memory, so several writers would overwrite each other's files. With
+    several workers, ingest with python -m rag_system.ingest. On vector_store="numpy" workers then see the new
+    vectors, reload the lexical index and drop their cached results on their next query. Chroma workers keep the
+    index they loaded and persist it again on exit, so stop them before ingesting and restart them afterwards.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind
+        workers (int): Number of worker processes
+        documents_directory (str): Directory /ingest may read PDFs from
+        **rag_kwargs: Arguments passed to SimpleRAG
+    """
+    if workers <= 1:
+        run_worker(host, port, documents_directory=documents_directory, **rag_kwargs)
+        return
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("Several workers need SO_REUSEPORT, which this platform (e.g. Windows) lacks; run with --workers 1")
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(host, port, True, False, documents_directory), kwargs=rag_kwargs, daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the RAG system over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--persist-directory", default="./data/vector_db", help="Vector database directory")
+    parser.add_argument("--vector-store", choices=["chroma", "numpy"], default="chroma", help="Vector index backend")
+    parser.add_argument("--inference-backend", choices=INFERENCE_BACKENDS, default="torch", help="QA and embedding model backend")
+    parser.add_argument("--documents-directory", default="./data/documents", help="Directory /ingest may read PDFs from")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, documents_directory=args.documents_directory,
+          persist_directory=args.persist_directory, vector_store=args.vector_store, inference_backend=args.inference_backend)
@@ -0,0 +1,230 @@
+"""
+Multi-tenant index management for the RAG system
+Each tenant (business unit) has its own index directory. Only recently used tenants are kept loaded, all of them share
+one embedder and the process-wide models, and queries can fan out across several tenants in parallel
+
+Tenants use the NumPy store by default. Chroma 0.3's duckdb+parquet client registers an atexit persist hook that keeps
+the client, and with it the tenant's loaded index, alive after the tenant is unloaded.
+"""
+
+import gc
+import os
+import re
+import shutil
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .bm25 import reciprocal_rank_fusion
+from .core import SimpleRAG
+from .metrics import metrics
+
+TENANT_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class TenantManager:
+    """LRU of loaded per-tenant SimpleRAG instances with fan-out search across tenants"""
+
+    def __init__(self, base_directory="./data/tenants", max_loaded=4, fanout_workers=4, **rag_kwargs):
+        """
+        Args:
+            base_directory (str): Directory holding one index directory per tenant
+            max_loaded (int): Number of tenants kept loaded, the least recently used one is unloaded beyond this
+            fanout_workers (int): Threads used to query tenants in parallel
+            **rag_kwargs: Arguments passed to every tenant's SimpleRAG, vector_store defaults to "numpy"
+        """
+        self.base_directory = base_directory
+        self.max_loaded = max_loaded
+        # Given or taken from the first loaded tenant, then shared by every tenant along with its embedding cache
+        self.embedder = rag_kwargs.pop("embedder", None)
+        self.rag_kwargs = dict(rag_kwargs)
+        self.rag_kwargs.setdefault("vector_store", "numpy")
+        self._loaded = OrderedDict()
+        # Tenants in use by a fan-out search, never unloaded to make room until the search is done
+        self._pinned = Counter()
+        # Guards the dicts only, each tenant is loaded under its own lock so loading one does not block the others
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._executor = ThreadPoolExecutor(max_workers=fanout_workers, thread_name_prefix="tenant-fanout")
+
+    def tenant_directory(self, tenant):
+        """
+        Get the index directory of a tenant
+
+        Raises:
+            ValueError: If the tenant name is not made of letters, digits, "_" and "-"
+        """
+        if not TENANT_NAME.match(tenant):
+            raise ValueError(f"Invalid tenant name '{tenant}', use letters, digits, '_' and '-'")
+        return os.path.join(self.base_directory, tenant)
+
+    def tenants(self):
+        """Return the names of all tenants with an index on disk"""
+        if not os.path.isdir(self.base_directory):
+            return []
+        return sorted(name for name in os.listdir(self.base_directory)
+                      if TENANT_NAME.match(name) and os.path.isdir(os.path.join(self.base_directory, name)))
+
+    def loaded(self):
+        """Return the names of the loaded tenants, least recently used first"""
+        with self._lock:
+            return list(self._loaded)
+
+    def get(self, tenant):
+        """
+        Get a tenant's SimpleRAG instance, loading it (and unloading the least recently used tenant) if needed
+
+        Args:
+            tenant (str): Tenant name
+
+        Returns:
+            SimpleRAG: The tenant's RAG system, use it with add_pdf, remove_pdf and search as usual
+        """
+        return self._acquire(tenant, pin=False)
+
+    def _acquire(self, tenant, pin):
+        directory = self.tenant_directory(tenant)
+        with self._lock:
+            rag = self._use(tenant, pin)
+            if rag is not None:
+                return rag
+            load_lock = self._load_locks.setdefault(tenant, threading.Lock())
+        with load_lock:
+            with self._lock:
+                # Another thread may have loaded it while we waited
+                rag = self._use(tenant, pin)
+                if rag is not None:
+                    return rag
+                embedder = self.embedder
+            rag = SimpleRAG(**dict(self.rag_kwargs, persist_directory=directory, embedder=embedder))
+            with self._lock:
+                if self.embedder is None:
+                    self.embedder = rag.embedder
+                self._loaded[tenant] = rag
+                if pin:
+                    self._pinned[tenant] += 1
+                evicted = self._evictions()
+        metrics.increment("tenant_loads")
+        for evicted_tenant, evicted_rag in evicted:
+            self._release(evicted_tenant, evicted_rag)
+        return rag
+
+    def _use(self, tenant, pin):
+        """Mark a loaded tenant as most recently used and return it, None if not loaded (call with the lock held)"""
+        rag = self._loaded.get(tenant)
+        if rag is not None:
+            self._loaded.move_to_end(tenant)
+            if pin:
+                self._pinned[tenant] += 1
+        return rag
+
+    def _unpin(self, tenants):
+        with self._lock:
+            for tenant in tenants:
+                self._pinned[tenant] -= 1
+                if self._pinned[tenant] <= 0:
+                    del self._pinned[tenant]
+            evicted = self._evictions()
+        for tenant, rag in evicted:
+            self._release(tenant, rag)
+
+    def _evictions(self):
+        """Remove the least recently used unpinned tenants beyond max_loaded (call with the lock held)"""
+        evicted = []
+        for tenant in list(self._loaded):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            if tenant not in self._pinned:
+                evicted.append((tenant, self._loaded.pop(tenant)))
+        return evicted
+
+    def unload(self, tenant):
+        """Persist and unload a tenant's index, returning True if it was loaded"""
+        with self._lock:
+            rag = self._loaded.pop(tenant, None)
+        if rag is None:
+            return False
+        self._release(tenant, rag)
+        return True
+
+    def _release(self, tenant, rag):
+        rag.close()
+        print(f"💤 Unloaded tenant {tenant}")
+        del rag
+        # Free the tenant's index memory now rather than whenever the collector next runs
+        gc.collect()
+
+    def delete_tenant(self, tenant):
+        """Unload a tenant and delete its index from disk"""
+        self.unload(tenant)
+        directory = self.tenant_directory(tenant)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+            print(f"🗑️  Deleted tenant {tenant}")
+
+    def search(self, tenants, query, n_results=5, qa_batch_size=8, min_similarity=None):
+        """
+        Search several tenants in parallel and answer from the merged top results
+
+        Each tenant's index is queried on its own thread with one shared query embedding. The tenants' ranked
+        candidates are merged with reciprocal rank fusion, reranked once if a reranker is configured, and only the
+        overall top n_results go through QA, so QA cost does not grow with the number of tenants. The searched tenants
+        stay loaded until the search is done, even beyond max_loaded.
+
+        Args:
+            tenants (list): Tenant names to search
+            query (str): Search query
+            n_results (int): Number of results across all tenants
+            qa_batch_size (int): QA pipeline batch size
+            min_similarity (float): Skip QA for chunks below this similarity
+
+        Returns:
+            list: Search result dicts like SimpleRAG.search, each with the "tenant" it came from
+        """
+        tenants = list(dict.fromkeys(tenants))
+        if not tenants:
+            return []
+        # Pinned so a search over more tenants than max_loaded does not unload the ones it already loaded
+        rags = []
+        try:
+            for tenant in tenants:
+                rags.append((tenant, self._acquire(tenant, pin=True)))
+            return self._search(rags, query, n_results, qa_batch_size, min_similarity)
+        finally:
+            self._unpin([tenant for tenant, _ in rags])
+
+    def _search(self, rags, query, n_results, qa_batch_size, min_similarity):
+        query_embedding = self.embedder.encode([query])
+
+        def retrieve(rag):
+            return rag.retrieve(query, n_results, query_embedding)
+
+        with metrics.timer("tenant_fanout"):
+            shards = list(self._executor.map(retrieve, [rag for _, rag in rags]))
+        # Each shard is already in its own hybrid order, so shards are fused by rank rather than by raw similarity
+        candidates = {
+            (row, i): (document, similarity, dict(metadata or {}, tenant=rags[row][0]))
+            for row, (documents, similarities, metadatas) in enumerate(shards)
+            for i, (document, similarity, metadata) in enumerate(zip(documents, similarities, metadatas))
+        }
+        rankings = [[(row, i) for i in range(len(documents))] for row, (documents, _, _) in enumerate(shards)]
+        fused = reciprocal_rank_fusion(rankings)
+        # Equal ranks in different shards are ordered by similarity
+        fused.sort(key=lambda pair: (pair[1], candidates[pair[0]][1]), reverse=True)
+        fused = [candidates[key] for key, _ in fused[:max((len(ranking) for ranking in rankings), default=0)]]
+        merged = ([document for document, _, _ in fused], [similarity for _, similarity, _ in fused],
+                  [metadata for _, _, metadata in fused])
+
+        # Reranking, QA and citations share one configuration, any tenant's instance can run them
+        rag = rags[0][1]
+        reranked = rag.rerank(query, merged, n_results)
+        results = rag.answer(query, reranked, n_results, qa_batch_size, min_similarity)
+        for result, metadata in zip(results, reranked[2]):
+            result["tenant"] = metadata["tenant"]
+        return results
+
+    def close(self):
+        """Unload every tenant and stop the fan-out threads"""
+        for tenant in self.loaded():
+            self.unload(tenant)
+        self._executor.shutdown(wait=True)
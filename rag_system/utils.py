@@ -3,18 +3,23 @@ Utility functions for the RAG system
 """
 
 import PyPDF2
+import hashlib
 import os
+import time
+from .maintenance import cleanup_orphans
+from .metrics import metrics
+from .sections import SectionIndex, read_outline
 
 
-def read_pdf(pdf_path):
+def iter_pdf_pages(pdf_path):
     """
-    Read text from PDF file
+    Read a PDF lazily, one page at a time
     
     Args:
         pdf_path (str): Path to the PDF file
         
-    Returns:
-        str: Extracted text from the PDF
+    Yields:
+        tuple: (page_number, text) with 1-based page numbers
         
     Raises:
         FileNotFoundError: If the PDF file doesn't exist
@@ -27,12 +32,33 @@ def read_pdf(pdf_path):
     try:
         with open(pdf_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            text = " ".join(page.extract_text() for page in pdf_reader.pages)
-            return text
+            # Text is extracted per page as it is consumed, so only one page's text is held at a time
+            for page_number, page in enumerate(pdf_reader.pages, start=1):
+                start = time.perf_counter()
+                text = page.extract_text() or ""
+                metrics.observe("pdf_page_parsing", time.perf_counter() - start)
+                yield page_number, text
     except Exception as e:
         raise Exception(f"Error reading PDF {pdf_path}: {str(e)}")
 
 
+def read_pdf(pdf_path):
+    """
+    Read text from PDF file
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        
+    Returns:
+        str: Extracted text from the PDF
+        
+    Raises:
+        FileNotFoundError: If the PDF file doesn't exist
+        Exception: If there's an error reading the PDF
+    """
+    return " ".join(text for _, text in iter_pdf_pages(pdf_path))
+
+
 def reset_database(rag_instance):
     """
     Clear the database and reinitialize
@@ -47,50 +73,305 @@ def reset_database(rag_instance):
         Exception: If there's an error resetting the database
     """
     try:
-        rag_instance.client.delete_collection("documents")
-        print("🗑️  Deleted old collection in chromaDB")
+        rag_instance.client.delete_collection(rag_instance.collection_name)
+        print(f"🗑️  Deleted old collection in the {rag_instance.vector_store} store")
     except:
         pass
     
-    rag_instance.collection = rag_instance.client.create_collection("documents")
-    print("🔄 Created latest collection in chromaDB")
+    rag_instance.collection = rag_instance.open_collection(create=True)
+    rag_instance.manifest.clear()
+    rag_instance.lexical_index.clear()
+    # Remove segments earlier deletes left behind, ones younger than the orphan age are left to scheduled maintenance
+    cleanup_orphans(rag_instance.persist_directory)
+    rag_instance.save_indexes()
+    rag_instance.collection_changed()
+    print(f"🔄 Created latest collection in the {rag_instance.vector_store} store")
+
+
+def file_hash(path):
+    """
+    Hash a file's contents
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        str: SHA-256 hex digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids_for(document_id, chunks):
+    """
+    Build content-addressed chunk ids, so an unchanged chunk keeps its id across re-ingestion
+
+    Args:
+        document_id (str): Document identity
+        chunks (list): Chunk texts in document order
+
+    Returns:
+        list: One id per chunk, repeated texts get an occurrence suffix
+    """
+    ids = []
+    seen = {}
+    for chunk in chunks:
+        chunk_hash = hashlib.sha1(chunk.encode("utf-8")).hexdigest()[:16]
+        occurrence = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = occurrence + 1
+        ids.append(f"{document_id}:{chunk_hash}" + (f":{occurrence}" if occurrence else ""))
+    return ids
+
+
+def chunk_metadata_for(document_id, document_title, chunks):
+    """
+    Create metadata for each chunk of a document
+
+    Args:
+        document_id (str): Document identity
+        document_title (str): Document title shown in citations
+        chunks (list): Chunk dicts from SentenceChunker in document order, optionally annotated by SectionIndex
+
+    Returns:
+        list: One metadata dict per chunk, with the section fields when the chunk's section is known
+    """
+    metadatas = []
+    for i, chunk in enumerate(chunks):
+        metadata = {
+            "chunk_id": i,
+            "document_id": document_id,
+            "document_title": document_title,
+            "page": chunk["page"],
+            "start_char": chunk["start"],
+            "end_char": chunk["end"]
+        }
+        section = chunk.get("section")
+        if section is not None:
+            metadata.update({
+                "section_number": section["number"],
+                "section_title": section["title"],
+                "section_page": section["page"],
+                "section_start": section["start"],
+                "section_end": section["end"]
+            })
+        metadatas.append(metadata)
+    return metadatas
+
+
+def chunk_pdf(chunker, pdf_path, stats=None):
+    """
+    Stream a PDF's pages into the chunker and tag each chunk with its section
+
+    Sections come from the PDF outline when it has one, otherwise from numbered headings in the text.
+
+    Args:
+        chunker: SentenceChunker
+        pdf_path (str): Path to the PDF file
+        stats (dict): Optional dict that receives chunking stats
+
+    Returns:
+        list: Chunk dicts with "text", "start", "end", "page" and "section"
+    """
+    sections = SectionIndex(read_outline(pdf_path))
+    return sections.annotate(list(chunker.chunk_pages(sections.observe(iter_pdf_pages(pdf_path)), stats)))
+
+
+def plan_document_update(old_ids, ids):
+    """
+    Diff a document's new chunk ids against the ids indexed for its previous version
+
+    Args:
+        old_ids (list): Chunk ids currently indexed for the document
+        ids (list): Chunk ids of the new version in document order
+
+    Returns:
+        tuple: (positions of chunks to add, positions of chunks already indexed, ids to delete)
+    """
+    old_ids_set = set(old_ids)
+    new_ids = set(ids)
+    added = [i for i, chunk_id in enumerate(ids) if chunk_id not in old_ids_set]
+    kept = [i for i, chunk_id in enumerate(ids) if chunk_id in old_ids_set]
+    deleted = [chunk_id for chunk_id in old_ids if chunk_id not in new_ids]
+    return added, kept, deleted
 
 
-def add_pdf(rag_instance, pdf_path):
+def upsert_chunks(rag_instance, ids, documents, embeddings, metadatas):
     """
-    Add PDF document to the system
+    Write chunks to the collection, replacing any existing chunks with the same ids
+
+    Args:
+        rag_instance: SimpleRAG instance
+        ids (list): Chunk ids
+        documents (list): Chunk texts
+        embeddings (np.ndarray): Chunk embeddings
+        metadatas (list): Chunk metadata dicts
+    """
+    if not ids:
+        return
+    with metrics.timer("collection_write"):
+        rag_instance.collection.upsert(
+            ids=list(ids),
+            documents=list(documents),
+            embeddings=embeddings.tolist(),
+            metadatas=list(metadatas)
+        )
+    rag_instance.lexical_index.upsert(list(ids), list(documents))
+    rag_instance.collection_changed()
+
+
+def update_chunk_metadata(rag_instance, ids, metadatas):
+    """
+    Update the metadata of existing chunks without re-embedding them
+
+    Args:
+        rag_instance: SimpleRAG instance
+        ids (list): Chunk ids
+        metadatas (list): New chunk metadata dicts
+    """
+    if not ids:
+        return
+    rag_instance.collection.update(ids=list(ids), metadatas=list(metadatas))
+    rag_instance.collection_changed()
+
+
+def refresh_chunk_metadata(rag_instance, ids, metadatas):
+    """
+    Update the metadata of existing chunks where it differs from the stored metadata
+
+    A kept chunk's text is unchanged, but its offsets, page and section depend on the text before it, so an edit
+    early in a document changes the metadata of every chunk after it.
+
+    Args:
+        rag_instance: SimpleRAG instance
+        ids (list): Chunk ids
+        metadatas (list): New chunk metadata dicts
+
+    Returns:
+        int: Number of chunks whose metadata was updated
+    """
+    if not ids:
+        return 0
+    stored = rag_instance.collection.get(ids=list(ids), include=["metadatas"])
+    stored_metadatas = dict(zip(stored["ids"], stored["metadatas"]))
+    changed = [(chunk_id, metadata) for chunk_id, metadata in zip(ids, metadatas)
+               if stored_metadatas.get(chunk_id) != metadata]
+    update_chunk_metadata(rag_instance, [chunk_id for chunk_id, _ in changed], [metadata for _, metadata in changed])
+    return len(changed)
+
+
+def delete_chunks(rag_instance, ids):
+    """
+    Delete chunks from the collection
+
+    Args:
+        rag_instance: SimpleRAG instance
+        ids (list): Chunk ids
+    """
+    if not ids:
+        return
+    rag_instance.collection.delete(ids=list(ids))
+    rag_instance.lexical_index.delete(list(ids))
+    rag_instance.collection_changed()
+
+
+def remove_pdf(rag_instance, document_id):
+    """
+    Remove a document and all of its chunks from the system
+
+    Args:
+        rag_instance: SimpleRAG instance
+        document_id (str): Document identity used when it was added
+
+    Returns:
+        int: Number of chunks deleted
+    """
+    entry = rag_instance.manifest.get(document_id)
+    if entry is None:
+        return 0
+    delete_chunks(rag_instance, entry["chunk_ids"])
+    # Persist first so a crash never leaves chunks in the store that the manifest no longer knows about
+    rag_instance.client.persist()
+    rag_instance.save_indexes()
+    rag_instance.manifest.remove(document_id)
+    print(f"🗑️  Removed {len(entry['chunk_ids'])} chunks of {document_id}")
+    return len(entry["chunk_ids"])
+
+
+def add_pdf(rag_instance, pdf_path, document_id=None):
+    """
+    Add PDF document to the system, or update it if it was added before
+    
+    Re-adding an unchanged PDF is a no-op. For a changed PDF only new chunks are embedded and written,
+    and chunks that no longer exist are deleted.
     
     Args:
         rag_instance: SimpleRAG instance
         pdf_path (str): Path to the PDF file
+        document_id (str): Document identity, defaults to the file name without extension
         
     Returns:
-        None
+        dict: Counts of added, updated, deleted and unchanged chunks
         
     Raises:
         Exception: If there's an error adding the PDF
     """
     try:
-        text = read_pdf(pdf_path)
-        chunks = rag_instance.chunk_text(text)
-        
         # Extract document title from filename
         document_title = os.path.splitext(os.path.basename(pdf_path))[0]
+        document_id = document_id or document_title
+        
+        content_hash = file_hash(pdf_path)
+        entry = rag_instance.manifest.get(document_id)
+        if entry is not None and entry["content_hash"] == content_hash:
+            print(f"✅ {document_id} is unchanged, nothing to add")
+            return {"document_id": document_id, "added": 0, "updated": 0, "deleted": 0, "unchanged": len(entry["chunk_ids"])}
+        
+        # Pages are streamed into the chunker so the whole document text is never held in memory
+        chunk_stats = {}
+        chunk_records = chunk_pdf(rag_instance.chunker, pdf_path, chunk_stats)
+        chunks = [chunk["text"] for chunk in chunk_records]
+        ids = chunk_ids_for(document_id, chunks)
         
         # Create metadata for each chunk
-        chunk_metadata = []
-        for i, chunk in enumerate(chunks):
-            chunk_metadata.append({
-                "chunk_id": i,
-                "document_title": document_title
-            })
+        chunk_metadata = chunk_metadata_for(document_id, document_title, chunk_records)
+        
+        # Diff against the chunks indexed for the previous version of the document
+        added, kept, deleted = plan_document_update(entry["chunk_ids"] if entry is not None else [], ids)
         
-        rag_instance.collection.add(
-            documents=chunks,
-            ids=[f"doc_{i}" for i in range(len(chunks))],
-            metadatas=chunk_metadata
+        # Embed explicitly with the shared embedder in batches rather than relying on Chroma's default embedder
+        # Unchanged chunks are served from the on-disk embedding cache so only new text is embedded
+        with metrics.timer("document_embedding"):
+            embeddings = rag_instance.embedder.encode([chunks[i] for i in added], use_cache=True)
+        
+        upsert_chunks(
+            rag_instance,
+            [ids[i] for i in added],
+            [chunks[i] for i in added],
+            embeddings,
+            [chunk_metadata[i] for i in added]
         )
-        print(f"✅ Added {len(chunks)} chunks from PDF")
+        # Kept chunks keep their embedding, just their metadata is refreshed where it changed
+        updated = refresh_chunk_metadata(rag_instance, [ids[i] for i in kept], [chunk_metadata[i] for i in kept])
+        delete_chunks(rag_instance, deleted)
+        
+        # The manifest records the document only once the store and lexical index hold it on disk, otherwise a
+        # crash would leave it recorded as unchanged but missing from the index
+        rag_instance.client.persist()
+        rag_instance.save_indexes()
+        rag_instance.manifest.set(document_id, pdf_path, content_hash, ids)
+        summary = {
+            "document_id": document_id,
+            "added": len(added),
+            "updated": updated,
+            "deleted": len(deleted),
+            "unchanged": len(ids) - len(added),
+            "chunk_seconds": chunk_stats.get("chunk_seconds", 0.0)
+        }
+        print(f"✅ Added {len(added)} chunks from PDF ({len(deleted)} deleted, {len(ids) - len(added)} unchanged, "
+              f"chunked in {summary['chunk_seconds'] * 1000:.1f} ms)")
+        return summary
     except Exception as e:
         raise Exception(f"Error adding PDF {pdf_path}: {str(e)}")
-
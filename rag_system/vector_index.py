@@ -0,0 +1,540 @@
+"""
+In-process vector index for the RAG system
+A NumPy alternative to ChromaDB behind the same client/collection interface that SimpleRAG uses
+
+Vectors live in a memory-mapped float32 file, so opening an index is near-instant and several worker processes
+share the same pages. Small collections are searched exactly with vectorized dot products; large ones use an
+HNSW approximate index when hnswlib is installed.
+"""
+
+import glob
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+STATE_FILE = "state.json"
+VECTORS_FILE = "vectors.f32"
+NORMS_FILE = "norms.f32"
+RECORDS_FILE = "records.jsonl"
+# hnsw.json names the HNSW index file of the vectors version it was built for, e.g. hnsw-42.bin
+HNSW_FILE = "hnsw-{version}.bin"
+HNSW_STATE_FILE = "hnsw.json"
+
+
+class NumpyCollection:
+    """Collection of ids, documents, metadatas and embeddings stored in a directory"""
+
+    def __init__(self, directory, name, metadata=None, embedding_function=None, ann_threshold=20000):
+        self.directory = directory
+        self.name = name
+        self.metadata = metadata or {}
+        self.embedding_function = embedding_function
+        self.ann_threshold = ann_threshold
+        self._lock = threading.RLock()
+        self._hnsw = None
+        self._hnsw_version = None
+        self._hnsw_build = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _data_path(self, filename, generation=None):
+        """Path of a data file of the current (or given) generation, generation 0 uses the plain file names"""
+        generation = self._generation if generation is None else generation
+        if generation:
+            stem, extension = os.path.splitext(filename)
+            filename = f"{stem}.{generation}{extension}"
+        return self._path(filename)
+
+    def _load(self):
+        """Load the index state, replaying the records log and mapping the vectors file"""
+        # Stamp before reading so a write landing during the load triggers another reload
+        self._state_stamp = self._stamp()
+        state = {"dimension": None, "rows": 0, "capacity": 0, "version": 0}
+        if self._state_stamp is not None:
+            with open(self._path(STATE_FILE)) as file:
+                state = json.load(file)
+        self._dimension = state["dimension"]
+        self._rows = state["rows"]
+        self._capacity = state["capacity"]
+        self._version = state["version"]
+        # Only bumped by writes that change vectors or row liveness, metadata updates keep the HNSW index valid
+        self._vectors_version = state.get("vectors_version", self._version)
+        # Compaction writes a new generation of data files, the state file switches to it atomically
+        self._generation = state.get("generation", 0)
+        self.metadata = state.get("metadata", self.metadata)
+
+        self._ids = [None] * self._rows
+        self._documents = [None] * self._rows
+        self._metadatas = [None] * self._rows
+        self._row_of = {}
+        records_path = self._data_path(RECORDS_FILE)
+        if os.path.exists(records_path):
+            with open(records_path) as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted write
+                        continue
+                    self._apply(record)
+
+        self._vectors = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        if self._dimension is not None and self._capacity:
+            self._vectors = np.memmap(self._data_path(VECTORS_FILE), dtype=np.float32, mode="r+", shape=(self._capacity, self._dimension))
+            self._norms = self._open_norms()
+        self._live = np.zeros(self._rows, dtype=bool)
+        self._live[list(self._row_of.values())] = True
+
+    def _open_norms(self):
+        """Map the persisted vector norms, computing them once for an index written before they were persisted"""
+        path = self._data_path(NORMS_FILE)
+        if os.path.exists(path) and os.path.getsize(path) == self._capacity * 4:
+            return np.memmap(path, dtype=np.float32, mode="r+", shape=(self._capacity,))
+        norms = np.zeros(self._capacity, dtype=np.float32)
+        norms[:self._rows] = np.linalg.norm(self._vectors[:self._rows], axis=1)
+        norms.tofile(path)
+        return np.memmap(path, dtype=np.float32, mode="r+", shape=(self._capacity,))
+
+    def _apply(self, record):
+        """Apply one records log entry to the in-memory state"""
+        op = record["op"]
+        if op == "put":
+            row = record["row"]
+            # Rows past the saved state were written by an interrupted write and are ignored
+            if row >= self._rows:
+                return
+            previous = self._ids[row]
+            if previous is not None and self._row_of.get(previous) == row:
+                del self._row_of[previous]
+            self._ids[row] = record["id"]
+            self._documents[row] = record["document"]
+            self._metadatas[row] = record["metadata"]
+            self._row_of[record["id"]] = row
+        elif op == "meta":
+            row = self._row_of.get(record["id"])
+            if row is not None:
+                self._metadatas[row] = record["metadata"]
+        elif op == "del":
+            self._row_of.pop(record["id"], None)
+
+    def _refresh(self):
+        """Reload if another process has written to the index since it was loaded"""
+        if self._stamp() != self._state_stamp:
+            try:
+                self._load()
+            except FileNotFoundError:
+                # A compaction replaced the data files between reading the state and opening them
+                self._load()
+
+    def _stamp(self):
+        """Identify the current state file, it is replaced on every write so the inode changes even within one mtime tick"""
+        try:
+            stat = os.stat(self._path(STATE_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _save_state(self, vectors_changed=True):
+        """Write the state file atomically, this is the commit point of every write"""
+        self._version += 1
+        if vectors_changed:
+            self._vectors_version += 1
+        state = {"dimension": self._dimension, "rows": self._rows, "capacity": self._capacity,
+                 "version": self._version, "vectors_version": self._vectors_version, "generation": self._generation,
+                 "metadata": self.metadata}
+        tmp_path = self._path(STATE_FILE + ".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self._path(STATE_FILE))
+        self._state_stamp = self._stamp()
+
+    def _append_records(self, records):
+        with open(self._data_path(RECORDS_FILE), "a") as file:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _ensure_capacity(self, rows):
+        """Grow the vectors file by doubling so appends stay amortized O(1)"""
+        if rows <= self._capacity:
+            return
+        capacity = self._grown_capacity(self._capacity, rows)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._norms.flush()
+            self._vectors = None
+        with open(self._data_path(VECTORS_FILE), "ab") as file:
+            file.truncate(capacity * self._dimension * 4)
+        with open(self._data_path(NORMS_FILE), "ab") as file:
+            file.truncate(capacity * 4)
+        self._capacity = capacity
+        self._vectors = np.memmap(self._data_path(VECTORS_FILE), dtype=np.float32, mode="r+", shape=(capacity, self._dimension))
+        self._norms = np.memmap(self._data_path(NORMS_FILE), dtype=np.float32, mode="r+", shape=(capacity,))
+
+    @staticmethod
+    def _grown_capacity(capacity, rows):
+        capacity = max(1024, capacity)
+        while capacity < rows:
+            capacity *= 2
+        return capacity
+
+    def count(self):
+        """Number of live records"""
+        with self._lock:
+            self._refresh()
+            return len(self._row_of)
+
+    def row_count(self):
+        """Number of stored rows, including deleted and overwritten ones that compaction would reclaim"""
+        with self._lock:
+            self._refresh()
+            return self._rows
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        """Add new records, raising if an id already exists"""
+        with self._lock:
+            self._refresh()
+            existing = [record_id for record_id in ids if record_id in self._row_of]
+            if existing:
+                raise ValueError(f"IDs already exist in collection {self.name}: {existing[:5]}")
+            self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        """Insert records or replace existing records with the same ids"""
+        if embeddings is None:
+            if self.embedding_function is None or documents is None:
+                raise ValueError("Embeddings are required when the collection has no embedding function")
+            embeddings = self.embedding_function(list(documents))
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        ids = list(ids)
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(ids)
+        with self._lock:
+            self._refresh()
+            if self._dimension is None:
+                self._dimension = int(vectors.shape[1])
+            elif vectors.shape[1] != self._dimension:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self._dimension}")
+            rows = []
+            next_row = self._rows
+            for record_id in ids:
+                row = self._row_of.get(record_id)
+                if row is None:
+                    row, next_row = next_row, next_row + 1
+                rows.append(row)
+            self._ensure_capacity(next_row)
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+            self._norms[rows] = np.linalg.norm(vectors, axis=1)
+            self._norms.flush()
+            records = [
+                {"op": "put", "id": record_id, "row": row, "document": document, "metadata": metadata}
+                for record_id, row, document, metadata in zip(ids, rows, documents, metadatas)
+            ]
+            self._append_records(records)
+            grown = next_row - self._rows
+            self._rows = next_row
+            self._ids.extend([None] * grown)
+            self._documents.extend([None] * grown)
+            self._metadatas.extend([None] * grown)
+            for record in records:
+                self._apply(record)
+            self._live = np.concatenate([self._live, np.zeros(grown, dtype=bool)])
+            self._live[rows] = True
+            hnsw_current = self._hnsw_current()
+            self._save_state()
+            if hnsw_current:
+                # Keep a loaded HNSW index in step instead of rebuilding it, an existing label is updated in place
+                if self._hnsw.get_max_elements() < self._rows:
+                    self._hnsw.resize_index(self._capacity)
+                self._hnsw.add_items(vectors, rows)
+                self._hnsw_version = self._vectors_version
+
+    def update(self, ids, metadatas=None, embeddings=None, documents=None):
+        """Update metadata (and optionally embeddings and documents) of existing records"""
+        with self._lock:
+            self._refresh()
+            ids = [record_id for record_id in ids if record_id in self._row_of]
+            if embeddings is not None or documents is not None:
+                rows = [self._row_of[record_id] for record_id in ids]
+                self.upsert(
+                    ids,
+                    embeddings if embeddings is not None else self._vectors[rows],
+                    documents if documents is not None else [self._documents[row] for row in rows],
+                    metadatas if metadatas is not None else [self._metadatas[row] for row in rows]
+                )
+                return
+            if metadatas is None or not ids:
+                return
+            records = [{"op": "meta", "id": record_id, "metadata": metadata} for record_id, metadata in zip(ids, metadatas)]
+            self._append_records(records)
+            for record in records:
+                self._apply(record)
+            self._save_state(vectors_changed=False)
+
+    def delete(self, ids=None):
+        """Delete records by id, their rows are reclaimed by compact()"""
+        with self._lock:
+            self._refresh()
+            ids = [record_id for record_id in (ids or []) if record_id in self._row_of]
+            if not ids:
+                return
+            rows = [self._row_of[record_id] for record_id in ids]
+            records = [{"op": "del", "id": record_id} for record_id in ids]
+            self._append_records(records)
+            for record in records:
+                self._apply(record)
+            self._live[rows] = False
+            hnsw_current = self._hnsw_current()
+            self._save_state()
+            if hnsw_current:
+                for row in rows:
+                    self._hnsw.mark_deleted(row)
+                self._hnsw_version = self._vectors_version
+
+    def get(self, ids=None, include=("documents", "metadatas")):
+        """Return records by id (all records when ids is None) in Chroma's get() result format"""
+        with self._lock:
+            self._refresh()
+            if ids is None:
+                rows = [row for row in range(self._rows) if self._live[row]]
+            else:
+                rows = [self._row_of[record_id] for record_id in ids if record_id in self._row_of]
+            return self._records(rows, include)
+
+    def _records(self, rows, include):
+        result = {"ids": [self._ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [self._documents[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self._metadatas[row] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = np.array(self._vectors[rows]).tolist() if rows else []
+        return result
+
+    def query(self, query_embeddings, n_results=10, include=("documents", "metadatas", "distances")):
+        """
+        Find the nearest records to each query embedding by cosine distance
+
+        Returns:
+            dict: Chroma query() result format, one list per query
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        with self._lock:
+            self._refresh()
+            live = len(self._row_of)
+            k = min(n_results, live)
+            results = {key: [] for key in ("ids", "documents", "metadatas", "distances", "embeddings")}
+            # An empty index (new or just reset) has no dimension yet, every query gets an empty result
+            if k == 0 or self._dimension is None:
+                return {key: [[] for _ in queries] if key == "ids" or key in include else None for key in results}
+            if live >= self.ann_threshold and self._hnsw_index() is not None:
+                rows_per_query, distances_per_query = self._ann_search(queries, k)
+            else:
+                rows_per_query, distances_per_query = self._exact_search(queries, k)
+            for rows, distances in zip(rows_per_query, distances_per_query):
+                records = self._records(list(rows), include)
+                records["distances"] = [float(distance) for distance in distances]
+                for key in results:
+                    results[key].append(records.get(key))
+            # Like Chroma, fields that were not requested are None
+            return {key: values if key == "ids" or key in include else None for key, values in results.items()}
+
+    def _exact_search(self, queries, k):
+        """Brute-force cosine search over all rows with one matrix product for all queries"""
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(query_norms > 0, query_norms, 1.0)
+        norms = np.where(self._norms[:self._rows] > 0, self._norms[:self._rows], 1.0)
+        similarities = (queries @ self._vectors[:self._rows].T) / norms
+        similarities[:, ~self._live] = -np.inf
+        rows_per_query, distances_per_query = [], []
+        for scores in similarities:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows_per_query.append(top)
+            distances_per_query.append(1 - scores[top])
+        return rows_per_query, distances_per_query
+
+    def _hnsw_current(self):
+        """True if the loaded HNSW index reflects the current vectors"""
+        return self._hnsw is not None and self._hnsw_version == self._vectors_version
+
+    def _hnsw_index(self):
+        """
+        Return an HNSW index over the current vectors, or None to search exactly for now
+
+        The index is kept in step with this process's writes. When it is missing or another process has written, the
+        persisted index is loaded if it matches, otherwise it is rebuilt on a background thread so queries never wait
+        for a build. Returns None without hnswlib.
+        """
+        try:
+            import hnswlib
+        except ImportError:
+            return None
+        if self._hnsw_current():
+            return self._hnsw
+        try:
+            with open(self._path(HNSW_STATE_FILE)) as file:
+                saved = json.load(file)
+            if saved.get("vectors_version") == self._vectors_version:
+                index = hnswlib.Index(space="cosine", dim=self._dimension)
+                index.load_index(self._path(saved["file"]), max_elements=self._capacity)
+                self._hnsw, self._hnsw_version = index, self._vectors_version
+                return index
+        except (OSError, ValueError, KeyError, RuntimeError):
+            # Missing, or replaced by a newer build while loading
+            pass
+        if self._hnsw_build is None or not self._hnsw_build.is_alive():
+            self._hnsw_build = threading.Thread(target=self._build_hnsw, name="hnsw-build", daemon=True)
+            self._hnsw_build.start()
+        return None
+
+    def _build_hnsw(self):
+        """Build the HNSW index from a snapshot of the live vectors, persist it and install it if no write happened meanwhile"""
+        import hnswlib
+        with self._lock:
+            version, capacity, dimension = self._vectors_version, self._capacity, self._dimension
+            live_rows = np.flatnonzero(self._live)
+            vectors = np.array(self._vectors[live_rows])
+        print(f"🔧 Building HNSW index for {len(live_rows)} vectors")
+        try:
+            index = hnswlib.Index(space="cosine", dim=dimension)
+            index.init_index(max_elements=max(capacity, 1), ef_construction=200, M=16)
+            index.add_items(vectors, live_rows)
+            # Written under temporary names and renamed so other workers never load a partly written index
+            filename = HNSW_FILE.format(version=version)
+            index.save_index(self._path(filename + ".tmp"))
+            os.replace(self._path(filename + ".tmp"), self._path(filename))
+            tmp_path = self._path(HNSW_STATE_FILE + ".tmp")
+            with open(tmp_path, "w") as file:
+                json.dump({"vectors_version": version, "file": filename}, file)
+            os.replace(tmp_path, self._path(HNSW_STATE_FILE))
+            for path in glob.glob(self._path(HNSW_FILE.format(version="*"))):
+                if os.path.basename(path) != filename:
+                    os.remove(path)
+        except Exception as e:
+            print(f"⚠️ Failed to build HNSW index: {e}")
+            return
+        with self._lock:
+            if self._vectors_version == version:
+                self._hnsw, self._hnsw_version = index, version
+
+    def _ann_search(self, queries, k):
+        """Approximate cosine search with the HNSW index"""
+        index = self._hnsw
+        index.set_ef(max(64, k * 2))
+        rows, distances = index.knn_query(queries, k=k)
+        return list(rows), list(distances)
+
+    def compact(self):
+        """
+        Rewrite the index without deleted and overwritten rows, returning the number of rows reclaimed
+
+        The live rows are written to a new generation of data files and the state file is switched to them last, so
+        a crash at any point leaves either the old or the new index intact.
+        """
+        with self._lock:
+            self._refresh()
+            live_rows = np.flatnonzero(self._live)
+            reclaimed = self._rows - len(live_rows)
+            if not reclaimed:
+                return 0
+            generation = self._generation + 1
+            # Leftovers of a compaction that crashed before committing
+            self._remove_generations(keep=self._generation)
+
+            capacity = self._grown_capacity(0, len(live_rows)) if len(live_rows) else 0
+            if capacity:
+                vectors = np.memmap(self._data_path(VECTORS_FILE, generation), dtype=np.float32, mode="w+", shape=(capacity, self._dimension))
+                vectors[:len(live_rows)] = self._vectors[live_rows]
+                vectors.flush()
+                norms = np.memmap(self._data_path(NORMS_FILE, generation), dtype=np.float32, mode="w+", shape=(capacity,))
+                norms[:len(live_rows)] = self._norms[live_rows]
+                norms.flush()
+                del vectors, norms
+            with open(self._data_path(RECORDS_FILE, generation), "w") as file:
+                for new_row, row in enumerate(live_rows):
+                    record = {"op": "put", "id": self._ids[row], "row": new_row,
+                              "document": self._documents[row], "metadata": self._metadatas[row]}
+                    file.write(json.dumps(record) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+            self._generation, self._rows, self._capacity = generation, len(live_rows), capacity
+            try:
+                self._save_state()
+            except Exception:
+                # Not committed, go back to the state on disk
+                self._load()
+                raise
+            # Rows are renumbered, so the HNSW index is rebuilt rather than updated
+            self._hnsw = None
+            self._load()
+            self._remove_generations(keep=generation)
+            return reclaimed
+
+    def _remove_generations(self, keep):
+        """Remove the data files of every generation except keep"""
+        for filename in (VECTORS_FILE, NORMS_FILE, RECORDS_FILE):
+            stem, extension = os.path.splitext(filename)
+            for path in [self._path(filename)] + glob.glob(self._path(f"{stem}.*{extension}")):
+                if path != self._data_path(filename, keep) and os.path.exists(path):
+                    os.remove(path)
+
+
+class NumpyVectorStore:
+    """Client for NumPy collections stored under a persist directory, mirroring the chromadb client methods SimpleRAG uses"""
+
+    def __init__(self, persist_directory, ann_threshold=20000):
+        self.persist_directory = persist_directory
+        self.ann_threshold = ann_threshold
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def _directory(self, name):
+        return os.path.join(self.persist_directory, f"{name}.npindex")
+
+    def get_or_create_collection(self, name, metadata=None, embedding_function=None):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = NumpyCollection(self._directory(name), name, metadata, embedding_function, self.ann_threshold)
+            elif embedding_function is not None:
+                self._collections[name].embedding_function = embedding_function
+            return self._collections[name]
+
+    def create_collection(self, name, metadata=None, embedding_function=None):
+        if os.path.exists(os.path.join(self._directory(name), STATE_FILE)):
+            raise ValueError(f"Collection {name} already exists")
+        return self.get_or_create_collection(name, metadata, embedding_function)
+
+    def get_collection(self, name, embedding_function=None):
+        if not os.path.exists(os.path.join(self._directory(name), STATE_FILE)):
+            raise ValueError(f"Collection {name} does not exist")
+        return self.get_or_create_collection(name, embedding_function=embedding_function)
+
+    def delete_collection(self, name):
+        with self._lock:
+            self._collections.pop(name, None)
+            if not os.path.exists(self._directory(name)):
+                raise ValueError(f"Collection {name} does not exist")
+            shutil.rmtree(self._directory(name))
+
+    def list_collections(self):
+        if not os.path.exists(self.persist_directory):
+            return []
+        return [
+            self.get_or_create_collection(entry[:-len(".npindex")])
+            for entry in sorted(os.listdir(self.persist_directory))
+            if entry.endswith(".npindex")
+        ]
+
+    def persist(self):
+        """Writes are durable as soon as they return, so there is nothing to flush"""
@@ -39,17 +39,10 @@ def get_memory_usage():
     process = psutil.Process()
     return process.memory_info().rss / 1024 / 1024
 
-def get_storage_size():
-    """Get vector database storage size in MB"""
-    db_path = "./data/vector_db"
-    if os.path.exists(db_path):
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(db_path):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                total_size += os.path.getsize(filepath)
-        return total_size / 1024 / 1024
-    return 0
+def get_storage_size(rag):
+    """Get vector database storage size in MB and vector count from the summary refreshed on write"""
+    summary = rag.storage.summary()
+    return summary["bytes"] / 1024 / 1024, summary["vectors"]
 
 # Title
 st.title("📋 Compliance Assistant")
@@ -78,8 +71,21 @@ pdf_path = "data/documents/sample_IT_compliance_document.pdf"
 if not os.path.exists(pdf_path):
     create_sample_pdf()
 
-# Load RAG system
-rag = SimpleRAG()
+# Load RAG system once per process, st.cache_resource keeps it across Streamlit reruns
+@st.cache_resource
+def load_rag_system():
+    """Create and warm up the RAG system"""
+    rag = SimpleRAG(collect_metrics=True)
+    rag.warmup()
+    return rag
+
+rag = load_rag_system()
+
+@st.cache_data
+def load_pdf_contents(pdf_path, modified_time):
+    """Read the PDF text once per file version instead of on every rerun"""
+    from rag_system.utils import read_pdf
+    return read_pdf(pdf_path)
 
 # PDF Content Dropdown
 with st.expander("View sample_IT_compliance_document.pdf contents", expanded=False):
@@ -87,8 +93,7 @@ with st.expander("View sample_IT_compliance_document.pdf contents", expanded=Fal
     pdf_path = "data/documents/sample_IT_compliance_document.pdf"
     if os.path.exists(pdf_path):
         try:
-            from rag_system.utils import read_pdf
-            pdf_content = read_pdf(pdf_path)
+            pdf_content = load_pdf_contents(pdf_path, os.path.getmtime(pdf_path))
             st.markdown(pdf_content)
         except Exception as e:
             st.error(f"Error reading PDF: {e}")
@@ -110,8 +115,22 @@ with st.sidebar:
 
     
     # Storage size
-    storage_mb = get_storage_size()
+    storage_mb, vector_count = get_storage_size(rag)
     st.metric("Storage Size", f"{storage_mb:.1f} MB")
+    st.metric("Vectors", vector_count if vector_count is not None else "-")
+
+    # Time spent in each stage of the pipeline
+    st.header("⏱️ Stage Timings")
+    snapshot = rag.metrics.snapshot()
+    if snapshot["stages"]:
+        st.table({
+            "Stage": list(snapshot["stages"]),
+            "Calls": [stage["count"] for stage in snapshot["stages"].values()],
+            "Mean (ms)": [f"{stage['mean_ms']:.1f}" for stage in snapshot["stages"].values()],
+            "p95 (ms)": [f"{stage['p95_ms']:.1f}" for stage in snapshot["stages"].values()]
+        })
+    for name, value in snapshot["counters"].items():
+        st.write(f"{name}: {value}")
 
     
     # Force reload RAG system (for debugging)
@@ -128,26 +147,19 @@ if st.button("🔍 Search", type="secondary") and query:
     start_time = time.time()
     initial_memory = get_memory_usage()
     
-    with st.spinner("Searching..."):
-        # Measure embedding and search time
-        search_start = time.time()
-        
-        # Call search with 5 results
-        results = rag.search(query, 5)
-        
-        search_time = time.time() - search_start
-        
-        # Calculate performance metrics
-        total_time = time.time() - start_time
-        final_memory = get_memory_usage()
-        memory_delta = final_memory - initial_memory
-        
-        
+    # Measure embedding and search time
+    search_start = time.time()
+    
+    def render_results(results, answering):
+        """Render the best answer and all results, answering is True while answers are still being extracted"""
         # Show best answer first
         if results and isinstance(results[0], dict) and "answer" in results[0]:
             best_result = results[0]
             st.markdown("### 🎯 Best Answer:")
-            st.success(f"**{best_result['answer']}**")
+            if best_result["answer"]:
+                st.success(f"**{best_result['answer']}**")
+            elif answering:
+                st.info("Extracting answer...")
             st.markdown(f"*Confidence: {best_result['similarity']:.1%}*")
             if best_result.get("citation"):
                 st.markdown(f"*Source: {best_result['citation']}*")
@@ -171,6 +183,25 @@ if st.button("🔍 Search", type="secondary") and query:
                 else:
                     # Old string format (fallback)
                     st.write(result)
+    
+    # Retrieval hits are shown straight away and answers fill in as each QA pass completes
+    results_area = st.empty()
+    with st.spinner("Searching..."):
+        results = []
+        for event in rag.search_stream(query, 5):
+            if event["event"] in ("hits", "done"):
+                results = event["results"]
+            elif event["event"] == "answer":
+                results[event["index"]]["answer"] = event["answer"]
+            with results_area.container():
+                render_results(results, answering=event["event"] != "done")
+    
+    search_time = time.time() - search_start
+    
+    # Calculate performance metrics
+    total_time = time.time() - start_time
+    final_memory = get_memory_usage()
+    memory_delta = final_memory - initial_memory
         
 # Footer
 st.markdown("---")
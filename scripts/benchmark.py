@@ -0,0 +1,214 @@
+"""
+Reproducible ingest and query benchmark for the RAG system
+Measures PDF parsing, chunking, embedding, collection.add, collection.query and QA extraction separately and
+saves p50/p95/p99 latency, throughput and peak RSS as JSON so runs can be compared
+
+Run offline with stand-in models:   python scripts/benchmark.py --stand-in --output bench.json
+Compare against an earlier run:     python scripts/benchmark.py --stand-in --compare bench.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+# Add the repository root and scripts directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from create_sample_pdf import create_synthetic_pdf
+from rag_system.core import SimpleRAG
+from rag_system.embeddings import HashingEmbedder
+from rag_system.utils import iter_pdf_pages, chunk_ids_for
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, items):
+    """Summarize per-call latencies (seconds) and the number of items they processed"""
+    total = sum(latencies)
+    return {
+        "calls": len(latencies),
+        "items": items,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "throughput_per_s": round(items / total, 1) if total > 0 else 0.0
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module, psutil reports the peak working set there
+        import psutil
+        memory = psutil.Process().memory_info()
+        return round(getattr(memory, "peak_wset", memory.rss) / 1024 / 1024, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def stand_in_qa(question, context, **kwargs):
+    """Offline stand-in for the QA pipeline: answers with the sentence sharing the most words with the question"""
+    results = []
+    for query, document in zip(question, context):
+        words = set(re.findall(r"\w+", query.lower()))
+        sentences = re.split(r"(?<=[.!?])\s+", document)
+        scores = [len(words & set(re.findall(r"\w+", sentence.lower()))) for sentence in sentences]
+        best = max(range(len(sentences)), key=scores.__getitem__)
+        results.append({"answer": sentences[best], "score": scores[best] / max(len(words), 1)})
+    return results
+
+
+class StandInRAG(SimpleRAG):
+    """SimpleRAG with offline stand-in models"""
+
+    @property
+    def qa_pipeline(self):
+        return stand_in_qa
+
+
+def build_rag(args, persist_directory):
+    """Create the system under test with caches disabled so every stage does real work"""
+    rag_class = StandInRAG if args.stand_in else SimpleRAG
+    rag = rag_class(
+        persist_directory=persist_directory,
+        embedding_cache_dir=None,
+        query_cache_size=0,
+        embedding_batch_size=args.batch_size,
+        vector_store=args.vector_store
+    )
+    if args.stand_in:
+        rag.embedder = HashingEmbedder()
+        rag.collection = rag.open_collection()
+    return rag
+
+
+def run(args):
+    """Run every benchmark stage and return the results"""
+    work_directory = tempfile.mkdtemp(prefix="rag-benchmark-")
+    rag = build_rag(args, os.path.join(work_directory, "vector_db"))
+
+    pdf_paths = []
+    queries = []
+    for i in range(args.documents):
+        pdf_path = os.path.join(work_directory, f"synthetic_{i}.pdf")
+        content = create_synthetic_pdf(pdf_path, sections=args.sections, seed=args.seed + i)
+        pdf_paths.append(pdf_path)
+        # Turn some clauses into questions so queries have real matches
+        queries.extend(f"{clause.split(' ', 1)[1].rstrip('.')}?" for clause in content[1::7])
+    queries = queries[:args.queries]
+
+    parse_latencies, chunk_latencies, pages, chunks = [], [], 0, []
+    for pdf_path in pdf_paths:
+        start = time.perf_counter()
+        page_texts = list(iter_pdf_pages(pdf_path))
+        parse_latencies.append(time.perf_counter() - start)
+        pages += len(page_texts)
+        start = time.perf_counter()
+        chunks.extend(chunk["text"] for chunk in rag.chunk_pages(page_texts))
+        chunk_latencies.append(time.perf_counter() - start)
+
+    embed_latencies, add_latencies = [], []
+    ids = chunk_ids_for("benchmark", chunks)
+    for start_index in range(0, len(chunks), args.batch_size):
+        batch = chunks[start_index:start_index + args.batch_size]
+        start = time.perf_counter()
+        embeddings = rag.embedder.encode(batch)
+        embed_latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        rag.collection.add(
+            ids=ids[start_index:start_index + args.batch_size],
+            documents=batch,
+            embeddings=embeddings.tolist(),
+            metadatas=[{"document_title": "benchmark"} for _ in batch]
+        )
+        add_latencies.append(time.perf_counter() - start)
+
+    query_embed_latencies, query_latencies, qa_latencies = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_embedding = rag.embedder.encode([query])
+        query_embed_latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        retrieved = rag._retrieve(query_embedding, args.n_results)
+        query_latencies.append(time.perf_counter() - start)
+        documents, similarities, _ = retrieved[0]
+        start = time.perf_counter()
+        rag._extract_answers_in_batches(query, documents, similarities, args.qa_batch_size)
+        qa_latencies.append(time.perf_counter() - start)
+
+    return {
+        "config": vars(args),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "corpus": {"documents": len(pdf_paths), "pages": pages, "chunks": len(chunks), "queries": len(queries)},
+        "stages": {
+            "parse_pdf": summarize(parse_latencies, pages),
+            "chunk_text": summarize(chunk_latencies, len(chunks)),
+            "embed_documents": summarize(embed_latencies, len(chunks)),
+            "collection_add": summarize(add_latencies, len(chunks)),
+            "embed_query": summarize(query_embed_latencies, len(queries)),
+            "collection_query": summarize(query_latencies, len(queries)),
+            "qa_extraction": summarize(qa_latencies, len(queries) * args.n_results)
+        },
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions where p50 or p95 latency grew by more than tolerance over the baseline"""
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if previous[metric] > 0 and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{stage} {metric}: {previous[metric]:.3f} -> {current[metric]:.3f}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RAG ingest and query latency and throughput")
+    parser.add_argument("--documents", type=int, default=5, help="Number of synthetic PDFs")
+    parser.add_argument("--sections", type=int, default=40, help="Sections per synthetic PDF")
+    parser.add_argument("--queries", type=int, default=50, help="Number of queries")
+    parser.add_argument("--n-results", type=int, default=5, help="Chunks retrieved per query")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding batch and collection.add")
+    parser.add_argument("--qa-batch-size", type=int, default=8, help="QA pipeline batch size")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus")
+    parser.add_argument("--vector-store", choices=["chroma", "numpy"], default="chroma", help="Vector index backend")
+    parser.add_argument("--stand-in", action="store_true", help="Use offline stand-in models instead of downloading models")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed latency growth over the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"✅ Saved benchmark results to {args.output}")
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("❌ Regressions:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("✅ No regressions against baseline")
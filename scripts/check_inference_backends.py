@@ -0,0 +1,120 @@
+"""
+Accuracy and speed check of the inference backends against the fp32 PyTorch baseline
+Runs the sample queries through the QA pipeline and embedder of each backend and reports answer agreement,
+embedding similarity to fp32, latency and memory
+
+Run with: python scripts/check_inference_backends.py --backends torch-int8 onnx onnx-int8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import psutil
+
+# Add the repository root to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag_system.models import INFERENCE_BACKENDS, get_embedding_model, get_qa_pipeline
+
+# Sample queries from ARCHITECTURE.md with the clause of the sample PDF that answers them
+SAMPLE_QUERIES = [
+    ("how often must access reviews be performed?",
+     "4.2 Access reviews are conducted quarterly by the 30th of March, June, September, and December."),
+    ("how many levels is Company data classified?",
+     "1.1 Company data is classified into three levels: Public, Internal, and Confidential."),
+    ("what levels is Company data classified?",
+     "1.1 Company data is classified into three levels: Public, Internal, and Confidential.")
+]
+
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    return round(psutil.Process().memory_info().rss / 1024 / 1024, 1)
+
+
+def run_backend(backend, args):
+    """Load one backend's models and return its answers, embeddings, latencies and memory growth"""
+    rss_before = rss_mb()
+    qa_pipeline = get_qa_pipeline(args.pipeline_model, -1, backend, args.model_cache_dir)
+    embedder = get_embedding_model(args.embedding_model, -1, backend, args.model_cache_dir)
+    memory_mb = round(rss_mb() - rss_before, 1)
+
+    questions = [query for query, _ in SAMPLE_QUERIES]
+    contexts = [context for _, context in SAMPLE_QUERIES]
+    # The first call pays for lazy initialization, so it is excluded from the timings
+    qa_pipeline(question=questions[0], context=contexts[0])
+    embedder.encode(questions[:1])
+
+    qa_latencies, embed_latencies = [], []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        answers = qa_pipeline(question=questions, context=contexts, handle_impossible_answer=True, max_answer_len=50)
+        qa_latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        embeddings = embedder.encode(contexts + questions, normalize_embeddings=True, convert_to_numpy=True)
+        embed_latencies.append(time.perf_counter() - start)
+    return {
+        "answers": [answer["answer"] for answer in answers],
+        "scores": [float(answer["score"]) for answer in answers],
+        "embeddings": np.asarray(embeddings, dtype=np.float32),
+        "qa_ms": round(min(qa_latencies) * 1000, 1),
+        "embed_ms": round(min(embed_latencies) * 1000, 1),
+        "memory_mb": memory_mb
+    }
+
+
+def run_isolated(backend, args):
+    """Run one backend in a fresh process so its memory is measured without the other backends' models"""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_backend, (backend, args))
+
+
+def compare(baseline, candidate):
+    """Compare a backend's outputs with the fp32 baseline"""
+    matches = [a.strip().lower() == b.strip().lower() for a, b in zip(baseline["answers"], candidate["answers"])]
+    cosines = np.sum(baseline["embeddings"] * candidate["embeddings"], axis=1)
+    return {
+        "answer_agreement": sum(matches) / len(matches),
+        "max_score_delta": round(max(abs(a - b) for a, b in zip(baseline["scores"], candidate["scores"])), 4),
+        "min_embedding_cosine": round(float(cosines.min()), 4),
+        "qa_speedup": round(baseline["qa_ms"] / candidate["qa_ms"], 2) if candidate["qa_ms"] else 0.0,
+        "embed_speedup": round(baseline["embed_ms"] / candidate["embed_ms"], 2) if candidate["embed_ms"] else 0.0
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check quantized and ONNX inference backends against fp32 PyTorch")
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx", "onnx-int8"],
+                        choices=[backend for backend in INFERENCE_BACKENDS if backend != "torch"], help="Backends to check")
+    parser.add_argument("--embedding-model", default="sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
+    parser.add_argument("--pipeline-model", default="deepset/roberta-base-squad2")
+    parser.add_argument("--model-cache-dir", default="./data/model_cache", help="Directory for converted models")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per backend, the fastest is reported")
+    parser.add_argument("--min-agreement", type=float, default=1.0, help="Required share of answers matching fp32")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Required cosine similarity to fp32 embeddings")
+    args = parser.parse_args()
+
+    baseline = run_isolated("torch", args)
+    report = {"torch": {key: value for key, value in baseline.items() if key != "embeddings"}}
+    failures = []
+    for backend in args.backends:
+        try:
+            candidate = run_isolated(backend, args)
+        except ImportError as e:
+            print(f"⚠️ Skipping {backend}: {e}")
+            continue
+        report[backend] = {key: value for key, value in candidate.items() if key != "embeddings"}
+        report[backend].update(compare(baseline, candidate))
+        if report[backend]["answer_agreement"] < args.min_agreement or report[backend]["min_embedding_cosine"] < args.min_cosine:
+            failures.append(backend)
+
+    print(json.dumps(report, indent=2))
+    if failures:
+        print(f"❌ Accuracy below threshold for: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ All checked backends match the fp32 baseline")
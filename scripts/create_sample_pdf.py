@@ -96,5 +96,48 @@ def create_sample_pdf():
     c.save()
     print(f"✅ Created {filename}")
 
+def create_synthetic_pdf(path, sections=20, clauses_per_section=5, seed=0):
+    """Create a synthetic IT compliance PDF of configurable size, laid out like the sample document, for benchmarking"""
+    import os
+    import random
+    
+    rng = random.Random(seed)
+    topics = ["Data Classification", "LLM Usage", "AI Content Generation", "Access Control", "Compliance Monitoring",
+              "Incident Response", "Vendor Management", "Backup and Recovery", "Encryption", "Asset Management"]
+    subjects = ["All employees", "Contractors", "The IT Security team", "Data owners", "System administrators", "Managers"]
+    actions = ["must review", "must approve", "must document", "must report", "must encrypt", "must classify"]
+    objects = ["access requests", "confidential data", "LLM-generated content", "audit logs", "vendor contracts", "backups"]
+    deadlines = ["within 24 hours", "within 48 hours", "within 3 business days", "quarterly", "annually by December 31st",
+                 "within 30 days of discovery"]
+    
+    content = []
+    for section in range(1, sections + 1):
+        content.append(f"{section}. {rng.choice(topics)} Policy")
+        for clause in range(1, clauses_per_section + 1):
+            content.append(f"{section}.{clause} {rng.choice(subjects)} {rng.choice(actions)} {rng.choice(objects)} {rng.choice(deadlines)}.")
+    
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    c = canvas.Canvas(path, pagesize=letter)
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(1*inch, 10*inch, "Synthetic IT Compliance Agreement")
+    y_position = 9*inch
+    
+    for text in content:
+        # Start a new page when the current one is full
+        if y_position < 1*inch:
+            c.showPage()
+            y_position = 10*inch
+        if text.split()[0].endswith("."):  # Section headers
+            c.setFont("Helvetica-Bold", 14)
+            c.drawString(1*inch, y_position, text)
+            y_position -= 0.3*inch
+        else:  # Section content
+            c.setFont("Helvetica", 12)
+            c.drawString(1*inch, y_position, text[:90])
+            y_position -= 0.3*inch
+    
+    c.save()
+    return content
+
 if __name__ == "__main__":
     create_sample_pdf() 
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""
+Offline retrieval-quality and latency evaluation for the RAG system
+Runs a golden set of question / expected answer / expected section triples through SimpleRAG.search under several
+configurations and reports recall@k, exact-match/F1 of the best answer and search latency side by side
+
+Run offline with stand-in models:   python scripts/evaluate.py --stand-in
+Compare configurations:             python scripts/evaluate.py --configs baseline numpy rerank torch-int8
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import string
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Add the repository root and scripts directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark import StandInRAG, percentile
+from rag_system.core import SimpleRAG
+from rag_system.embeddings import HashingEmbedder
+from rag_system.utils import add_pdf
+
+# SimpleRAG arguments per configuration, "search" holds arguments for SimpleRAG.search
+CONFIGURATIONS = {
+    "baseline": {},
+    "numpy": {"vector_store": "numpy"},
+    "vector-only": {"hybrid_search": False},
+    "rerank": {"reranker": "overlap"},
+    "cross-encoder": {"reranker": "cross-encoder"},
+    "torch-int8": {"inference_backend": "torch-int8"},
+    "onnx-int8": {"inference_backend": "onnx-int8"},
+    "chunk-400": {"chunk_size": 400},
+    "min-similarity": {"search": {"min_similarity": 0.3}},
+    "early-stop": {"search": {"early_stop_margin": 0.3}}
+}
+
+# "sample_IT_compliance_document.pdf - Section 4.2. Access reviews ..." -> document title and section number
+CITATION = re.compile(r"^(?:(.*?)\.pdf - )?Section ((?:\d+\.)*\d+)\.")
+
+
+def normalize_answer(text):
+    """Lowercase and drop punctuation, articles and extra whitespace (SQuAD answer normalization)"""
+    text = "".join(char for char in text.lower() if char not in string.punctuation)
+    return " ".join(re.sub(r"\b(a|an|the)\b", " ", text).split())
+
+
+def exact_match(prediction, answers):
+    """1.0 if the prediction equals any expected answer after normalization"""
+    return float(any(normalize_answer(prediction) == normalize_answer(answer) for answer in answers))
+
+
+def f1_score(prediction, answers):
+    """Best token-overlap F1 of the prediction against the expected answers"""
+    best = 0.0
+    predicted_tokens = normalize_answer(prediction).split()
+    for answer in answers:
+        answer_tokens = normalize_answer(answer).split()
+        common = sum((Counter(predicted_tokens) & Counter(answer_tokens)).values())
+        if common:
+            precision, recall = common / len(predicted_tokens), common / len(answer_tokens)
+            best = max(best, 2 * precision * recall / (precision + recall))
+    return best
+
+
+def section_matches(result, expected_section, expected_document=None):
+    """
+    Check a search result against the expected section
+
+    A chunk is cited by the section it starts in, so a cited section matches exactly, and a chunk that starts in an
+    earlier section matches only if the expected clause number itself appears in its text. A parent section does not
+    match its subsections, a chunk holding only the heading of section 1 does not answer clause 1.1.
+    """
+    match = CITATION.match(result.get("citation") or "")
+    if match is None or not expected_section:
+        return False
+    document, section = match.groups()
+    if expected_document and document and document != expected_document:
+        return False
+    if expected_section == section:
+        return True
+    clause = re.compile(rf"(?<![\d.]){re.escape(expected_section)}(?!\.?\d)")
+    return clause.search(result.get("text") or "") is not None
+
+
+def load_golden(path):
+    """Load the golden set, a JSON list of {"query", "answers", "section", "document"} entries"""
+    with open(path) as file:
+        golden = json.load(file)
+    for entry in golden:
+        if not entry.get("query") or not entry.get("answers"):
+            raise ValueError(f"Golden entry needs a query and at least one answer: {entry}")
+    return golden
+
+
+def build_rag(config, args, persist_directory):
+    """Create the system under test for one configuration, with caches disabled so every query does real work"""
+    kwargs = {key: value for key, value in config.items() if key != "search"}
+    if args.stand_in:
+        return StandInRAG(persist_directory=persist_directory, embedding_cache_dir=None, query_cache_size=0,
+                          embedder=HashingEmbedder(), **kwargs)
+    return SimpleRAG(persist_directory=persist_directory, embedding_cache_dir=None, query_cache_size=0, **kwargs)
+
+
+def evaluate(name, config, golden, pdf_paths, args):
+    """
+    Ingest the documents under one configuration and run the golden queries
+
+    Args:
+        name (str): Configuration name
+        config (dict): SimpleRAG arguments, plus SimpleRAG.search arguments under "search"
+        golden (list): Golden set entries
+        pdf_paths (list): PDFs to ingest
+        args: Parsed command line arguments
+
+    Returns:
+        dict: Aggregate metrics and per-query results
+    """
+    work_directory = tempfile.mkdtemp(prefix=f"rag-eval-{name}-")
+    rag = build_rag(config, args, os.path.join(work_directory, "vector_db"))
+    for pdf_path in pdf_paths:
+        add_pdf(rag, pdf_path)
+    rag.warmup()
+
+    queries, latencies = [], []
+    for entry in golden:
+        # Fastest of the repeats, so one-off pauses do not count as regressions
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            results = rag.search(entry["query"], n_results=args.k, use_cache=False, **config.get("search", {}))
+            timings.append(time.perf_counter() - start)
+        latencies.append(min(timings))
+
+        best_answer = results[0]["answer"] if results else ""
+        rank = next((i + 1 for i, result in enumerate(results)
+                     if section_matches(result, entry.get("section", ""), entry.get("document"))), None)
+        queries.append({
+            "query": entry["query"],
+            "answer": best_answer,
+            "exact_match": exact_match(best_answer, entry["answers"]),
+            "f1": round(f1_score(best_answer, entry["answers"]), 4),
+            "section_rank": rank,
+            "latency_ms": round(latencies[-1] * 1000, 2)
+        })
+
+    count = len(queries)
+    return {
+        "config": config,
+        f"recall@{args.k}": round(sum(query["section_rank"] is not None for query in queries) / count, 4),
+        "mrr": round(sum(1 / query["section_rank"] for query in queries if query["section_rank"]) / count, 4),
+        "exact_match": round(sum(query["exact_match"] for query in queries) / count, 4),
+        "f1": round(sum(query["f1"] for query in queries) / count, 4),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "queries": queries
+    }
+
+
+def check(name, report, baseline, args):
+    """Return the failed thresholds of one configuration, absolute and relative to the baseline configuration"""
+    failures = []
+    if report[f"recall@{args.k}"] < args.min_recall:
+        failures.append(f"{name} recall@{args.k} {report[f'recall@{args.k}']:.2f} < {args.min_recall:.2f}")
+    if report["f1"] < args.min_f1:
+        failures.append(f"{name} F1 {report['f1']:.2f} < {args.min_f1:.2f}")
+    if args.max_p95_ms is not None and report["p95_ms"] > args.max_p95_ms:
+        failures.append(f"{name} p95 {report['p95_ms']:.1f} ms > {args.max_p95_ms:.1f} ms")
+    if baseline is not None and report is not baseline and baseline["f1"] - report["f1"] > args.max_f1_drop:
+        failures.append(f"{name} F1 dropped {baseline['f1']:.2f} -> {report['f1']:.2f} against the baseline")
+    return failures
+
+
+def print_table(reports, k):
+    """Print the aggregate metrics of every configuration side by side"""
+    columns = [f"recall@{k}", "mrr", "exact_match", "f1", "p50_ms", "p95_ms"]
+    width = max([len("config")] + [len(name) for name in reports])
+    print(f"{'config':<{width}}  " + "  ".join(f"{column:>11}" for column in columns))
+    for name, report in reports.items():
+        print(f"{name:<{width}}  " + "  ".join(f"{report[column]:>11}" for column in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality, answer quality and latency on a golden set")
+    parser.add_argument("--golden", default="./data/eval/golden_queries.json", help="Golden set JSON")
+    parser.add_argument("--documents", default="./data/documents", help="Directory of PDFs to ingest")
+    parser.add_argument("--configs", nargs="+", default=["baseline", "numpy", "rerank"], help=f"Configurations from {', '.join(CONFIGURATIONS)}, the first one is the baseline")
+    parser.add_argument("--config-file", help="JSON mapping extra configuration names to SimpleRAG arguments")
+    parser.add_argument("--k", type=int, default=5, help="Results retrieved per query")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed repetitions per query, the fastest is reported")
+    parser.add_argument("--stand-in", action="store_true", help="Use offline stand-in models instead of downloading models")
+    parser.add_argument("--min-recall", type=float, default=1.0, help="Required recall@k")
+    parser.add_argument("--min-f1", type=float, default=0.0, help="Required mean answer F1")
+    parser.add_argument("--max-f1-drop", type=float, default=0.05, help="Allowed F1 drop against the baseline configuration")
+    parser.add_argument("--max-p95-ms", type=float, help="Allowed p95 search latency")
+    parser.add_argument("--output", help="Write the full report JSON to this path")
+    parser.add_argument("--allow-skip", action="store_true", help="Do not fail when a configuration's optional dependencies are missing")
+    args = parser.parse_args()
+
+    configurations = dict(CONFIGURATIONS)
+    if args.config_file:
+        with open(args.config_file) as file:
+            configurations.update(json.load(file))
+    unknown = [name for name in args.configs if name not in configurations]
+    if unknown:
+        parser.error(f"Unknown configurations: {', '.join(unknown)}")
+
+    golden = load_golden(args.golden)
+    pdf_paths = sorted(glob.glob(os.path.join(args.documents, "*.pdf")))
+    reports, skipped = {}, []
+    for name in args.configs:
+        try:
+            reports[name] = evaluate(name, configurations[name], golden, pdf_paths, args)
+        except ImportError as e:
+            print(f"⚠️ Skipping {name}: {e}")
+            skipped.append(name)
+
+    print_table(reports, args.k)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(reports, file, indent=2)
+        print(f"✅ Saved evaluation report to {args.output}")
+    # Without the baseline, F1 drops cannot be checked rather than being checked against another configuration
+    baseline = reports.get(args.configs[0])
+    failures = [failure for name, report in reports.items() for failure in check(name, report, baseline, args)]
+    if baseline is None:
+        print(f"⚠️ Baseline {args.configs[0]} is missing, F1 drops are not checked")
+    if skipped and not args.allow_skip:
+        failures += [f"{name} was skipped, install its dependencies or pass --allow-skip" for name in skipped]
+    if failures:
+        print("❌ Failed checks:\n" + "\n".join(failures))
+        sys.exit(1)
+    print(f"✅ All evaluated configurations meet the thresholds{f', skipped {len(skipped)}' if skipped else ''}")
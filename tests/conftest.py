@@ -0,0 +1,29 @@
+import re
+
+import pytest
+
+from rag_system.core import SimpleRAG
+from rag_system.embeddings import HashingEmbedder
+
+
+def stand_in_qa(question, context, **kwargs):
+    """Offline stand-in for the QA pipeline: answers with the first sentence of each context"""
+    return [{"answer": re.split(r"(?<=[.!?])\s+", document)[0], "score": 0.5} for document in context]
+
+
+class StandInRAG(SimpleRAG):
+    """SimpleRAG with offline stand-in models"""
+
+    @property
+    def qa_pipeline(self):
+        return stand_in_qa
+
+
+@pytest.fixture
+def make_rag(tmp_path):
+    """Create SimpleRAG instances on the NumPy store with stand-in models under a temporary directory"""
+    def make(**kwargs):
+        kwargs.setdefault("persist_directory", str(tmp_path / "vector_db"))
+        kwargs.setdefault("embedding_cache_dir", None)
+        return StandInRAG(vector_store="numpy", embedder=HashingEmbedder(), **kwargs)
+    return make
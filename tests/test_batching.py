@@ -0,0 +1,104 @@
+import asyncio
+import queue
+import threading
+
+import pytest
+
+from rag_system.batching import SearchBatcher
+
+
+class RecordingRAG:
+    """Stand-in for SimpleRAG.search_batch recording each batch, optionally blocking until released"""
+
+    def __init__(self, block=False):
+        self.batches = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def search_batch(self, queries, n_results):
+        self.batches.append((list(queries), n_results))
+        self.entered.set()
+        self.release.wait()
+        if "fail" in queries:
+            raise ValueError("search failed")
+        return [[{"query": query, "n_results": n_results}] for query in queries]
+
+
+@pytest.fixture
+def batchers():
+    started = []
+
+    def make(rag, **kwargs):
+        batcher = SearchBatcher(rag, **kwargs)
+        started.append(batcher)
+        return batcher
+    yield make
+    for batcher in started:
+        batcher.stop()
+
+
+def test_concurrent_requests_are_answered_in_one_batch(batchers):
+    rag = RecordingRAG()
+    batcher = batchers(rag, max_batch_size=4, max_wait_ms=500)
+    futures = [batcher.submit(f"query {i}") for i in range(4)]
+    assert [future.result(timeout=5)[0]["query"] for future in futures] == [f"query {i}" for i in range(4)]
+    assert rag.batches == [([f"query {i}" for i in range(4)], 5)]
+
+
+def test_requests_are_grouped_by_n_results(batchers):
+    rag = RecordingRAG()
+    batcher = batchers(rag, max_batch_size=4, max_wait_ms=500)
+    futures = [batcher.submit("a", 5), batcher.submit("b", 3), batcher.submit("c", 5), batcher.submit("d", 3)]
+    assert [future.result(timeout=5)[0]["n_results"] for future in futures] == [5, 3, 5, 3]
+    assert sorted(rag.batches) == [(["a", "c"], 5), (["b", "d"], 3)]
+
+
+def test_a_failed_batch_fails_its_requests_only(batchers):
+    rag = RecordingRAG()
+    batcher = batchers(rag, max_batch_size=2, max_wait_ms=500)
+    failed, other = batcher.submit("fail", 5), batcher.submit("other", 3)
+    with pytest.raises(ValueError, match="search failed"):
+        failed.result(timeout=5)
+    assert other.result(timeout=5)[0]["query"] == "other"
+
+
+def test_a_full_queue_applies_backpressure(batchers):
+    rag = RecordingRAG(block=True)
+    batcher = batchers(rag, max_batch_size=1, max_wait_ms=0, max_queue_size=1)
+    first = batcher.submit("first")
+    assert rag.entered.wait(5)
+    second = batcher.submit("second")
+    with pytest.raises(queue.Full):
+        batcher.submit("third", timeout=0.05)
+    rag.release.set()
+    assert first.result(timeout=5) and second.result(timeout=5)
+
+
+def test_asearch_gathers_concurrent_coroutines(batchers):
+    rag = RecordingRAG()
+    batcher = batchers(rag, max_batch_size=3, max_wait_ms=500)
+
+    async def search_all():
+        return await asyncio.gather(*(batcher.asearch(f"query {i}") for i in range(3)))
+    assert [results[0]["query"] for results in asyncio.run(search_all())] == ["query 0", "query 1", "query 2"]
+    assert len(rag.batches) == 1
+
+
+def test_concurrent_first_requests_start_one_scheduler(batchers, monkeypatch):
+    batcher = batchers(RecordingRAG())
+    starts = []
+    thread_start = threading.Thread.start
+    monkeypatch.setattr(threading.Thread, "start", lambda thread: (starts.append(thread.name), thread_start(thread)))
+    barrier = threading.Barrier(8)
+
+    def start():
+        barrier.wait()
+        batcher.start()
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread_start(thread)
+    for thread in threads:
+        thread.join()
+    assert starts.count("search-batcher") == 1
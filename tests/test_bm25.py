@@ -0,0 +1,49 @@
+from rag_system.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from rag_system.utils import add_pdf
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+
+
+def test_section_numbers_are_single_tokens():
+    assert tokenize("Section 4.2, see 1.1.3 and item 7") == ["section", "4.2", "see", "1.1.3", "and", "item", "7"]
+
+
+def test_search_ranks_rarer_and_more_frequent_terms_higher():
+    index = BM25Index()
+    index.upsert(["a", "b", "c"], ["access reviews run quarterly", "access logs are kept", "reviews reviews of access"])
+    ranked = index.search("quarterly reviews")
+    assert [chunk_id for chunk_id, _ in ranked] == ["a", "c"]
+    assert index.search("unknown term") == []
+
+
+def test_upsert_replaces_and_delete_removes():
+    index = BM25Index()
+    index.upsert(["a"], ["backups are encrypted"])
+    index.upsert(["a"], ["logs are retained"])
+    assert index.search("backups") == []
+    index.delete(["a"])
+    assert index.search("logs") == [] and len(index) == 0
+
+
+def test_saved_index_loads_with_the_same_ranking(tmp_path):
+    path = str(tmp_path / "bm25.npz")
+    index = BM25Index(path)
+    index.upsert(["a", "b", "c"], ["access reviews run quarterly", "access logs are kept", "section 4.2 access"])
+    index.delete(["b"])
+    index.save()
+    loaded = BM25Index(path)
+    assert len(loaded) == 2
+    assert loaded.search("access 4.2") == index.search("access 4.2")
+
+
+def test_reciprocal_rank_fusion_favours_ids_ranked_well_by_both():
+    fused = [chunk_id for chunk_id, _ in reciprocal_rank_fusion([["a", "b", "c"], ["d", "b", "e"]])]
+    assert fused[0] == "b"
+    assert set(fused) == {"a", "b", "c", "d", "e"}
+
+
+def test_hybrid_search_finds_a_section_number(make_rag):
+    rag = make_rag()
+    add_pdf(rag, SAMPLE_PDF)
+    results = rag.search("4.2", n_results=1, use_cache=False)
+    assert "4.2" in results[0]["text"]
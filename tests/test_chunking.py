@@ -0,0 +1,52 @@
+import time
+
+from rag_system.chunking import SentenceChunker, sentence_spans
+
+
+def test_chunk_offsets_point_into_the_document_text():
+    pages = [(1, "1. Access Control Policy 1.1 All employees must review access requests within 30. "
+                 "Managers must approve them quarterly."),
+             (2, "2. Encryption Policy 2.1 Administrators must encrypt backups. Keys rotate every 90 days.")]
+    document = " ".join(text for _, text in pages)
+    chunks = list(SentenceChunker(max_chunk_size=80, min_chunk_size=0).chunk_pages(pages))
+    assert chunks
+    for chunk in chunks:
+        assert document[chunk["start"]:chunk["end"]] == chunk["text"]
+    assert [chunk["page"] for chunk in chunks] == sorted(chunk["page"] for chunk in chunks)
+    assert chunks[-1]["page"] == 2
+
+
+def test_sentences_ending_in_a_number_split_but_section_numbers_do_not():
+    text = "Requests are reviewed within 30. 4.2. Access reviews run every 1.5 years. 5. Logging Policy applies."
+    assert [text[start:end] for start, end in sentence_spans(text)] == [
+        "Requests are reviewed within 30.",
+        "4.2. Access reviews run every 1.5 years.",
+        "5. Logging Policy applies."
+    ]
+
+
+def test_text_without_sentence_endings_yields_bounded_chunks_in_linear_time():
+    chunker = SentenceChunker(max_chunk_size=200, overlap=50, min_chunk_size=0)
+    pages = [(page, " ".join(f"word{page}x{i}" for i in range(300))) for page in range(1, 41)]
+    document = " ".join(text for _, text in pages)
+    start = time.perf_counter()
+    chunks = list(chunker.chunk_pages(pages))
+    assert time.perf_counter() - start < 2
+    assert all(len(chunk["text"]) <= 200 for chunk in chunks)
+    assert all(document[chunk["start"]:chunk["end"]] == chunk["text"] for chunk in chunks)
+    # Pieces are cut at whitespace, so every word survives whole
+    assert {word for chunk in chunks for word in chunk["text"].split()} == set(document.split())
+
+
+def test_chunk_pages_matches_chunking_the_joined_text_with_overlap():
+    sentences = [f"Rule {i} requires {'quarterly ' * (i % 4)}review of access within {i}." for i in range(12)]
+    text = (" ".join(sentences[:6]) + " backups stay encrypted and " + "owner review " * 25 + " ".join(sentences[6:])
+            + " 4.2. Logs are kept and " + "word " * 40)
+    # Page breaks fall between sentences, inside sentences, inside unpunctuated runs and around a short page
+    cuts = [0, 95, 240, 241, 420, 440, 700, 1000, len(text)]
+    pages = [(page, text[start:end].strip()) for page, (start, end) in enumerate(zip(cuts, cuts[1:]), 1)]
+    document = " ".join(page_text for _, page_text in pages)
+    for max_chunk_size, overlap in [(100, 50), (120, 40), (200, 80), (60, 30)]:
+        chunker = SentenceChunker(max_chunk_size=max_chunk_size, overlap=overlap, min_chunk_size=0)
+        paged = [(chunk["start"], chunk["end"]) for chunk in chunker.chunk_pages(pages)]
+        assert paged == [(chunk["start"], chunk["end"]) for chunk in chunker.chunk(document)]
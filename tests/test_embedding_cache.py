@@ -0,0 +1,60 @@
+import numpy as np
+
+from rag_system.embedding_cache import EmbeddingCache, embedding_cache_key
+
+
+def key(text):
+    return embedding_cache_key(text, "model", True)
+
+
+def vector(seed, dimension=4):
+    return np.random.default_rng(seed).normal(size=(1, dimension)).astype(np.float32)
+
+
+def test_entries_survive_reopening(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 4, max_entries=8)
+    cache.put_many([key("a")], vector(1))
+    cache.flush()
+    found = EmbeddingCache(str(tmp_path), 4, max_entries=8).get_many([key("b"), key("a")])
+    assert list(found) == [1]
+    assert np.allclose(found[1], vector(1)[0])
+
+
+def test_instances_sharing_a_directory_do_not_hand_out_the_same_slot(tmp_path):
+    first = EmbeddingCache(str(tmp_path), 4, max_entries=8)
+    second = EmbeddingCache(str(tmp_path), 4, max_entries=8)
+    first.put_many([key("k1")], vector(1))
+    second.put_many([key("k2")], vector(2))
+    assert np.allclose(first.get_many([key("k1")])[0], vector(1)[0])
+    assert np.allclose(first.get_many([key("k2")])[0], vector(2)[0])
+    assert np.allclose(second.get_many([key("k1")])[0], vector(1)[0])
+
+
+def test_overwritten_slot_reads_as_a_miss(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 4, max_entries=8)
+    cache.put_many([key("a")], vector(1))
+    slot = cache._entries[key("a")]
+    # A crash after another entry's vector reached the slot but before the index was saved
+    cache._vectors[slot] = vector(2)[0]
+    cache._keys[slot] = np.frombuffer(bytes.fromhex(key("b")), dtype=np.uint8)
+    assert cache.get_many([key("a")]) == {}
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 4, max_entries=2)
+    cache.put_many([key("a"), key("b")], np.vstack([vector(1), vector(2)]))
+    cache.get_many([key("a")])
+    cache.put_many([key("c")], vector(3))
+    assert sorted(cache.get_many([key("a"), key("b"), key("c")])) == [0, 2]
+    assert len(cache) == 2
+
+
+def test_batch_larger_than_the_cache_keeps_its_last_entries(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 4, max_entries=3)
+    keys = [key(text) for text in "abcde"]
+    vectors = np.vstack([vector(seed) for seed in range(5)])
+    cache.put_many(keys, vectors)
+    found = cache.get_many(keys)
+    assert sorted(found) == [2, 3, 4]
+    assert np.allclose(found[4], vectors[4])
+    assert len(cache) == 3
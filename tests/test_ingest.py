@@ -0,0 +1,59 @@
+import shutil
+
+import pytest
+
+from rag_system.ingest import bulk_ingest, document_id_for, ingest_root
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    directory = tmp_path / "corpus"
+    directory.mkdir()
+    for name in ("first", "second", "third"):
+        shutil.copy(SAMPLE_PDF, directory / f"{name}.pdf")
+    return directory
+
+
+def test_documents_are_recorded_only_after_the_store_is_persisted(make_rag, corpus):
+    rag = make_rag()
+    persisted = []
+
+    def persist():
+        if len(persisted) == 1:
+            raise OSError("crashed while persisting")
+        persisted.append(sorted(rag.manifest.documents()))
+    rag.client.persist = persist
+
+    with pytest.raises(Exception, match="crashed while persisting"):
+        bulk_ingest(rag, str(corpus), workers=1, checkpoint_documents=2)
+    # The first checkpoint committed two documents, the crash lost the third before it reached the manifest
+    assert persisted == [[]]
+    assert sorted(rag.manifest.documents()) == ["first", "second"]
+
+    rag.client.persist = lambda: None
+    stats = bulk_ingest(rag, str(corpus), workers=1)
+    assert stats["skipped"] == 2 and stats["documents"] == 1
+    assert sorted(rag.manifest.documents()) == ["first", "second", "third"]
+
+
+def test_same_named_pdfs_in_subdirectories_get_distinct_ids(make_rag, tmp_path):
+    for subdirectory in ("finance", "it"):
+        (tmp_path / subdirectory).mkdir()
+        shutil.copy(SAMPLE_PDF, tmp_path / subdirectory / "policy.pdf")
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    rag = make_rag(persist_directory=str(tmp_path / "vector_db"))
+
+    stats = bulk_ingest(rag, str(tmp_path), workers=1)
+    assert stats["documents"] == 2
+    assert stats["failed"] == [str(tmp_path / "broken.pdf")]
+    documents = rag.manifest.documents()
+    assert sorted(documents) == ["finance/policy", "it/policy"]
+    assert rag.collection.count() == len(documents["finance/policy"]["chunk_ids"]) * 2
+
+
+def test_ingest_root():
+    assert ingest_root("data/**/*.pdf") == "data"
+    assert ingest_root("data/documents/policy.pdf") == "data/documents"
+    assert document_id_for("data/documents/policy.pdf", "data") == "documents/policy"
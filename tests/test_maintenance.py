@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+from rag_system import maintenance
+from rag_system.maintenance import MaintenanceScheduler, StorageSummary
+
+
+def test_storage_summary_picks_up_refreshes_from_other_processes(tmp_path):
+    reader, writer = StorageSummary(str(tmp_path)), StorageSummary(str(tmp_path))
+    writer.refresh(vectors=1)
+    assert reader.summary()["vectors"] == 1
+    writer.refresh(vectors=2)
+    # Force a distinct mtime, some filesystems only keep coarse timestamps
+    stat = os.stat(writer.path)
+    os.utime(writer.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert reader.summary()["vectors"] == 2
+
+
+def test_run_once_persists_before_scanning_for_orphans(make_rag, monkeypatch):
+    rag = make_rag()
+    calls = []
+    monkeypatch.setattr(rag.client, "persist", lambda: calls.append("persist"))
+    monkeypatch.setattr(maintenance, "cleanup_orphans", lambda *args, **kwargs: calls.append("cleanup"))
+    MaintenanceScheduler(rag).run_once()
+    assert calls[:2] == ["persist", "cleanup"]
+
+
+def test_report_keeps_the_vector_count(tmp_path):
+    StorageSummary(str(tmp_path)).refresh(vectors=42)
+    assert maintenance.report(str(tmp_path))["summary"]["vectors"] == 42
+    assert StorageSummary(str(tmp_path)).summary()["vectors"] == 42
+
+
+def test_run_once_compacts_once_enough_rows_are_deleted(make_rag, monkeypatch):
+    rag = make_rag()
+    embeddings = np.random.default_rng(0).normal(size=(5, 8)).astype(np.float32)
+    rag.collection.upsert([f"id{i}" for i in range(5)], embeddings, [f"doc {i}" for i in range(5)])
+    rag.collection.delete(["id0", "id1"])
+    compacted = []
+    monkeypatch.setattr(maintenance, "compact", lambda rag_instance: compacted.append(rag_instance.collection.row_count()))
+    MaintenanceScheduler(rag, compact_threshold=0.5).run_once()
+    assert compacted == []
+    MaintenanceScheduler(rag, compact_threshold=0.4).run_once()
+    assert compacted == [5]
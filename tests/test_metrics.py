@@ -0,0 +1,57 @@
+import pytest
+
+from rag_system.metrics import Metrics, metrics
+from rag_system.utils import add_pdf
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+
+
+@pytest.fixture
+def recorded():
+    """Enable the process-wide metrics from a clean slate, restoring their state afterwards"""
+    enabled = metrics.enabled
+    metrics.enable()
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+    if not enabled:
+        metrics.disable()
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics()
+    with registry.timer("stage"):
+        pass
+    registry.increment("events")
+    assert registry.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_snapshot_and_prometheus_export():
+    registry = Metrics(enabled=True)
+    registry.observe("stage", 0.003)
+    registry.observe("stage", 0.2)
+    registry.increment("events", 2)
+    stage = registry.snapshot()["stages"]["stage"]
+    assert stage["count"] == 2
+    assert stage["total_ms"] == pytest.approx(203.0)
+    assert stage["p50_ms"] == 5.0
+    assert registry.snapshot()["counters"] == {"events": 2}
+    text = registry.to_prometheus()
+    assert 'rag_stage_seconds_bucket{stage="stage",le="0.005"} 1' in text
+    assert 'rag_stage_seconds_bucket{stage="stage",le="+Inf"} 2' in text
+    assert 'rag_events_total{event="events"} 2' in text
+
+
+def test_search_records_every_stage_and_cache_counters(make_rag, recorded):
+    rag = make_rag(collect_metrics=True)
+    add_pdf(rag, SAMPLE_PDF)
+    query = "how often must access reviews be performed?"
+    rag.search(query)
+    rag.search(query)
+    snapshot = recorded.snapshot()
+    for stage in ("chunking", "collection_write", "query_embedding", "vector_lookup", "lexical_lookup",
+                  "qa_extraction", "citation_parsing"):
+        assert snapshot["stages"][stage]["count"] >= 1, stage
+    assert snapshot["counters"]["query_cache_misses"] == 1
+    assert snapshot["counters"]["query_cache_exact_hits"] == 1
+    assert snapshot["counters"]["qa_extractions"] == 5
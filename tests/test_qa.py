@@ -0,0 +1,58 @@
+import pytest
+
+from conftest import StandInRAG, stand_in_qa
+from rag_system.utils import add_pdf
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+QUERY = "how often must access reviews be performed?"
+
+
+@pytest.fixture
+def qa_calls(monkeypatch):
+    """Record the contexts of every QA pipeline call, the first context of a search scores highest"""
+    calls = []
+
+    def recording_qa(question, context, **kwargs):
+        calls.append(list(context))
+        answers = stand_in_qa(question, context)
+        for answer in answers:
+            answer["score"] = 0.1
+        if len(calls) == 1:
+            answers[0]["score"] = 0.9
+        return answers
+    monkeypatch.setattr(StandInRAG, "qa_pipeline", property(lambda self: recording_qa))
+    return calls
+
+
+@pytest.fixture
+def rag(make_rag):
+    rag = make_rag(query_cache_size=0)
+    add_pdf(rag, SAMPLE_PDF)
+    return rag
+
+
+def test_all_retrieved_chunks_are_answered_in_one_qa_call(rag, qa_calls):
+    results = rag.search(QUERY, n_results=5, qa_batch_size=2)
+    assert len(results) == 5
+    assert len(qa_calls) == 1
+    assert qa_calls[0] == [result["text"] for result in results]
+    assert all(result["answer"] for result in results)
+
+
+def test_batched_queries_share_one_qa_call(rag, qa_calls):
+    batches = rag.search_batch([QUERY, "how many levels is Company data classified?"], n_results=3)
+    assert [len(results) for results in batches] == [3, 3]
+    assert len(qa_calls) == 1
+    assert len(qa_calls[0]) == 6
+
+
+def test_chunks_below_min_similarity_are_not_answered(rag, qa_calls):
+    results = rag.search(QUERY, n_results=5, min_similarity=2.0)
+    assert qa_calls == []
+    assert [result["answer"] for result in results] == [""] * 5
+
+
+def test_early_stop_skips_the_remaining_batches(rag, qa_calls):
+    results = rag.search(QUERY, n_results=5, qa_batch_size=2, early_stop_margin=0.5)
+    assert len(qa_calls) == 1
+    assert [bool(result["answer"]) for result in results] == [True, True, False, False, False]
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+
+from rag_system.query_cache import QueryCache
+from rag_system.utils import add_pdf, remove_pdf
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+
+
+def test_exact_tier_matches_normalized_queries():
+    cache = QueryCache()
+    cache.put("How often must access reviews be performed?", (5,), None, [{"answer": "quarterly"}])
+    assert cache.get("  how often must   access reviews be performed ", (5,)) == [{"answer": "quarterly"}]
+    assert cache.get("how often must access reviews be performed", (3,)) is None
+
+
+def test_semantic_tier_matches_near_duplicate_embeddings_only():
+    cache = QueryCache(semantic_threshold=0.95)
+    cache.put("access reviews", (5,), np.array([1.0, 0.0]), [{"answer": "quarterly"}])
+    assert cache.get_similar(np.array([0.99, 0.05]), (5,)) == [{"answer": "quarterly"}]
+    assert cache.get_similar(np.array([0.5, 0.5]), (5,)) is None
+    assert (cache.semantic_hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_and_are_evicted():
+    cache = QueryCache(max_entries=1, ttl=0.01)
+    cache.put("first", (5,), None, [])
+    cache.put("second", (5,), None, [])
+    assert cache.get("first", (5,)) is None
+    time.sleep(0.02)
+    assert cache.get("second", (5,)) is None
+
+
+def test_cached_results_are_copies():
+    cache = QueryCache()
+    results = [{"answer": "quarterly"}]
+    cache.put("access reviews", (5,), None, results)
+    results[0]["answer"] = "changed"
+    cache.get("access reviews", (5,))[0]["answer"] = "changed again"
+    assert cache.get("access reviews", (5,)) == [{"answer": "quarterly"}]
+
+
+def test_search_results_are_cached_until_the_collection_changes(make_rag):
+    rag = make_rag()
+    add_pdf(rag, SAMPLE_PDF)
+    query = "how often must access reviews be performed?"
+    first = rag.search(query)
+    assert len(rag.query_cache) == 1
+    # Same words in another order embed identically with the hashing embedder, so the semantic tier answers
+    assert rag.search("access reviews, how often must be performed?") == first
+    assert rag.query_cache.semantic_hits == 1
+
+    remove_pdf(rag, "sample_IT_compliance_document")
+    assert len(rag.query_cache) == 0
+    assert rag.search(query) == []
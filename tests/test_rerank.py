@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from rag_system.rerank import OverlapReranker, Reranker, create_reranker
+from rag_system.utils import add_pdf
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+
+
+class SlowReranker(Reranker):
+    """Scores by document length, taking 50 ms per batch of two"""
+
+    batch_size = 2
+
+    def __init__(self):
+        self.scored = 0
+
+    def score_pairs(self, pairs):
+        time.sleep(0.05)
+        self.scored += len(pairs)
+        return [len(document) for _, document, _ in pairs]
+
+
+def retrieved(documents):
+    return [(documents, [0.5] * len(documents), [{"rank": i} for i in range(len(documents))])]
+
+
+def test_reranker_needs_score_pairs():
+    with pytest.raises(TypeError):
+        Reranker()
+
+
+def test_overlap_reranker_promotes_chunks_with_query_terms():
+    documents, _, metadatas = OverlapReranker().rerank(
+        ["how often are access reviews performed?"],
+        retrieved(["backups are encrypted", "access reviews are performed quarterly", "logs are kept"]),
+        top_k=2
+    )[0]
+    assert documents[0] == "access reviews are performed quarterly"
+    assert metadatas[0] == {"rank": 1}
+    assert len(documents) == 2
+
+
+def test_unscored_candidates_keep_their_retrieval_order_after_the_budget():
+    reranker = SlowReranker()
+    documents, _, _ = reranker.rerank(["query"], retrieved(["a", "bbb", "cc", "dddd", "eeeee"]), top_k=5, budget_ms=10)[0]
+    # Only the first batch is scored before the budget runs out
+    assert reranker.scored == 2
+    assert documents == ["bbb", "a", "cc", "dddd", "eeeee"]
+
+
+def test_unknown_reranker_is_rejected():
+    assert create_reranker(None) is None
+    with pytest.raises(ValueError):
+        create_reranker("unknown")
+
+
+def test_search_overfetches_candidates_for_the_reranker(make_rag):
+    rag = make_rag(reranker="overlap", rerank_candidates=10)
+    add_pdf(rag, SAMPLE_PDF)
+    calls = []
+    rerank = rag.reranker.rerank
+
+    def recording_rerank(queries, candidates, top_k, budget_ms=None):
+        calls.append(candidates)
+        return rerank(queries, candidates, top_k, budget_ms)
+    rag.reranker.rerank = recording_rerank
+    results = rag.search("how often must access reviews be performed?", n_results=2, use_cache=False)
+    assert len(results) == 2
+    assert len(calls[0][0][0]) == 10
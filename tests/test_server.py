@@ -0,0 +1,74 @@
+import json
+import shutil
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from rag_system.server import RAGHTTPServer
+from rag_system.utils import add_pdf
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+
+
+@pytest.fixture
+def start_server(make_rag):
+    servers = []
+
+    def start(**kwargs):
+        server = RAGHTTPServer(("127.0.0.1", 0), **kwargs)
+        server.rag = make_rag()
+        server.ready.set()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_ingest_only_reads_from_documents_directory(start_server, tmp_path):
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    shutil.copy(SAMPLE_PDF, documents / "policy.pdf")
+    shutil.copy(SAMPLE_PDF, tmp_path / "outside.pdf")
+    url = start_server(documents_directory=str(documents))
+
+    assert post(f"{url}/ingest", {"path": SAMPLE_PDF})[0] == 403
+    assert post(f"{url}/ingest", {"path": str(documents / ".." / "outside.pdf")})[0] == 403
+    status, summary = post(f"{url}/ingest", {"path": str(documents / "policy.pdf")})
+    assert status == 200 and summary["added"] > 0
+
+
+def test_ingest_is_rejected_with_several_workers(start_server):
+    url = start_server(allow_ingest=False)
+    assert post(f"{url}/ingest", {"path": SAMPLE_PDF})[0] == 409
+
+
+def test_worker_sees_documents_ingested_by_another_process(make_rag):
+    worker, writer = make_rag(), make_rag()
+    query = "how often must access reviews be performed?"
+    assert worker.search(query) == []
+    add_pdf(writer, SAMPLE_PDF)
+    # The cached empty result is dropped and the lexical index reloaded once the writer has saved
+    assert worker.search(query)
+    assert len(worker.lexical_index) == writer.collection.count()
+
+
+def test_invalid_n_results_is_a_bad_request(start_server):
+    url = start_server()
+    for n_results in ["five", None, 0]:
+        status, body = post(f"{url}/search", {"query": "access reviews", "n_results": n_results})
+        assert status == 400
+        assert "n_results" in body["error"]
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from rag_system.metrics import metrics
+from rag_system.utils import add_pdf
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+QUERY = "how often must access reviews be performed?"
+
+
+@pytest.fixture
+def rag(make_rag):
+    rag = make_rag()
+    add_pdf(rag, SAMPLE_PDF)
+    return rag
+
+
+def test_stream_yields_hits_then_answers_in_rank_order_then_done(rag):
+    events = list(rag.search_stream(QUERY, n_results=3))
+    assert [event["event"] for event in events] == ["hits", "answer", "answer", "answer", "done"]
+    assert all(result["answer"] == "" for result in events[0]["results"])
+    assert [event["index"] for event in events[1:4]] == [0, 1, 2]
+    done = events[-1]["results"]
+    assert [result["answer"] for result in done] == [event["answer"] for event in events[1:4]]
+    assert done == rag.search(QUERY, n_results=3, use_cache=False)
+
+
+def test_stream_skips_chunks_below_min_similarity(rag):
+    events = list(rag.search_stream(QUERY, n_results=3, min_similarity=2.0))
+    assert [event["event"] for event in events] == ["hits", "done"]
+
+
+def test_stream_is_served_from_the_cache_the_second_time(rag):
+    first = list(rag.search_stream(QUERY, n_results=3))[-1]["results"]
+    events = list(rag.search_stream(QUERY, n_results=3))
+    assert [event["event"] for event in events] == ["hits", "done"]
+    assert events[0]["results"] == events[1]["results"] == first
+
+
+def test_stream_events_are_json_serializable(rag):
+    for event in rag.search_stream(QUERY, n_results=2):
+        assert json.loads(json.dumps(event)) == event
+
+
+def test_stream_counts_cache_misses_hits_and_extractions(rag):
+    enabled = metrics.enabled
+    metrics.enable()
+    metrics.reset()
+    try:
+        list(rag.search_stream(QUERY, n_results=3))
+        list(rag.search_stream(QUERY, n_results=3))
+        counters = metrics.snapshot()["counters"]
+    finally:
+        metrics.reset()
+        if not enabled:
+            metrics.disable()
+    assert counters["query_cache_misses"] == 1
+    assert counters["query_cache_exact_hits"] == 1
+    assert counters["qa_extractions"] == 3
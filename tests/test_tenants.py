@@ -0,0 +1,40 @@
+from rag_system import tenants as tenants_module
+from rag_system.embeddings import HashingEmbedder
+from rag_system.tenants import TenantManager
+from rag_system.utils import add_pdf
+
+from conftest import StandInRAG
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+
+
+def test_search_over_more_tenants_than_max_loaded_keeps_them_loaded_until_done(tmp_path, monkeypatch):
+    monkeypatch.setattr(tenants_module, "SimpleRAG", StandInRAG)
+    manager = TenantManager(str(tmp_path), max_loaded=1, embedder=HashingEmbedder(), embedding_cache_dir=None,
+                            reranker="overlap")
+    try:
+        for tenant in ["finance", "it", "legal"]:
+            add_pdf(manager.get(tenant), SAMPLE_PDF)
+        assert manager.loaded() == ["legal"]
+
+        results = manager.search(["finance", "it", "legal"], "how often must access reviews be performed?", n_results=6)
+        assert len(results) == 6
+        assert {result["tenant"] for result in results} == {"finance", "it", "legal"}
+        assert manager.loaded() == ["legal"]
+    finally:
+        manager.close()
+
+
+def test_single_tenant_fanout_ranks_like_a_direct_search(tmp_path, monkeypatch):
+    monkeypatch.setattr(tenants_module, "SimpleRAG", StandInRAG)
+    manager = TenantManager(str(tmp_path), embedder=HashingEmbedder(), embedding_cache_dir=None)
+    try:
+        rag = manager.get("finance")
+        add_pdf(rag, SAMPLE_PDF)
+        query = "4.2 access reviews"
+        direct = rag.search(query, n_results=4, use_cache=False)
+        fanned_out = manager.search(["finance"], query, n_results=4)
+        assert [result["text"] for result in fanned_out] == [result["text"] for result in direct]
+        assert all(result["tenant"] == "finance" for result in fanned_out)
+    finally:
+        manager.close()
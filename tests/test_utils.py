@@ -0,0 +1,64 @@
+import pytest
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from rag_system.utils import add_pdf, chunk_pdf, plan_document_update, remove_pdf
+
+SAMPLE_PDF = "data/documents/sample_IT_compliance_document.pdf"
+
+
+def write_policy_pdf(path, first_clause):
+    """Write a two-section policy PDF whose clause 1.1 is first_clause"""
+    lines = ["1. Access Control Policy", first_clause]
+    lines += [f"1.{i} Data owners must review access requests within {i} days." for i in range(2, 12)]
+    lines += ["2. Encryption Policy"] + [f"2.{i} Administrators must encrypt backups every {i} weeks." for i in range(1, 12)]
+    pdf = canvas.Canvas(str(path), pagesize=letter)
+    y = 720
+    for line in lines:
+        if y < 72:
+            pdf.showPage()
+            y = 720
+        pdf.drawString(72, y, line)
+        y -= 20
+    pdf.save()
+    return str(path)
+
+
+def test_plan_document_update_diffs_chunk_ids():
+    added, kept, deleted = plan_document_update(["a", "b", "c"], ["a", "d", "c", "e"])
+    assert added == [1, 3]
+    assert kept == [0, 2]
+    assert deleted == ["b"]
+
+
+def test_add_pdf_records_the_document_only_after_persisting(make_rag):
+    rag = make_rag()
+
+    def crash():
+        raise OSError("crashed while persisting")
+    rag.client.persist = crash
+    with pytest.raises(Exception, match="crashed while persisting"):
+        add_pdf(rag, SAMPLE_PDF)
+    assert rag.manifest.documents() == {}
+
+    rag.client.persist = lambda: None
+    summary = add_pdf(rag, SAMPLE_PDF)
+    assert summary["added"] == rag.collection.count() > 0
+    assert add_pdf(rag, SAMPLE_PDF)["added"] == 0
+    assert remove_pdf(rag, "sample_IT_compliance_document") == summary["added"]
+    assert rag.collection.count() == 0
+    assert rag.manifest.documents() == {}
+
+
+def test_add_pdf_refreshes_offsets_of_kept_chunks_after_an_edit(make_rag, tmp_path):
+    rag = make_rag(chunk_size=150)
+    add_pdf(rag, write_policy_pdf(tmp_path / "v1.pdf", "1.1 All employees must classify data."), "policy")
+    edited = write_policy_pdf(tmp_path / "v2.pdf", "1.1 All employees and contractors must classify confidential data.")
+    summary = add_pdf(rag, edited, "policy")
+    # Only the edited chunk is re-embedded, but every chunk after it has shifted
+    assert summary["added"] == summary["deleted"] == 1
+    assert summary["updated"] == summary["unchanged"] > 0
+
+    expected = sorted((chunk["start"], chunk["end"]) for chunk in chunk_pdf(rag.chunker, edited))
+    stored = rag.collection.get(include=["metadatas"])["metadatas"]
+    assert sorted((metadata["start_char"], metadata["end_char"]) for metadata in stored) == expected
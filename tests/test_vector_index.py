@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pytest
+
+from rag_system.utils import reset_database
+from rag_system.vector_index import NumpyCollection, NumpyVectorStore
+
+
+def vectors(rows, dimension=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(rows, dimension)).astype(np.float32)
+
+
+def test_query_empty_collection_returns_one_empty_result_per_query(tmp_path):
+    collection = NumpyCollection(str(tmp_path / "c"), "c")
+    result = collection.query(vectors(3, dimension=768).tolist(), n_results=5)
+    assert result["ids"] == [[], [], []]
+    assert result["documents"] == [[], [], []]
+    assert result["embeddings"] is None
+
+
+def test_query_finds_nearest_and_skips_deleted(tmp_path):
+    collection = NumpyCollection(str(tmp_path / "c"), "c")
+    data = vectors(10)
+    collection.upsert([f"id{i}" for i in range(10)], data, [f"doc {i}" for i in range(10)], [{"i": i} for i in range(10)])
+    result = collection.query(data[3:4].tolist(), n_results=2)
+    assert result["ids"][0][0] == "id3"
+    assert abs(result["distances"][0][0]) < 1e-5
+
+    collection.delete(["id3"])
+    assert collection.count() == 9
+    assert "id3" not in collection.query(data[3:4].tolist(), n_results=9)["ids"][0]
+
+
+def test_compact_reclaims_deleted_rows_and_keeps_records(tmp_path):
+    collection = NumpyCollection(str(tmp_path / "c"), "c")
+    data = vectors(6)
+    collection.upsert([f"id{i}" for i in range(6)], data, [f"doc {i}" for i in range(6)])
+    collection.delete(["id0", "id2"])
+    assert collection.compact() == 2
+    assert collection.compact() == 0
+
+    reopened = NumpyCollection(str(tmp_path / "c"), "c")
+    assert reopened.count() == 4
+    stored = reopened.get(["id5"], include=["documents", "embeddings"])
+    assert stored["documents"] == ["doc 5"]
+    assert np.allclose(stored["embeddings"][0], data[5])
+
+
+def test_writes_are_seen_by_another_instance(tmp_path):
+    writer = NumpyCollection(str(tmp_path / "c"), "c")
+    reader = NumpyCollection(str(tmp_path / "c"), "c")
+    writer.upsert(["a"], vectors(1), ["doc a"])
+    assert reader.count() == 1
+    writer.update(["a"], metadatas=[{"page": 2}])
+    assert reader.get(["a"])["metadatas"] == [{"page": 2}]
+
+
+def test_store_create_and_delete_collection(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.create_collection("documents").upsert(["a"], vectors(1))
+    assert [collection.name for collection in store.list_collections()] == ["documents"]
+    store.delete_collection("documents")
+    assert store.list_collections() == []
+
+
+def test_search_on_empty_store(make_rag):
+    rag = make_rag()
+    assert rag.search("how often must access reviews be performed?") == []
+    reset_database(rag)
+    assert rag.search("how often must access reviews be performed?") == []
+
+
+def test_hnsw_index_is_built_in_background_and_updated_in_place(tmp_path):
+    pytest.importorskip("hnswlib")
+    directory = str(tmp_path / "c")
+    collection = NumpyCollection(directory, "c", ann_threshold=10)
+    data = vectors(50)
+    collection.upsert([f"id{i}" for i in range(50)], data)
+    # Exact search answers while the index builds
+    assert collection.query(data[7:8].tolist(), n_results=1)["ids"] == [["id7"]]
+    collection._hnsw_build.join()
+    assert collection._hnsw_current()
+
+    # Metadata updates keep the index, vector writes are applied to it instead of rebuilding
+    collection.update(["id1"], metadatas=[{"page": 1}])
+    assert collection._hnsw_current()
+    build = collection._hnsw_build
+    collection.upsert(["new"], vectors(1, seed=1))
+    collection.delete(["id7"])
+    assert collection._hnsw_current() and collection._hnsw_build is build
+    assert collection.query(vectors(1, seed=1).tolist(), n_results=1)["ids"] == [["new"]]
+    assert "id7" not in collection.query(data[7:8].tolist(), n_results=5)["ids"][0]
+
+    # Another process loads the persisted index only if it matches its vectors
+    build.join()
+    reopened = NumpyCollection(directory, "c", ann_threshold=10)
+    reopened.query(data[3:4].tolist(), n_results=1)
+    reopened._hnsw_build.join()
+    reopened.upsert(["other"], vectors(1, seed=2))
+    fresh = NumpyCollection(directory, "c", ann_threshold=10)
+    assert fresh._hnsw_index() is None
+    fresh._hnsw_build.join()
+    assert NumpyCollection(directory, "c", ann_threshold=10)._hnsw_index() is not None
+
+
+def test_norms_are_persisted(tmp_path):
+    collection = NumpyCollection(str(tmp_path / "c"), "c")
+    data = vectors(4)
+    collection.upsert(["a", "b", "c", "d"], data)
+    reopened = NumpyCollection(str(tmp_path / "c"), "c")
+    assert isinstance(reopened._norms, np.memmap)
+    assert np.allclose(reopened._norms[:4], np.linalg.norm(data, axis=1))
+
+
+def test_interrupted_compaction_leaves_index_intact(tmp_path, monkeypatch):
+    collection = NumpyCollection(str(tmp_path / "c"), "c")
+    collection.upsert(["a", "b", "c"], vectors(3), ["doc a", "doc b", "doc c"])
+    collection.delete(["b"])
+
+    def crash():
+        raise OSError("disk full")
+    monkeypatch.setattr(collection, "_save_state", crash)
+    with pytest.raises(OSError):
+        collection.compact()
+    assert collection.count() == 2
+
+    reopened = NumpyCollection(str(tmp_path / "c"), "c")
+    assert reopened.count() == 2
+    assert reopened.get(["c"])["documents"] == ["doc c"]
+    assert reopened.compact() == 1
+    assert sorted(os.listdir(tmp_path / "c")) == ["norms.1.f32", "records.1.jsonl", "state.json", "vectors.1.f32"]